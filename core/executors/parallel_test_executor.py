@@ -17,17 +17,180 @@ Example:
 """
 
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict, is_dataclass
+from collections import OrderedDict
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime
 import json
 import time
 import threading
+import multiprocessing
+import atexit
+import os
+import queue
+import shutil
+import tempfile
+import asyncio
+import subprocess
+from urllib.parse import urlsplit
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
 import traceback
 
+# Playwright is optional: engine="playwright" runs each test in a fresh
+# BrowserContext of one long-lived browser per worker; engine="playwright-async"
+# runs tests as coroutines sharing one browser in this process
+try:
+    from playwright.sync_api import sync_playwright, Error as PlaywrightError
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+    PlaywrightError = Exception
+
+# websocket-client (a Selenium dependency) lets engine="cdp" talk to Chrome's
+# DevTools protocol directly, without a ChromeDriver process in between
+try:
+    import websocket
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+# psutil gives a portable reading of available memory for sizing the pool
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# orjson parses test files and writes result files much faster than json
+# (which is used when it is not installed)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _load_json_file(path) -> Any:
+    """Read and parse a JSON file (orjson when available)"""
+    data = Path(path).read_bytes()
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+# ijson parses a JSON array item by item, so large test files can start
+# running before they are fully read and never sit in memory whole
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Test files above this size are streamed when ijson is installed; smaller
+# ones parse faster in one go
+STREAM_THRESHOLD_BYTES = 1024 * 1024
+
+
+def _iter_activities(test_file: str):
+    """Yield the activities of a test file, streaming large files with ijson"""
+    if IJSON_AVAILABLE and os.path.getsize(test_file) > STREAM_THRESHOLD_BYTES:
+        with open(test_file, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+    else:
+        yield from _load_json_file(test_file)
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize dataclasses and datetimes for json (orjson does this natively)"""
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_line(data: Any) -> bytes:
+    """Serialize data as one compact JSON line, newline included"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_DATACLASS) + b"\n"
+    return (json.dumps(data, default=_json_default) + "\n").encode('utf-8')
+
+
+def _write_json_file(path, data: Any):
+    """
+    Write data as indented JSON (orjson when available). Dataclasses such
+    as TestResult and datetimes can be passed as they are
+    """
+    if ORJSON_AVAILABLE:
+        Path(path).write_bytes(orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_DATACLASS
+        ))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, default=_json_default)
+
+
+# Rough memory footprint of one Chrome instance, used to cap the worker count
+CHROME_MEMORY_BYTES = 250 * 1024 * 1024
+# ...and of one extra BrowserContext/page in a shared browser (async engine)
+CONTEXT_MEMORY_BYTES = 50 * 1024 * 1024
+
+
+def _available_memory_bytes() -> Optional[int]:
+    """Available system memory in bytes, or None if it cannot be read"""
+    try:
+        if PSUTIL_AVAILABLE:
+            return psutil.virtual_memory().available
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return None
+
+
+RESULT_LOCK_TIMEOUT = 3.0
+
+# Put on the results writer queue to make the writer thread exit
+_WRITER_SENTINEL = object()
+
+
+def _write_json_file_atomic(path, data: Any):
+    """
+    Write JSON to path via a temp file and os.replace(), so readers never
+    see a half-written file. A path + ".lock" file created with O_EXCL keeps
+    concurrent writers apart; if it cannot be taken within
+    RESULT_LOCK_TIMEOUT the write goes ahead without it
+    """
+    path = str(path)
+    lock_file = path + ".lock"
+    lock_fd = None
+    deadline = time.time() + RESULT_LOCK_TIMEOUT
+    while lock_fd is None:
+        try:
+            lock_fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if time.time() >= deadline:
+                print(f"[Parallel Executor] Lock {lock_file} busy - writing without it")
+                break
+            time.sleep(0.05)
+        except Exception:
+            break
+    
+    try:
+        tmp_file = path + ".tmp"
+        _write_json_file(tmp_file, data)
+        os.replace(tmp_file, path)
+    finally:
+        if lock_fd is not None:
+            os.close(lock_fd)
+            try:
+                os.unlink(lock_file)
+            except Exception:
+                pass
+
 
 @dataclass
 class TestResult:
@@ -41,19 +204,6 @@ class TestResult:
     activities_failed: int
     error_message: Optional[str] = None
     screenshots_captured: List[str] = field(default_factory=list)
-    
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            'test_file': self.test_file,
-            'status': self.status,
-            'start_time': self.start_time.isoformat(),
-            'end_time': self.end_time.isoformat(),
-            'duration_seconds': self.duration_seconds,
-            'activities_executed': self.activities_executed,
-            'activities_failed': self.activities_failed,
-            'error_message': self.error_message,
-            'screenshots_captured': self.screenshots_captured
-        }
 
 
 @dataclass
@@ -98,29 +248,1122 @@ class ParallelExecutionSummary:
         print("\n" + "="*80)
 
 
+# Browser pool: each worker thread (one per worker process with
+# multiprocessing) keeps its Chrome driver between tests and only resets it
+_driver_local = threading.local()
+_pooled_drivers: List[webdriver.Chrome] = []
+_pooled_browsers: List[Tuple[Any, Any]] = []  # (playwright, browser)
+_pooled_cdp_browsers: List["CdpBrowser"] = []
+_pooled_drivers_lock = threading.Lock()
+_driver_profiles: Dict[Any, str] = {}  # driver -> its copied profile dir
+
+# Files Chrome only holds while running; never copied out of the template
+PROFILE_IGNORE = shutil.ignore_patterns('Singleton*', 'lockfile', '*.lock')
+
+
+# Flags for every test Chrome (template and worker drivers alike), with
+# background services switched off
+CHROME_ARGUMENTS = (
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-sync',
+    '--disable-translate',
+    '--metrics-recording-only',
+    '--no-first-run',
+)
+# The new headless mode runs the regular browser without a window and
+# starts faster than the legacy --headless implementation
+HEADLESS_ARGUMENT = '--headless=new'
+
+
+def _chrome_options(headless: bool, user_data_dir: Optional[str] = None) -> Options:
+    """Chrome options for test runs"""
+    options = Options()
+    if headless:
+        options.add_argument(HEADLESS_ARGUMENT)
+    for argument in CHROME_ARGUMENTS:
+        options.add_argument(argument)
+    if user_data_dir:
+        options.add_argument(f'--user-data-dir={user_data_dir}')
+    return options
+
+
+def _build_profile_template(headless: bool) -> Optional[str]:
+    """
+    Launch and quit Chrome once against a fresh user-data-dir so it holds
+    an initialized profile; drivers then start from copies of it instead of
+    creating a profile from scratch. Returns None if Chrome cannot start
+    """
+    template_dir = tempfile.mkdtemp(prefix="chrome_profile_template_")
+    try:
+        driver = webdriver.Chrome(options=_chrome_options(headless, template_dir))
+        try:
+            driver.get("about:blank")
+        finally:
+            driver.quit()
+        return template_dir
+    except Exception as e:
+        print(f"[Parallel Executor] Could not build profile template: {e}")
+        shutil.rmtree(template_dir, ignore_errors=True)
+        return None
+
+
+def _create_driver(config: Dict[str, Any]) -> webdriver.Chrome:
+    """Start a Chrome driver with the executor's options"""
+    # Each driver gets its own copy of the warm template profile; Chrome
+    # writes to its profile in place, so copies cannot be shared or linked
+    profile_dir = None
+    template_dir = config.get('profile_template')
+    if template_dir and os.path.isdir(template_dir):
+        try:
+            profile_dir = tempfile.mkdtemp(prefix="chrome_profile_")
+            shutil.copytree(template_dir, profile_dir, symlinks=True,
+                            ignore=PROFILE_IGNORE, dirs_exist_ok=True)
+        except Exception as e:
+            print(f"[Parallel Executor] Profile copy failed, using a fresh profile: {e}")
+            if profile_dir:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+            profile_dir = None
+    
+    options = _chrome_options(config.get('headless', True), profile_dir)
+    try:
+        driver = webdriver.Chrome(options=options)
+    except Exception:
+        if profile_dir:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        raise
+    driver.set_page_load_timeout(30)
+    
+    if profile_dir:
+        with _pooled_drivers_lock:
+            _driver_profiles[driver] = profile_dir
+    return driver
+
+
+def _quit_driver(driver: webdriver.Chrome):
+    """Quit a driver and delete its copied profile"""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    with _pooled_drivers_lock:
+        profile_dir = _driver_profiles.pop(driver, None)
+    if profile_dir:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def _get_worker_driver(config: Dict[str, Any]) -> webdriver.Chrome:
+    """Return this worker's pooled driver, starting it on first use"""
+    driver = getattr(_driver_local, 'driver', None)
+    if driver is None:
+        driver = _create_driver(config)
+        _driver_local.driver = driver
+        with _pooled_drivers_lock:
+            _pooled_drivers.append(driver)
+    return driver
+
+
+def _reset_driver_state(driver: webdriver.Chrome):
+    """
+    Leave the driver as a fresh browser would be for the next test: every
+    tab the test used is closed (dropping its sessionStorage and history),
+    cookies of all origins are cleared, and so are localStorage, IndexedDB,
+    caches and service workers of every origin those tabs visited
+    """
+    origins = set()
+    stale_handles = driver.window_handles
+    driver.switch_to.new_window('tab')
+    fresh_handle = driver.current_window_handle
+    for handle in stale_handles:
+        driver.switch_to.window(handle)
+        history = driver.execute_cdp_cmd("Page.getNavigationHistory", {})
+        for entry in history.get('entries', []):
+            parts = urlsplit(entry.get('url', ''))
+            if parts.scheme in ('http', 'https'):
+                origins.add(f"{parts.scheme}://{parts.netloc}")
+        driver.close()
+    driver.switch_to.window(fresh_handle)
+    
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    for origin in origins:
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+
+def _release_worker_driver(driver: webdriver.Chrome, reusable: bool):
+    """
+    Reset the pooled driver for the next test (see _reset_driver_state)
+    Drivers that errored or cannot be reset are quit and dropped instead
+    """
+    if reusable:
+        try:
+            _reset_driver_state(driver)
+            return
+        except Exception:
+            pass
+    _driver_local.driver = None
+    with _pooled_drivers_lock:
+        if driver in _pooled_drivers:
+            _pooled_drivers.remove(driver)
+    _quit_driver(driver)
+
+
+def _get_worker_browser(config: Dict[str, Any]):
+    """Return this worker's pooled Playwright browser, launching it on first use"""
+    browser = getattr(_driver_local, 'browser', None)
+    if browser is None:
+        playwright = sync_playwright().start()
+        try:
+            browser = playwright.chromium.launch(headless=config.get('headless', True))
+        except Exception:
+            playwright.stop()
+            raise
+        _driver_local.browser = browser
+        with _pooled_drivers_lock:
+            _pooled_browsers.append((playwright, browser))
+    return browser
+
+
+def _close_thread_browser(barrier: threading.Barrier):
+    """
+    Close the Playwright browser owned by this worker thread. Its sync API
+    only works from the thread that started it, so ParallelTestExecutor
+    submits this once per worker; the barrier keeps any thread from taking
+    two of those tasks and leaving another thread's browser open
+    """
+    try:
+        barrier.wait(timeout=30)
+    except threading.BrokenBarrierError:
+        pass
+    
+    browser = getattr(_driver_local, 'browser', None)
+    if browser is None:
+        return
+    _driver_local.browser = None
+    with _pooled_drivers_lock:
+        owned = [entry for entry in _pooled_browsers if entry[1] is browser]
+        for entry in owned:
+            _pooled_browsers.remove(entry)
+    for playwright, _ in owned:
+        try:
+            browser.close()
+            playwright.stop()
+        except Exception as e:
+            print(f"[Parallel Executor] Could not close Playwright browser: {e}")
+
+
+def _quit_pooled_drivers():
+    """Quit every pooled driver and Playwright/CDP browser of this process (pool shutdown / exit)"""
+    with _pooled_drivers_lock:
+        drivers = list(_pooled_drivers)
+        _pooled_drivers.clear()
+        browsers = list(_pooled_browsers)
+        _pooled_browsers.clear()
+    for driver in drivers:
+        _quit_driver(driver)
+    # Playwright's sync API is bound to the thread that started it: worker
+    # processes run tests on their main thread, which also runs this at exit,
+    # and thread workers close theirs first with _close_thread_browser
+    for playwright, browser in browsers:
+        try:
+            browser.close()
+            playwright.stop()
+        except Exception:
+            pass
+    with _pooled_drivers_lock:
+        cdp_browsers = list(_pooled_cdp_browsers)
+        _pooled_cdp_browsers.clear()
+    for cdp_browser in cdp_browsers:
+        cdp_browser.quit()
+
+
+atexit.register(_quit_pooled_drivers)
+
+
+def _init_worker_driver(config: Dict[str, Any]):
+    """ProcessPoolExecutor initializer: start the worker's driver up front"""
+    try:
+        if config.get('engine') == 'playwright':
+            _get_worker_browser(config)
+        elif config.get('engine') == 'cdp':
+            _get_worker_cdp_browser(config)
+        else:
+            _get_worker_driver(config)
+    except Exception as e:
+        # _run_single_test retries and reports the failure per test
+        print(f"[Parallel Executor] Worker browser start failed: {e}")
+
+
+def _run_single_test(test_file: str, config: Dict[str, Any]) -> TestResult:
+    """
+    Run a single test (executed in parallel)
+    Module-level so it can be pickled into ProcessPoolExecutor workers;
+    config holds the executor settings (see ParallelTestExecutor._worker_config)
+    """
+    if config.get('engine') == 'playwright':
+        return _run_single_test_playwright(test_file, config)
+    if config.get('engine') == 'cdp':
+        return _run_single_test_cdp(test_file, config)
+    
+    test_start = datetime.now()
+    activities_executed = 0
+    activities_failed = 0
+    screenshots = []
+    error_message = None
+    status = "success"
+    
+    driver = None
+    watchdog = None
+    timed_out = threading.Event()
+    timeout = config.get('timeout_per_test', 300)
+    
+    try:
+        # Load test (parsed lazily as the loop below consumes it)
+        activities = _iter_activities(test_file)
+        
+        # Reuse this worker's browser
+        driver = _get_worker_driver(config)
+        watchdog = _start_watchdog(driver, test_file, timeout, timed_out)
+        
+        # Execute activities
+        for i, activity in enumerate(activities):
+            if timed_out.is_set():
+                break
+            try:
+                _execute_activity(driver, activity, test_file, i)
+                activities_executed += 1
+            except Exception as e:
+                activities_failed += 1
+                error_message = f"Activity {i} failed: {str(e)}"
+                status = "failed"
+                print(f"[Test {Path(test_file).name}] Activity {i} failed: {e}")
+                break
+        
+    except Exception as e:
+        status = "error"
+        error_message = f"Test execution error: {str(e)}\n{traceback.format_exc()}"
+        print(f"[Test {Path(test_file).name}] Error: {e}")
+    
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        if timed_out.is_set():
+            status = "error"
+            error_message = f"Timed out after {timeout}s"
+        if driver:
+            _release_worker_driver(driver, reusable=(status != "error"))
+    
+    test_end = datetime.now()
+    duration = (test_end - test_start).total_seconds()
+    
+    return TestResult(
+        test_file=test_file,
+        status=status,
+        start_time=test_start,
+        end_time=test_end,
+        duration_seconds=duration,
+        activities_executed=activities_executed,
+        activities_failed=activities_failed,
+        error_message=error_message,
+        screenshots_captured=screenshots
+    )
+
+
+def _start_watchdog(driver: webdriver.Chrome, test_file: str, timeout: float,
+                    timed_out: threading.Event) -> threading.Timer:
+    """
+    Quit the driver if the test is still running after timeout seconds, so
+    a hung WebDriver call fails instead of holding the worker indefinitely
+    (the worker itself stays alive and starts a new driver for its next test)
+    """
+    def abort():
+        timed_out.set()
+        print(f"[Test {Path(test_file).name}] Timed out after {timeout}s - quitting its browser")
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    
+    watchdog = threading.Timer(timeout, abort)
+    watchdog.daemon = True
+    watchdog.start()
+    return watchdog
+
+
+def _do_navigation(driver: webdriver.Chrome, details: Dict[str, Any], test_file: str, index: int):
+    """Load the URL and wait for the page"""
+    url = details.get('url', '')
+    driver.get(url)
+    _wait_for_page_load(driver)
+
+
+def _do_click(driver: webdriver.Chrome, details: Dict[str, Any], test_file: str, index: int):
+    """Click the target element"""
+    # Simple click implementation - Phase 1/2 integration would be more sophisticated
+    element = _find_element(driver, details, (test_file, index))
+    if element:
+        element.click()
+        # Links navigate: wait for the old page to go away and the new
+        # one to load; other clicks need no wait
+        if details.get('href'):
+            try:
+                WebDriverWait(driver, 5).until(EC.staleness_of(element))
+                _wait_for_page_load(driver)
+            except TimeoutException:
+                pass
+
+
+def _do_text_input(driver: webdriver.Chrome, details: Dict[str, Any], test_file: str, index: int):
+    """Replace the target field's value"""
+    element = _find_element(driver, details, (test_file, index))
+    if element:
+        value = details.get('value', '')
+        element.clear()
+        element.send_keys(value)
+
+
+def _do_wait(driver: webdriver.Chrome, details: Dict[str, Any], test_file: str, index: int):
+    """Pause for the recorded duration"""
+    duration = details.get('duration', 1)
+    time.sleep(duration)
+
+
+# Replayable actions -> handler(driver, details, test_file, index); add more
+# action types here. Module-level so spawned workers get it on import
+ACTION_HANDLERS = {
+    'navigation': _do_navigation,
+    'click': _do_click,
+    'text_input': _do_text_input,
+    'wait': _do_wait,
+}
+
+
+def _execute_activity(driver: webdriver.Chrome, activity: Dict[str, Any], test_file: str, index: int):
+    """
+    Execute a single activity
+    Recorded logs also hold actions with nothing to replay (hover,
+    modal_detected, tab events, ...); those are skipped
+    """
+    handler = ACTION_HANDLERS.get(activity.get('action', ''))
+    if handler is not None:
+        handler(driver, activity.get('details', {}), test_file, index)
+
+
+def _wait_for_page_load(driver: webdriver.Chrome, timeout: float = 10):
+    """Wait until document.readyState is complete (no-op once it already is)"""
+    try:
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+    except TimeoutException:
+        pass
+
+
+# How long _find_element keeps retrying before an element counts as missing
+ELEMENT_WAIT_TIMEOUT = 10
+
+
+# Winning (By, selector) per (test_file, activity index), most recent last;
+# re-runs try it before walking the strategy chain again
+LOCATOR_CACHE_SIZE = 1024
+_locator_cache: "OrderedDict[Tuple[str, int], Tuple[str, str]]" = OrderedDict()
+_locator_cache_lock = threading.Lock()
+
+
+def _xpath_literal(text: str) -> str:
+    """Quote text as an XPath string literal (concat() when it has both quote kinds)"""
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    parts = text.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def _locator_strategies(details: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(By, selector) pairs to try, in order: ID, CSS, text content"""
+    locators = details.get('locators', {})
+    strategies = []
+    if 'id' in locators:
+        strategies.append((By.ID, locators['id']))
+    if 'css' in locators:
+        strategies.append((By.CSS_SELECTOR, locators['css']))
+    if 'text' in details:
+        strategies.append((By.XPATH, f"//*[contains(text(), {_xpath_literal(details['text'])})]"))
+    return strategies
+
+
+def _ordered_strategies(details: Dict[str, Any], cache_key: Optional[Tuple[str, int]]) -> List[Tuple[str, str]]:
+    """_locator_strategies, with the one that last worked for cache_key first"""
+    strategies = _locator_strategies(details)
+    if cache_key is not None:
+        with _locator_cache_lock:
+            cached = _locator_cache.get(cache_key)
+        if cached in strategies:
+            strategies.remove(cached)
+            strategies.insert(0, cached)
+    return strategies
+
+
+def _remember_locator(cache_key: Optional[Tuple[str, int]], strategy: Tuple[str, str]):
+    """Record the strategy that found the element for cache_key (LRU)"""
+    if cache_key is None:
+        return
+    with _locator_cache_lock:
+        _locator_cache[cache_key] = strategy
+        _locator_cache.move_to_end(cache_key)
+        if len(_locator_cache) > LOCATOR_CACHE_SIZE:
+            _locator_cache.popitem(last=False)
+
+
+# Tries each [By, selector] pair in order inside the page and returns
+# [element, index] for the first match (null if none), so a whole strategy
+# chain costs one WebDriver round trip instead of one per strategy
+FIND_ELEMENT_JS = """
+var strategies = arguments[0];
+for (var i = 0; i < strategies.length; i++) {
+    var by = strategies[i][0], selector = strategies[i][1], el = null;
+    try {
+        if (by === 'id') {
+            el = document.getElementById(selector);
+        } else if (by === 'css selector') {
+            el = document.querySelector(selector);
+        } else if (by === 'xpath') {
+            el = document.evaluate(selector, document, null,
+                XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        }
+    } catch (e) {
+        el = null;
+    }
+    if (el && el.nodeType === 1) return [el, i];
+}
+return null;
+"""
+
+
+def _find_element(
+    driver: webdriver.Chrome,
+    details: Dict[str, Any],
+    cache_key: Optional[Tuple[str, int]] = None,
+    timeout: float = ELEMENT_WAIT_TIMEOUT
+):
+    """
+    Find element using available locators (all tried in one script call)
+    The lookup is retried until timeout, so elements that appear after the
+    previous step (modals, content loaded over XHR) are waited for
+    With cache_key, the strategy that worked last time for this activity is
+    tried first and the winner is remembered
+    """
+    strategies = _ordered_strategies(details, cache_key)
+    
+    def locate(d):
+        try:
+            return d.execute_script(FIND_ELEMENT_JS, strategies)
+        except WebDriverException:
+            # Script errors count as "not found"; a dead driver (connection
+            # errors) propagates and fails the test
+            return None
+    
+    found = None
+    if strategies:
+        try:
+            found = WebDriverWait(driver, timeout, poll_frequency=0.1).until(locate)
+        except TimeoutException:
+            found = None
+    
+    if found:
+        _remember_locator(cache_key, strategies[int(found[1])])
+        return found[0]
+    
+    raise Exception(f"Could not find element with locators: {details.get('locators', {})}")
+
+
+def _run_single_test_playwright(test_file: str, config: Dict[str, Any]) -> TestResult:
+    """Run a single test in a fresh BrowserContext of the worker's Playwright browser"""
+    test_start = datetime.now()
+    activities_executed = 0
+    activities_failed = 0
+    error_message = None
+    status = "success"
+    
+    context = None
+    # Playwright's sync API cannot be used from a watchdog thread, so the
+    # deadline is checked between activities
+    timeout = config.get('timeout_per_test', 300)
+    deadline = time.time() + timeout
+    
+    try:
+        # Load test (parsed lazily as the loop below consumes it)
+        activities = _iter_activities(test_file)
+        
+        # A context isolates cookies/storage like a new browser, at a
+        # fraction of the startup cost
+        context = _get_worker_browser(config).new_context()
+        page = context.new_page()
+        page.set_default_navigation_timeout(30000)
+        
+        # Execute activities
+        for i, activity in enumerate(activities):
+            if time.time() > deadline:
+                status = "error"
+                error_message = f"Timed out after {timeout}s"
+                break
+            try:
+                _execute_activity_playwright(page, activity)
+                activities_executed += 1
+            except Exception as e:
+                activities_failed += 1
+                error_message = f"Activity {i} failed: {str(e)}"
+                status = "failed"
+                print(f"[Test {Path(test_file).name}] Activity {i} failed: {e}")
+                break
+        
+    except Exception as e:
+        status = "error"
+        error_message = f"Test execution error: {str(e)}\n{traceback.format_exc()}"
+        print(f"[Test {Path(test_file).name}] Error: {e}")
+    
+    finally:
+        if context:
+            try:
+                context.close()
+            except Exception:
+                pass
+    
+    test_end = datetime.now()
+    duration = (test_end - test_start).total_seconds()
+    
+    return TestResult(
+        test_file=test_file,
+        status=status,
+        start_time=test_start,
+        end_time=test_end,
+        duration_seconds=duration,
+        activities_executed=activities_executed,
+        activities_failed=activities_failed,
+        error_message=error_message
+    )
+
+
+def _execute_activity_playwright(page, activity: Dict[str, Any]):
+    """Execute a single activity on a Playwright page"""
+    action = activity.get('action', '')
+    details = activity.get('details', {})
+    
+    if action == 'navigation':
+        page.goto(details.get('url', ''))
+    
+    elif action == 'click':
+        _find_locator(page, details).click()
+    
+    elif action == 'text_input':
+        _find_locator(page, details).fill(details.get('value', ''))
+    
+    elif action == 'wait':
+        page.wait_for_timeout(details.get('duration', 1) * 1000)
+
+
+def _locator_candidates(page, details: Dict[str, Any]) -> List[Any]:
+    """Playwright locators for an activity's target, in priority order: id, CSS, text"""
+    locators = details.get('locators', {})
+    
+    candidates = []
+    if 'id' in locators:
+        candidates.append(page.locator(f"id={locators['id']}"))
+    if 'css' in locators:
+        candidates.append(page.locator(locators['css']))
+    if 'text' in details:
+        candidates.append(page.get_by_text(details['text']))
+    return candidates
+
+
+def _any_of(candidates: List[Any]):
+    """One locator matching whatever any of the candidates matches"""
+    combined = candidates[0]
+    for locator in candidates[1:]:
+        combined = combined.or_(locator)
+    return combined.first
+
+
+def _find_locator(page, details: Dict[str, Any]):
+    """
+    Playwright counterpart of _find_element: id, then CSS, then text
+    Waits up to ELEMENT_WAIT_TIMEOUT for any of them to be attached, so
+    elements that appear after the previous step are found
+    """
+    candidates = _locator_candidates(page, details)
+    if candidates:
+        try:
+            _any_of(candidates).wait_for(state="attached", timeout=ELEMENT_WAIT_TIMEOUT * 1000)
+        except PlaywrightError:
+            pass
+    
+    for locator in candidates:
+        try:
+            if locator.count() > 0:
+                return locator.first
+        except PlaywrightError:
+            pass
+    
+    raise Exception(f"Could not find element with locators: {details.get('locators', {})}")
+
+
+async def _run_single_test_async(browser, test_file: str, semaphore: "asyncio.Semaphore",
+                                 timeout: float) -> TestResult:
+    """
+    Async counterpart of _run_single_test_playwright: one BrowserContext of
+    the shared browser, started once the semaphore admits this test
+    """
+    async with semaphore:
+        test_start = datetime.now()
+        activities_executed = 0
+        activities_failed = 0
+        error_message = None
+        status = "success"
+        
+        context = None
+        deadline = time.time() + timeout
+        
+        try:
+            # Load test (parsed lazily as the loop below consumes it)
+            activities = _iter_activities(test_file)
+            
+            context = await browser.new_context()
+            page = await context.new_page()
+            page.set_default_navigation_timeout(30000)
+            
+            # Execute activities
+            for i, activity in enumerate(activities):
+                try:
+                    await asyncio.wait_for(
+                        _execute_activity_async(page, activity),
+                        max(0, deadline - time.time())
+                    )
+                    activities_executed += 1
+                except asyncio.TimeoutError:
+                    status = "error"
+                    error_message = f"Timed out after {timeout}s"
+                    print(f"[Test {Path(test_file).name}] Timed out after {timeout}s")
+                    break
+                except Exception as e:
+                    activities_failed += 1
+                    error_message = f"Activity {i} failed: {str(e)}"
+                    status = "failed"
+                    print(f"[Test {Path(test_file).name}] Activity {i} failed: {e}")
+                    break
+            
+        except Exception as e:
+            status = "error"
+            error_message = f"Test execution error: {str(e)}\n{traceback.format_exc()}"
+            print(f"[Test {Path(test_file).name}] Error: {e}")
+        
+        finally:
+            if context:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+        
+        test_end = datetime.now()
+        duration = (test_end - test_start).total_seconds()
+        
+        return TestResult(
+            test_file=test_file,
+            status=status,
+            start_time=test_start,
+            end_time=test_end,
+            duration_seconds=duration,
+            activities_executed=activities_executed,
+            activities_failed=activities_failed,
+            error_message=error_message
+        )
+
+
+async def _execute_activity_async(page, activity: Dict[str, Any]):
+    """Execute a single activity on an async Playwright page"""
+    action = activity.get('action', '')
+    details = activity.get('details', {})
+    
+    if action == 'navigation':
+        await page.goto(details.get('url', ''))
+    
+    elif action == 'click':
+        await (await _find_locator_async(page, details)).click()
+    
+    elif action == 'text_input':
+        await (await _find_locator_async(page, details)).fill(details.get('value', ''))
+    
+    elif action == 'wait':
+        await page.wait_for_timeout(details.get('duration', 1) * 1000)
+
+
+async def _find_locator_async(page, details: Dict[str, Any]):
+    """Async counterpart of _find_locator: id, then CSS, then text, waited for"""
+    candidates = _locator_candidates(page, details)
+    if candidates:
+        try:
+            await _any_of(candidates).wait_for(state="attached", timeout=ELEMENT_WAIT_TIMEOUT * 1000)
+        except PlaywrightError:
+            pass
+    
+    for locator in candidates:
+        try:
+            if await locator.count() > 0:
+                return locator.first
+        except PlaywrightError:
+            pass
+    
+    raise Exception(f"Could not find element with locators: {details.get('locators', {})}")
+
+
+# Chrome executables tried, in order, when CHROME_BINARY is not set
+CHROME_BINARY_NAMES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+
+# Runtime.evaluate counterpart of FIND_ELEMENT_JS for the CDP engine: takes
+# the strategies and whether to focus and clear the element, scrolls the
+# match into view and returns its center point and the winning index
+CDP_LOCATE_JS = """
+(function(strategies, focusAndClear) {
+    var found = (function() {
+""" + FIND_ELEMENT_JS + """
+    }).apply(null, [strategies]);
+    if (!found) return null;
+    var el = found[0];
+    el.scrollIntoView({block: 'center', inline: 'center'});
+    if (focusAndClear) {
+        el.focus();
+        if ('value' in el) {
+            el.value = '';
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+        }
+    }
+    var rect = el.getBoundingClientRect();
+    return {x: rect.left + rect.width / 2, y: rect.top + rect.height / 2, index: found[1]};
+})
+"""
+
+
+class CdpConnection:
+    """Minimal synchronous DevTools protocol client over one websocket (events are ignored)"""
+    
+    def __init__(self, ws_url: str, timeout: float = 30):
+        # No Origin header, so Chrome accepts the connection without
+        # --remote-allow-origins
+        self._ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self._next_id = 0
+    
+    def send(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send a command and return its result, skipping events that arrive first"""
+        self._next_id += 1
+        message_id = self._next_id
+        self._ws.send(json.dumps({'id': message_id, 'method': method, 'params': params or {}}))
+        while True:
+            raw = self._ws.recv()
+            message = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+            if message.get('id') == message_id:
+                if 'error' in message:
+                    raise Exception(f"CDP {method} failed: {message['error'].get('message')}")
+                return message.get('result', {})
+    
+    def evaluate(self, expression: str) -> Any:
+        """Evaluate a JS expression in the page and return its value"""
+        result = self.send('Runtime.evaluate', {'expression': expression, 'returnByValue': True})
+        if 'exceptionDetails' in result:
+            raise Exception(f"Script error: {result['exceptionDetails'].get('text')}")
+        return result.get('result', {}).get('value')
+    
+    def close(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+
+class CdpBrowser:
+    """
+    One headless Chrome per worker, driven over CDP without ChromeDriver
+    Each test gets its own browser context (cookies/storage) and page
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        binary = os.environ.get('CHROME_BINARY') or next(
+            (path for path in map(shutil.which, CHROME_BINARY_NAMES) if path), None
+        )
+        if not binary:
+            raise Exception("No Chrome executable found for the CDP engine (set CHROME_BINARY)")
+        
+        self.profile_dir = tempfile.mkdtemp(prefix="chrome_cdp_")
+        args = [binary, '--remote-debugging-port=0', f'--user-data-dir={self.profile_dir}']
+        if config.get('headless', True):
+            args.append(HEADLESS_ARGUMENT)
+        args.extend(CHROME_ARGUMENTS)
+        args.append('about:blank')
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        try:
+            # Chrome writes the port it picked and the browser endpoint path
+            port_file = Path(self.profile_dir) / 'DevToolsActivePort'
+            deadline = time.time() + 30
+            lines = []
+            while len(lines) < 2:
+                if self.process.poll() is not None or time.time() > deadline:
+                    raise Exception("Chrome did not open its DevTools port")
+                try:
+                    lines = port_file.read_text().split()
+                except FileNotFoundError:
+                    pass
+                time.sleep(0.05)
+            self.port = lines[0]
+            self.connection = CdpConnection(f"ws://127.0.0.1:{self.port}{lines[1]}")
+        except Exception:
+            self.quit()
+            raise
+    
+    def new_page(self) -> Tuple[str, CdpConnection]:
+        """Open a page in a fresh browser context; returns (context id, page connection)"""
+        context_id = self.connection.send('Target.createBrowserContext')['browserContextId']
+        target_id = self.connection.send('Target.createTarget', {
+            'url': 'about:blank',
+            'browserContextId': context_id
+        })['targetId']
+        return context_id, CdpConnection(f"ws://127.0.0.1:{self.port}/devtools/page/{target_id}")
+    
+    def close_context(self, context_id: str):
+        """Dispose a test's browser context and its pages"""
+        self.connection.send('Target.disposeBrowserContext', {'browserContextId': context_id})
+    
+    def quit(self):
+        """Stop Chrome and delete its profile"""
+        connection = getattr(self, 'connection', None)
+        if connection:
+            connection.close()
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+        except Exception:
+            try:
+                self.process.kill()
+            except Exception:
+                pass
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+def _get_worker_cdp_browser(config: Dict[str, Any]) -> CdpBrowser:
+    """Return this worker's pooled CDP browser, launching it on first use"""
+    cdp_browser = getattr(_driver_local, 'cdp_browser', None)
+    if cdp_browser is None:
+        cdp_browser = CdpBrowser(config)
+        _driver_local.cdp_browser = cdp_browser
+        with _pooled_drivers_lock:
+            _pooled_cdp_browsers.append(cdp_browser)
+    return cdp_browser
+
+
+def _drop_worker_cdp_browser(cdp_browser: CdpBrowser):
+    """Quit a CDP browser that errored; the next test launches a new one"""
+    _driver_local.cdp_browser = None
+    with _pooled_drivers_lock:
+        if cdp_browser in _pooled_cdp_browsers:
+            _pooled_cdp_browsers.remove(cdp_browser)
+    cdp_browser.quit()
+
+
+def _run_single_test_cdp(test_file: str, config: Dict[str, Any]) -> TestResult:
+    """Run a single test in a fresh browser context of the worker's CDP browser"""
+    test_start = datetime.now()
+    activities_executed = 0
+    activities_failed = 0
+    error_message = None
+    status = "success"
+    
+    cdp_browser = None
+    context_id = None
+    page = None
+    # Each command times out on its own (CdpConnection timeout); the test
+    # deadline is checked between activities
+    timeout = config.get('timeout_per_test', 300)
+    deadline = time.time() + timeout
+    
+    try:
+        # Load test (parsed lazily as the loop below consumes it)
+        activities = _iter_activities(test_file)
+        
+        cdp_browser = _get_worker_cdp_browser(config)
+        context_id, page = cdp_browser.new_page()
+        
+        # Execute activities
+        for i, activity in enumerate(activities):
+            if time.time() > deadline:
+                status = "error"
+                error_message = f"Timed out after {timeout}s"
+                break
+            try:
+                _execute_activity_cdp(page, activity, test_file, i)
+                activities_executed += 1
+            except Exception as e:
+                activities_failed += 1
+                error_message = f"Activity {i} failed: {str(e)}"
+                status = "failed"
+                print(f"[Test {Path(test_file).name}] Activity {i} failed: {e}")
+                break
+        
+    except Exception as e:
+        status = "error"
+        error_message = f"Test execution error: {str(e)}\n{traceback.format_exc()}"
+        print(f"[Test {Path(test_file).name}] Error: {e}")
+    
+    finally:
+        if page:
+            page.close()
+        if cdp_browser:
+            try:
+                if context_id:
+                    cdp_browser.close_context(context_id)
+                if status == "error":
+                    _drop_worker_cdp_browser(cdp_browser)
+            except Exception:
+                _drop_worker_cdp_browser(cdp_browser)
+    
+    test_end = datetime.now()
+    duration = (test_end - test_start).total_seconds()
+    
+    return TestResult(
+        test_file=test_file,
+        status=status,
+        start_time=test_start,
+        end_time=test_end,
+        duration_seconds=duration,
+        activities_executed=activities_executed,
+        activities_failed=activities_failed,
+        error_message=error_message
+    )
+
+
+def _cdp_do_navigation(page: CdpConnection, details: Dict[str, Any], test_file: str, index: int):
+    """Load the URL and wait for the page"""
+    result = page.send('Page.navigate', {'url': details.get('url', '')})
+    if result.get('errorText'):
+        raise Exception(f"Navigation failed: {result['errorText']}")
+    _cdp_wait_for_page_load(page)
+
+
+def _cdp_do_click(page: CdpConnection, details: Dict[str, Any], test_file: str, index: int):
+    """Click the target element with real mouse events"""
+    point = _cdp_locate(page, details, (test_file, index), focus_and_clear=False)
+    old_url = page.evaluate("location.href")
+    for event_type in ('mouseMoved', 'mousePressed', 'mouseReleased'):
+        page.send('Input.dispatchMouseEvent', {
+            'type': event_type,
+            'x': point['x'],
+            'y': point['y'],
+            'button': 'left',
+            'clickCount': 1
+        })
+    # Links navigate: wait for the URL to change and the new page to load
+    if details.get('href'):
+        end = time.time() + 5
+        while time.time() < end and page.evaluate("location.href") == old_url:
+            time.sleep(0.05)
+        _cdp_wait_for_page_load(page)
+
+
+def _cdp_do_text_input(page: CdpConnection, details: Dict[str, Any], test_file: str, index: int):
+    """Replace the target field's value"""
+    _cdp_locate(page, details, (test_file, index), focus_and_clear=True)
+    page.send('Input.insertText', {'text': details.get('value', '')})
+
+
+# ACTION_HANDLERS for the CDP engine: handler(page, details, test_file, index)
+CDP_ACTION_HANDLERS = {
+    'navigation': _cdp_do_navigation,
+    'click': _cdp_do_click,
+    'text_input': _cdp_do_text_input,
+    'wait': _do_wait,
+}
+
+
+def _execute_activity_cdp(page: CdpConnection, activity: Dict[str, Any], test_file: str, index: int):
+    """Execute a single activity over CDP; actions without a handler are skipped"""
+    handler = CDP_ACTION_HANDLERS.get(activity.get('action', ''))
+    if handler is not None:
+        handler(page, activity.get('details', {}), test_file, index)
+
+
+def _cdp_locate(page: CdpConnection, details: Dict[str, Any], cache_key: Tuple[str, int],
+                focus_and_clear: bool) -> Dict[str, float]:
+    """
+    CDP counterpart of _find_element: returns the element's center point
+    Like it, retries every 0.1 s for up to ELEMENT_WAIT_TIMEOUT so elements
+    that appear after the previous step are waited for
+    """
+    strategies = _ordered_strategies(details, cache_key)
+    point = None
+    if strategies:
+        expression = f"{CDP_LOCATE_JS}({json.dumps(strategies)}, {'true' if focus_and_clear else 'false'})"
+        deadline = time.monotonic() + ELEMENT_WAIT_TIMEOUT
+        while True:
+            point = page.evaluate(expression)
+            if point or time.monotonic() >= deadline:
+                break
+            time.sleep(0.1)
+    if not point:
+        raise Exception(f"Could not find element with locators: {details.get('locators', {})}")
+    _remember_locator(cache_key, strategies[int(point['index'])])
+    return point
+
+
+def _cdp_wait_for_page_load(page: CdpConnection, timeout: float = 10):
+    """Wait until document.readyState is complete (gives up quietly after timeout)"""
+    end = time.time() + timeout
+    while time.time() < end:
+        if page.evaluate("document.readyState") == "complete":
+            return
+        time.sleep(0.05)
+
+
 class ParallelTestExecutor:
     """
     Execute multiple browser tests in parallel
-    Supports both threading (I/O-bound) and multiprocessing (CPU-bound)
+    Supports both multiprocessing (default, no GIL contention between
+    workers) and threading
     """
     
     def __init__(
         self,
-        max_workers: int = 4,
+        max_workers: Optional[int] = 4,
         headless: bool = True,
-        use_multiprocessing: bool = False,
+        use_multiprocessing: bool = True,
         timeout_per_test: int = 300,
-        output_dir: str = "parallel_test_results"
+        output_dir: str = "parallel_test_results",
+        engine: str = "selenium",
+        runtime_log_path: Optional[str] = None,
+        use_profile_template: bool = True
     ):
         """
         Initialize parallel test executor
         
         Args:
-            max_workers: Number of parallel test executions
+            max_workers: Upper bound on parallel test executions, or None
+                to size the pool from CPU count and available memory only
             headless: Run browsers in headless mode
-            use_multiprocessing: Use processes instead of threads (more isolated)
+            use_multiprocessing: Use processes instead of threads (more isolated,
+                and worker-side Python work is not serialized by the GIL)
             timeout_per_test: Timeout for each test in seconds
             output_dir: Directory to store test results and screenshots
+            engine: "selenium" (Chrome driver per worker), "playwright"
+                (one browser per worker, new BrowserContext per test) or
+                "playwright-async" (tests as coroutines sharing one browser;
+                many more concurrent tests per GB, max_workers bounds them)
+                or "cdp" (Chrome per worker driven over the DevTools
+                protocol without ChromeDriver, new browser context per test)
+            runtime_log_path: JSON file of per-test durations from earlier
+                runs; when set, tests are started slowest first so the
+                workers finish at about the same time, and the file is
+                updated after each run
+            use_profile_template: Initialize one Chrome profile up front and
+                start every driver from a copy of it (Selenium engine only)
         """
         self.max_workers = max_workers
         self.headless = headless
@@ -128,10 +1371,36 @@ class ParallelTestExecutor:
         self.timeout_per_test = timeout_per_test
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.runtime_log_path = Path(runtime_log_path) if runtime_log_path else None
+        
+        if engine in ("playwright", "playwright-async") and not PLAYWRIGHT_AVAILABLE:
+            print("[Parallel Executor] Playwright not installed - falling back to Selenium")
+            engine = "selenium"
+        if engine == "cdp" and not WEBSOCKET_AVAILABLE:
+            print("[Parallel Executor] websocket-client not installed - falling back to Selenium")
+            engine = "selenium"
+        self.engine = engine
         
-        print(f"[Parallel Executor] Initialized with {max_workers} workers")
+        # Warm profile the workers' drivers are copied from, removed at exit
+        profile_template = None
+        if use_profile_template and engine == "selenium":
+            profile_template = _build_profile_template(headless)
+            if profile_template:
+                atexit.register(shutil.rmtree, profile_template, True)
+        
+        # Plain, picklable settings handed to each worker instead of self
+        self._worker_config = {
+            'headless': headless,
+            'timeout_per_test': timeout_per_test,
+            'output_dir': str(self.output_dir),
+            'engine': engine,
+            'profile_template': profile_template
+        }
+        
+        print(f"[Parallel Executor] Initialized with {max_workers or 'auto'} workers")
         print(f"[Parallel Executor] Mode: {'Multiprocessing' if use_multiprocessing else 'Threading'}")
         print(f"[Parallel Executor] Headless: {headless}")
+        print(f"[Parallel Executor] Engine: {self.engine}")
     
     def run_tests(
         self,
@@ -149,44 +1418,104 @@ class ParallelTestExecutor:
             ParallelExecutionSummary with results
         """
         print(f"\n[Parallel Executor] Starting parallel execution of {len(test_files)} tests...")
-        print(f"[Parallel Executor] Max workers: {self.max_workers}")
+        workers = self._effective_workers(len(test_files))
+        print(f"[Parallel Executor] Workers: {workers} (max {self.max_workers or 'auto'})")
         
         start_time = datetime.now()
         results = []
         
-        # Choose executor type
-        ExecutorClass = ProcessPoolExecutor if self.use_multiprocessing else ThreadPoolExecutor
+        # Each completed test is appended to a JSONL file right away, so a
+        # killed run keeps everything finished so far; the small summary
+        # file is written once at the end
+        self._run_timestamp = start_time.strftime("%Y%m%d_%H%M%S")
+        run_name = f"parallel_execution_{self._run_timestamp}"
+        self._results_jsonl = self.output_dir / f"{run_name}.jsonl"
+        self._result_file = self.output_dir / f"{run_name}.summary.json"
         
-        with ExecutorClass(max_workers=self.max_workers) as executor:
-            # Submit all tests
-            future_to_test = {
-                executor.submit(self._run_single_test, test_file): test_file
-                for test_file in test_files
-            }
+        # Completed results are persisted by a writer thread so disk IO
+        # never holds up collecting the next result
+        write_queue = queue.Queue()
+        writer = threading.Thread(
+            target=self._writer_loop,
+            args=(write_queue,),
+            name="results-writer",
+            daemon=True
+        )
+        writer.start()
+        
+        if self.engine == "playwright-async":
+            # I/O-bound tests as coroutines in this process, no worker pool
+            asyncio.run(self._run_tests_async(test_files, workers, results, write_queue))
+        else:
+            # Choose executor type; worker processes are spawned rather than
+            # forked so they do not inherit driver/Chrome state from this process
+            if self.use_multiprocessing:
+                executor_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker_driver,
+                    initargs=(self._worker_config,)
+                )
+            else:
+                executor_pool = ThreadPoolExecutor(max_workers=workers)
             
-            # Collect results as they complete
-            for future in as_completed(future_to_test):
-                test_file = future_to_test[future]
-                try:
-                    result = future.result(timeout=self.timeout_per_test)
-                    results.append(result)
-                    
-                    status_icon = "✅" if result.status == "success" else "❌"
-                    print(f"[Parallel Executor] {status_icon} {Path(test_file).name} completed in {result.duration_seconds:.1f}s")
+            with executor_pool as executor:
+                # Submit all tests one per task, so each result is written as
+                # soon as its test ends; with a runtime log the slowest go
+                # first, and every worker that frees up takes the next
+                # slowest, so no worker is left with all the slow ones
+                if self.runtime_log_path:
+                    test_files = self._longest_first(test_files)
+                    print(f"[Parallel Executor] Ordered slowest first using {self.runtime_log_path}")
+                
+                future_to_test = {
+                    executor.submit(_run_single_test, test_file, self._worker_config): test_file
+                    for test_file in test_files
+                }
+                
+                # Collect results as they complete
+                for future in as_completed(future_to_test):
+                    test_file = future_to_test[future]
+                    try:
+                        # Already done: per-test timeouts are enforced inside
+                        # the workers (see _start_watchdog)
+                        result = future.result()
+                        
+                        status_icon = "✅" if result.status == "success" else "❌"
+                        print(f"[Parallel Executor] {status_icon} {Path(result.test_file).name} completed in {result.duration_seconds:.1f}s")
+                        
+                    except Exception as e:
+                        result = TestResult(
+                            test_file=test_file,
+                            status="error",
+                            start_time=datetime.now(),
+                            end_time=datetime.now(),
+                            duration_seconds=0,
+                            activities_executed=0,
+                            activities_failed=0,
+                            error_message=f"Execution error: {str(e)}"
+                        )
+                        print(f"[Parallel Executor] ❌ {Path(test_file).name} error: {e}")
                     
-                except Exception as e:
-                    error_result = TestResult(
-                        test_file=test_file,
-                        status="error",
-                        start_time=datetime.now(),
-                        end_time=datetime.now(),
-                        duration_seconds=0,
-                        activities_executed=0,
-                        activities_failed=0,
-                        error_message=f"Execution error: {str(e)}"
-                    )
-                    results.append(error_result)
-                    print(f"[Parallel Executor] ❌ {Path(test_file).name} error: {e}")
+                    results.append(result)
+                    write_queue.put(result)
+                
+                # Thread workers close their own Playwright browsers, on the
+                # thread that started them
+                if not self.use_multiprocessing and self.engine == "playwright":
+                    barrier = threading.Barrier(workers)
+                    for close_future in [executor.submit(_close_thread_browser, barrier) for _ in range(workers)]:
+                        close_future.result()
+            
+        # Let the writer finish its pending writes before the final save
+        write_queue.put(_WRITER_SENTINEL)
+        writer.join()
+        
+        # Thread workers share this process, so their remaining pooled
+        # drivers and browsers are closed here; worker processes close
+        # theirs when they exit
+        if not self.use_multiprocessing and self.engine != "playwright-async":
+            _quit_pooled_drivers()
         
         end_time = datetime.now()
         total_duration = (end_time - start_time).total_seconds()
@@ -196,135 +1525,40 @@ class ParallelTestExecutor:
         
         # Save results
         self._save_results(summary)
+        if self.runtime_log_path:
+            self._update_runtime_log(results)
         
         return summary
     
-    def _run_single_test(self, test_file: str) -> TestResult:
-        """Run a single test (executed in parallel)"""
-        test_start = datetime.now()
-        activities_executed = 0
-        activities_failed = 0
-        screenshots = []
-        error_message = None
-        status = "success"
-        
-        driver = None
-        
-        try:
-            # Load test
-            with open(test_file, 'r') as f:
-                activities = json.load(f)
-            
-            # Setup browser
-            options = Options()
-            if self.headless:
-                options.add_argument('--headless')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            
-            driver = webdriver.Chrome(options=options)
-            driver.set_page_load_timeout(30)
-            
-            # Execute activities
-            for i, activity in enumerate(activities):
-                try:
-                    self._execute_activity(driver, activity, test_file, i)
-                    activities_executed += 1
-                except Exception as e:
-                    activities_failed += 1
-                    error_message = f"Activity {i} failed: {str(e)}"
-                    status = "failed"
-                    print(f"[Test {Path(test_file).name}] Activity {i} failed: {e}")
-                    break
-            
-        except Exception as e:
-            status = "error"
-            error_message = f"Test execution error: {str(e)}\n{traceback.format_exc()}"
-            print(f"[Test {Path(test_file).name}] Error: {e}")
-        
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
-        
-        test_end = datetime.now()
-        duration = (test_end - test_start).total_seconds()
-        
-        return TestResult(
-            test_file=test_file,
-            status=status,
-            start_time=test_start,
-            end_time=test_end,
-            duration_seconds=duration,
-            activities_executed=activities_executed,
-            activities_failed=activities_failed,
-            error_message=error_message,
-            screenshots_captured=screenshots
-        )
-    
-    def _execute_activity(self, driver: webdriver.Chrome, activity: Dict[str, Any], test_file: str, index: int):
-        """Execute a single activity"""
-        action = activity.get('action', '')
-        details = activity.get('details', {})
-        
-        if action == 'navigation':
-            url = details.get('url', '')
-            driver.get(url)
-            time.sleep(1)  # Brief wait for page load
-        
-        elif action == 'click':
-            # Simple click implementation - Phase 1/2 integration would be more sophisticated
-            element = self._find_element(driver, details)
-            if element:
-                element.click()
-                time.sleep(0.5)
-        
-        elif action == 'text_input':
-            element = self._find_element(driver, details)
-            if element:
-                value = details.get('value', '')
-                element.clear()
-                element.send_keys(value)
-                time.sleep(0.3)
-        
-        elif action == 'wait':
-            duration = details.get('duration', 1)
-            time.sleep(duration)
-        
-        # Add more action types as needed
-    
-    def _find_element(self, driver: webdriver.Chrome, details: Dict[str, Any]):
-        """Find element using available locators"""
-        from selenium.webdriver.common.by import By
-        
-        # Try multiple selector strategies
-        locators = details.get('locators', {})
-        
-        # Try ID
-        if 'id' in locators:
-            try:
-                return driver.find_element(By.ID, locators['id'])
-            except:
-                pass
-        
-        # Try CSS
-        if 'css' in locators:
-            try:
-                return driver.find_element(By.CSS_SELECTOR, locators['css'])
-            except:
-                pass
-        
-        # Try text content
-        if 'text' in details:
+    async def _run_tests_async(
+        self,
+        test_files: List[str],
+        concurrency: int,
+        results: List[TestResult],
+        write_queue: "queue.Queue"
+    ):
+        """Run tests on one async Playwright browser, at most `concurrency` at a time"""
+        semaphore = asyncio.Semaphore(concurrency)
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=self.headless)
             try:
-                return driver.find_element(By.XPATH, f"//*[contains(text(), '{details['text']}')]")
-            except:
-                pass
-        
-        raise Exception(f"Could not find element with locators: {locators}")
+                tasks = [
+                    asyncio.ensure_future(_run_single_test_async(
+                        browser, test_file, semaphore, self.timeout_per_test
+                    ))
+                    for test_file in test_files
+                ]
+                
+                # Collect results as they complete
+                for task in asyncio.as_completed(tasks):
+                    result = await task
+                    results.append(result)
+                    write_queue.put(result)
+                    
+                    status_icon = "✅" if result.status == "success" else "❌"
+                    print(f"[Parallel Executor] {status_icon} {Path(result.test_file).name} completed in {result.duration_seconds:.1f}s")
+            finally:
+                await browser.close()
     
     def _create_summary(self, results: List[TestResult], total_duration: float) -> ParallelExecutionSummary:
         """Create execution summary"""
@@ -355,30 +1589,126 @@ class ParallelTestExecutor:
             test_results=results
         )
     
+    def _effective_workers(self, num_tests: int) -> int:
+        """
+        Number of workers for this run: no more than max_workers, the number
+        of tests, the CPU count, or the Chrome instances that fit in memory
+        """
+        # Async tests wait on the browser, not the CPU, and each one only
+        # costs a BrowserContext rather than a whole Chrome
+        is_async = self.engine == "playwright-async"
+        
+        limits = [max(1, num_tests)]
+        if not is_async:
+            limits.append(os.cpu_count() or 1)
+        if self.max_workers:
+            limits.append(self.max_workers)
+        
+        available = _available_memory_bytes()
+        if available is not None:
+            per_test = CONTEXT_MEMORY_BYTES if is_async else CHROME_MEMORY_BYTES
+            limits.append(max(1, available // per_test))
+        
+        return min(limits)
+    
+    def _load_runtime_log(self) -> Dict[str, float]:
+        """Per-test durations in seconds from the runtime log ({} if absent)"""
+        try:
+            if self.runtime_log_path.exists():
+                return _load_json_file(self.runtime_log_path)
+        except Exception as e:
+            print(f"[Parallel Executor] Could not read runtime log: {e}")
+        return {}
+    
+    def _longest_first(self, test_files: List[str]) -> List[str]:
+        """
+        test_files sorted by logged runtime, slowest first. Handed to the
+        pool in this order they are scheduled longest-processing-time first,
+        as each test goes to whichever worker frees up next. Tests missing
+        from the runtime log count as the average logged duration
+        """
+        durations = self._load_runtime_log()
+        known = [durations[f] for f in test_files if f in durations]
+        default = sum(known) / len(known) if known else 1.0
+        
+        return sorted(test_files, key=lambda f: durations.get(f, default), reverse=True)
+    
+    def _update_runtime_log(self, results: List[TestResult]):
+        """Record this run's test durations in the runtime log"""
+        durations = self._load_runtime_log()
+        for result in results:
+            # Errored tests did not run to completion, so their time says
+            # nothing about the next run
+            if result.status != "error":
+                durations[result.test_file] = result.duration_seconds
+        
+        try:
+            _write_json_file_atomic(self.runtime_log_path, durations)
+        except Exception as e:
+            print(f"[Parallel Executor] Could not update runtime log: {e}")
+    
+    def _writer_loop(self, write_queue: "queue.Queue"):
+        """
+        Append results from write_queue to the run's JSONL file until
+        _WRITER_SENTINEL arrives. Results that queue up during a write are
+        appended and flushed together
+        """
+        try:
+            results_file = open(self._results_jsonl, 'ab')
+        except Exception as e:
+            print(f"[Parallel Executor] Could not open {self._results_jsonl}: {e}")
+            results_file = None
+        
+        done = False
+        while not done:
+            item = write_queue.get()
+            if item is _WRITER_SENTINEL:
+                break
+            pending = [item]
+            
+            while True:
+                try:
+                    item = write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _WRITER_SENTINEL:
+                    done = True
+                    break
+                pending.append(item)
+            
+            if results_file is None:
+                continue
+            try:
+                results_file.write(b"".join(_json_line(r) for r in pending))
+                results_file.flush()
+            except Exception as e:
+                print(f"[Parallel Executor] Could not append results: {e}")
+        
+        if results_file is not None:
+            results_file.close()
+    
     def _save_results(self, summary: ParallelExecutionSummary):
         """Save execution results to file"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        result_file = self.output_dir / f"parallel_execution_{timestamp}.json"
+        timestamp = self._run_timestamp
+        result_file = self._result_file
         
+        # Per-test results are already in the JSONL file; the summary only
+        # points to it
+        summary_fields = {
+            name: value for name, value in vars(summary).items()
+            if name != 'test_results'
+        }
         result_data = {
             'timestamp': timestamp,
-            'summary': {
-                'total_tests': summary.total_tests,
-                'successful_tests': summary.successful_tests,
-                'failed_tests': summary.failed_tests,
-                'error_tests': summary.error_tests,
-                'total_duration_seconds': summary.total_duration_seconds,
-                'sequential_estimated_time': summary.sequential_estimated_time,
-                'time_saved_seconds': summary.time_saved_seconds,
-                'speedup_factor': summary.speedup_factor
-            },
-            'test_results': [r.to_dict() for r in summary.test_results]
+            'status': 'complete',
+            'results_file': self._results_jsonl.name,
+            'summary': summary_fields
         }
         
-        with open(result_file, 'w') as f:
-            json.dump(result_data, f, indent=2)
+        _write_json_file_atomic(result_file, result_data)
         
-        print(f"\n[Parallel Executor] Results saved to: {result_file}")
+        print(f"\n[Parallel Executor] Results saved to: {self._results_jsonl}")
+        print(f"[Parallel Executor] Summary saved to: {result_file}")
 
 
 # Demo
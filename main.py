@@ -1,5 +1,8 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 import time
 import json
 import os
@@ -7,2794 +10,3603 @@ from datetime import datetime
 from PIL import Image
 from io import BytesIO
 from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
 import queue
 import threading
 from llm_helpers import OllamaVLM
 from logging_config import setup_logger, log_exception
 
+# trio drives Selenium's CDP event connection (bidi_connection); without it
+# tab changes fall back to polling window_handles
+try:
+    import trio
+    TRIO_AVAILABLE = True
+except ImportError:
+    TRIO_AVAILABLE = False
+
+# orjson serializes the activity journal and parses JSON handed back by the
+# page faster when installed; json otherwise
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_loads(text):
+    """Parse a JSON string returned by the page (orjson when available)"""
+    return orjson.loads(text) if ORJSON_AVAILABLE else json.loads(text)
+
 # Setup logger
 logger = setup_logger('browser_recorder', 'browser_recorder.log')
 
-# Placeholder for LLM integration
-def convert_to_natural_language(activity_log):
-    """Placeholder: convert activity logs to natural language (LLM hook)."""
-    print("\n=== Activity Log ===")
-    for activity in activity_log:
-        print(json.dumps(activity, indent=2))
+# Dialog button text patterns, in priority order (matched case-insensitively
+# as substrings of the button text, value or aria-label)
+DIALOG_BUTTON_TEXTS = (
+    'ok', 'okay', 'close', 'confirm', 'accept', 'yes',
+    'continue', 'submit', 'got it', 'dismiss', 'cancel', 'no'
+)
 
-class BrowserActivityRecorder:
-    def __init__(self, driver, enable_hover_recording=True):
-        self.driver = driver
-        self.activity_log = []
-        self.previous_url = ""
-        self.previous_title = ""
-        self.previous_window_handles = []
-        self.element_tracker = {}
-        self.use_cdp = False
-        self.injection_failed_count = 0
-        self.screenshot_counter = 0
-        self.enable_hover_recording = enable_hover_recording  # Control hover recording
-        self.is_recording = True  # Control flag for monitor loop
-        
-        # Create screenshots directory
-        self.screenshots_dir = "screenshots"
-        if not os.path.exists(self.screenshots_dir):
-            os.makedirs(self.screenshots_dir)
-        
-        # Initialize VLM for async description generation
-        self.vlm = OllamaVLM(model="granite3.2-vision")
-        
-        # Async task queue for VLM processing
-        self.vlm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="VLM")
-        self.vlm_task_queue = queue.Queue()
-        self.vlm_results = {}  # Store VLM results by activity index
-        self.vlm_lock = threading.Lock()
-        
-        # Network monitoring for loading detection
-        self.pending_network_requests = 0
-        self.network_monitoring_enabled = False
-        
-        # Try to enable CDP for more reliable tracking
-        try:
-            self.driver.execute_cdp_cmd('Network.enable', {})
-            self.driver.execute_cdp_cmd('Page.enable', {})
-            self.use_cdp = True
-            self.network_monitoring_enabled = True
-            logger.info("Chrome DevTools Protocol enabled for enhanced tracking")
-            print("[INFO] Chrome DevTools Protocol enabled for enhanced tracking")
-        except Exception as e:
-            logger.warning(f"CDP not available: {e}")
-            print("[INFO] CDP not available, using JavaScript injection method")
-        
-        # Setup DOM mutation observer for loading detection
-        self._setup_mutation_observer()
-        self._setup_network_tracker()
-        
-    def record_activity(self, action_type, details):
-        """Record an activity with timestamp"""
-        activity = {
-            "timestamp": datetime.now().isoformat(),
-            "action": action_type,
-            "details": details
+# Shared helpers for reading dialog buttons in the page
+BUTTON_HELPERS_JS = """
+function isElementShown(el) {
+    if (el.hidden) return false;
+    // offsetParent is null for position:fixed elements (overlays), so fall
+    // back to client rects before calling them hidden
+    if (el.offsetParent === null && el.getClientRects().length === 0) return false;
+    // Then the computed-style rules of WebElement.is_displayed(): visibility
+    // is inherited, so the element's own value covers its ancestors; opacity
+    // and display are not, so those are checked up the chain
+    var style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.visibility === 'collapse') return false;
+    for (var node = el; node && node.nodeType === Node.ELEMENT_NODE; node = node.parentElement) {
+        var nodeStyle = node === el ? style : window.getComputedStyle(node);
+        if (nodeStyle.display === 'none' || nodeStyle.opacity === '0') return false;
+    }
+    return true;
+}
+function getXPath(element) {
+    // Iterative walk up the ancestors, counting same-tag predecessors with
+    // previousElementSibling; stops at an id or <body>
+    var parts = [];
+    var prefix = '/html/body';
+    var el = element;
+    while (el && el.nodeType === Node.ELEMENT_NODE) {
+        if (el.id) {
+            prefix = '//*[@id="' + el.id + '"]';
+            break;
         }
+        if (el === document.body) break;
+        var tagName = el.tagName;
+        var ix = 1;
+        for (var sib = el.previousElementSibling; sib; sib = sib.previousElementSibling) {
+            if (sib.tagName === tagName) ix++;
+        }
+        parts.unshift(tagName.toLowerCase() + '[' + ix + ']');
+        el = el.parentNode;
+    }
+    return parts.length ? prefix + '/' + parts.join('/') : prefix;
+}
+function isButtonVisible(el) {
+    return isElementShown(el) && !!(el.offsetWidth || el.offsetHeight);
+}
+function describeButton(el, withXPath) {
+    var rect = el.getBoundingClientRect();
+    return {
+        visible: isButtonVisible(el),
+        text: (el.innerText || '').trim(),
+        value: el.value || '',
+        aria: el.getAttribute('aria-label') || '',
+        id: el.id || '',
+        cls: el.getAttribute('class') || '',
+        type: el.getAttribute('type') || '',
+        tag: el.tagName.toLowerCase(),
+        rect: {
+            x: rect.left + window.scrollX,
+            y: rect.top + window.scrollY,
+            width: rect.width,
+            height: rect.height
+        },
+        xpath: withXPath ? (getXPath(el) || '') : ''
+    };
+}
+"""
 
-        # Attach window/tab context so replay can properly switch
-        try:
-            current_handle = self.driver.current_window_handle
-            handles = list(self.driver.window_handles)
-            activity["window_handle"] = current_handle
-            activity["tab_index"] = handles.index(current_handle) if current_handle in handles else 0
-            activity["total_tabs"] = len(handles)
-        except Exception:
-            # If driver context not available, skip adding tab metadata
-            pass
-        
-        # Capture multiple locators for click, input, and hover events (Phase 1 enhancement)
-        if action_type in ["click", "text_input", "hover"]:
-            locators = self.capture_multiple_locators(details)
-            if locators:
-                activity["locators"] = locators
-        
-        # Get activity index before appending
-        activity_index = len(self.activity_log)
-        self.activity_log.append(activity)
-        
-        # Capture screenshot & trigger VLM for click and text input events
-        if action_type in ["click", "text_input"]:
-            screenshot_info = self.capture_screenshot_with_highlight(details)
-            if screenshot_info:
-                activity["screenshot"] = screenshot_info
-                screenshot_path = screenshot_info.get('path')
-                if screenshot_path:
-                    self.trigger_async_vlm_description(
-                        activity_index,
-                        screenshot_path,
-                        details,
-                        action_type
-                    )
-            # Print concise summary
-            if action_type == "click":
-                summary = f"Element: {details.get('tagName', 'N/A')}"
-                if details.get('id'):
-                    summary += f", ID: {details['id']}"
-                if details.get('text'):
-                    summary += f", Text: {details['text'][:30]}"
-                coords = details.get('coordinates', {})
-                if coords:
-                    summary += f", Position: ({coords.get('clickX', 0):.0f}, {coords.get('clickY', 0):.0f})"
-                print(f"[{action_type}] {summary}")
-            else:  # text_input
-                summary = f"Field: {details.get('tagName', 'N/A')}"
-                if details.get('id'):
-                    summary += f", ID: {details['id']}"
-                elif details.get('name'):
-                    summary += f", Name: {details['name']}"
-                if details.get('label'):
-                    summary += f", Label: {details['label'][:30]}"
-                if details.get('value'):
-                    value = details['value'][:30] + "..." if len(details['value']) > 30 else details['value']
-                    summary += f", Value: {value}"
-                print(f"[{action_type}] {summary}")
-        elif action_type == "hover":
-            # Add a synthesized description for VLM hover fallback
-            txt = details.get('text') or details.get('title') or details.get('ariaLabel') or ''
-            tag = details.get('tagName','element')
-            description_parts = [tag]
-            if txt:
-                description_parts.append(f"with text '{txt[:60]}'")
-            if details.get('id'):
-                description_parts.append(f"id '{details['id']}'")
-            if details.get('className'):
-                # keep only first class token to avoid noise
-                first_class = str(details.get('className')).split()[0]
-                description_parts.append(f"class '{first_class}'")
-            synthesized = ' '.join(description_parts)
-            details['vlm_description'] = synthesized  # mutate details so executor receives it
-            summary = f"Hover: {synthesized[:100]}"
-            print(f"[{action_type}] {summary}")
-            # (No screenshot captured for hover events)
-    
-    def stop_recording(self):
-        """Stop the recording loop"""
-        print("[INFO] Stopping recording...")
-        self.is_recording = False
-    
-    def capture_multiple_locators(self, element_details):
-        """Return a dictionary of multiple locator strategies for robust replay."""
-        locators = {}
-        try:
-            if element_details.get('id'):
-                locators['id'] = element_details['id']
-            if element_details.get('name'):
-                locators['name'] = element_details['name']
-            if element_details.get('className'):
-                locators['class'] = element_details['className']
-            if element_details.get('tagName'):
-                locators['tag_name'] = element_details['tagName']
-            if element_details.get('text'):
-                locators['text'] = element_details['text'][:100]
-            if element_details.get('placeholder'):
-                locators['placeholder'] = element_details['placeholder']
-            if element_details.get('type'):
-                locators['type'] = element_details['type']
-            if element_details.get('ariaLabel'):
-                locators['aria_label'] = element_details['ariaLabel']
-            if element_details.get('value'):
-                locators['value'] = element_details['value']
-            if element_details.get('cssSelector'):
-                locators['css_selector'] = element_details['cssSelector']
-            if element_details.get('xpath'):
-                locators['xpath'] = element_details['xpath']
-            
-            # Handle nested selectors object (from new recording format)
-            selectors = element_details.get('selectors', {})
-            if selectors:
-                if selectors.get('cssSelector') and not locators.get('css_selector'):
-                    locators['css_selector'] = selectors['cssSelector']
-                if selectors.get('xpath') and not locators.get('xpath'):
-                    locators['xpath'] = selectors['xpath']
-            
-            coords = element_details.get('coordinates', {})
-            if coords and all(k in coords for k in ['clickX', 'clickY', 'width', 'height']):
-                locators['coordinates'] = {
-                    'x': coords['clickX'],
-                    'y': coords['clickY'],
-                    'width': coords['width'],
-                    'height': coords['height']
+# Visibility of a list of elements in one round-trip (instead of one
+# is_displayed() call per element)
+ELEMENTS_SHOWN_JS = BUTTON_HELPERS_JS + """
+return arguments[0].map(isElementShown);
+"""
+
+# True once the element's box lies inside the viewport (scrollIntoView done)
+IN_VIEWPORT_JS = """
+var r = arguments[0].getBoundingClientRect();
+return r.top >= 0 && r.bottom <= window.innerHeight;
+"""
+
+# Reads everything modal handling needs about a list of buttons in one
+# round-trip. arguments[1] toggles XPath generation (only needed for the
+# button that is actually clicked).
+BUTTON_DETAILS_JS = BUTTON_HELPERS_JS + """
+var withXPath = arguments[1];
+return arguments[0].map(function(el) { return describeButton(el, withXPath); });
+"""
+
+# Picks the dialog button to click entirely in the page: arguments are
+# (modal, patterns, joinedSelector, limit). Patterns are tried in priority order
+# against each visible button's text, value and aria-label; with no match
+# the first visible button is returned with index -1. With more than `limit`
+# visible buttons only the best-scored `limit` are considered.
+# Returns: {element, index, count, details} or null if the modal has no buttons
+FIND_MODAL_BUTTON_JS = BUTTON_HELPERS_JS + """
+var modal = arguments[0], patterns = arguments[1], selector = arguments[2], limit = arguments[3] || 32;
+var buttons = [];
+var all = modal.querySelectorAll(selector);
+for (var i = 0; i < all.length; i++) {
+    if (isButtonVisible(all[i])) buttons.push(all[i]);
+}
+if (all.length === 0) return null;
+if (buttons.length === 0) return {element: null, index: -1, count: 0, details: null};
+
+// Only the most likely candidates are matched: real <button>s and elements
+// with text first (stable sort keeps document order within a score)
+var count = buttons.length;
+if (buttons.length > limit) {
+    buttons = buttons.map(function(el, i) {
+        var score = (el.tagName === 'BUTTON' ? 2 : 0) + ((el.textContent || '').trim() ? 1 : 0);
+        return {el: el, score: score, i: i};
+    }).sort(function(a, b) {
+        return (b.score - a.score) || (a.i - b.i);
+    }).slice(0, limit).map(function(c) {
+        return c.el;
+    });
+}
+
+// Lowercase every pattern once and every button's text/value/aria once;
+// patterns stay the outer loop so their priority order is preserved
+var lowered = [];
+for (var p = 0; p < patterns.length; p++) lowered.push(patterns[p].toLowerCase());
+var haystacks = [];
+for (var b = 0; b < buttons.length; b++) {
+    var el = buttons[b];
+    haystacks.push([
+        (el.innerText || '').trim().toLowerCase(),
+        (el.value || '').toLowerCase(),
+        (el.getAttribute('aria-label') || '').toLowerCase()
+    ]);
+}
+for (var p = 0; p < lowered.length; p++) {
+    var pl = lowered[p];
+    for (var b = 0; b < haystacks.length; b++) {
+        var h = haystacks[b];
+        if (h[0].includes(pl) || h[1].includes(pl) || h[2].includes(pl)) {
+            return {element: buttons[b], index: p, count: count, details: describeButton(buttons[b], true)};
+        }
+    }
+}
+return {element: buttons[0], index: -1, count: count, details: describeButton(buttons[0], true)};
+"""
+
+# Shortest-unique CSS selector generation shared by the injected trackers
+# (after medv/finder). Walks up from the element trying id -> class -> tag ->
+# nth-of-type segments and returns the first selector that matches exactly
+# one node in the element's root (document or shadow root). Once the probe
+# budget or time limit runs out it falls back to the full nth-of-type path.
+# The climb stops at the first ancestor with an id, or with a selector
+# returned by options.anchor(el). Defined once per window as
+# window.__finder(el, options), next to window.__tn(el), the lowercased tag
+# name cached on the element (a node's tag never changes).
+FINDER_JS = r"""
+if (!window.__tn) {
+    window.__tn = function(el) {
+        return el.__tn || (el.__tn = el.nodeName.toLowerCase());
+    };
+}
+var tn = window.__tn;
+if (!window.__finder) {
+    window.__finder = (function() {
+        function escapeIdent(s) {
+            if (window.CSS && CSS.escape) return CSS.escape(s);
+            return String(s).replace(/([^a-zA-Z0-9_-])/g, '\\$1');
+        }
+        function nthOfType(el) {
+            var nodeName = el.nodeName, nth = 1;
+            for (var sib = el.previousElementSibling; sib; sib = sib.previousElementSibling) {
+                if (sib.nodeName === nodeName) nth++;
+            }
+            return nth;
+        }
+        // Segments for one level, most general first; the last one is always
+        // specific enough to build the fallback path from
+        function segments(el) {
+            var tag = tn(el);
+            var out = [];
+            if (el.id) out.push('#' + escapeIdent(el.id));
+            var classes = el.classList ? Array.prototype.slice.call(el.classList, 0, 3) : [];
+            for (var c = 0; c < classes.length; c++) {
+                out.push(tag + '.' + escapeIdent(classes[c]));
+            }
+            if (classes.length > 1) {
+                out.push(tag + '.' + escapeIdent(classes[0]) + '.' + escapeIdent(classes[1]));
+            }
+            out.push(tag);
+            out.push(tag + ':nth-of-type(' + nthOfType(el) + ')');
+            return out;
+        }
+        return function(input, options) {
+            options = options || {};
+            var threshold = options.threshold || 1000;
+            var maxTries = options.maxNumberOfTries || 10000;
+            var deadline = Date.now() + (options.timeoutMs || 50);
+            var budget = Math.min(threshold, maxTries);
+            var root = input.getRootNode ? input.getRootNode() : input.ownerDocument;
+            if (!root || !root.querySelectorAll) root = input.ownerDocument || document;
+            var tries = 0, searching = true;
+            var suffix = '';
+            var el = input;
+            while (el && el.nodeType === Node.ELEMENT_NODE) {
+                // A caller-known selector for an ancestor ends the walk just
+                // like an id does
+                var known = el !== input && options.anchor ? options.anchor(el) : null;
+                if (known) return known + ' > ' + suffix;
+                var segs = segments(el);
+                for (var i = 0; searching && i < segs.length; i++) {
+                    var candidate = suffix ? segs[i] + ' > ' + suffix : segs[i];
+                    tries++;
+                    try {
+                        if (root.querySelectorAll(candidate).length === 1) return candidate;
+                    } catch (e) {}
+                    if (tries >= budget || Date.now() > deadline) searching = false;
                 }
-            if element_details.get('inShadowRoot'):
-                locators['in_shadow_root'] = True
-            if element_details.get('inIframe'):
-                locators['in_iframe'] = True
-            if element_details.get('domPath'):
-                locators['dom_path'] = element_details['domPath']
-            if element_details.get('label'):
-                locators['label'] = element_details['label']
-        except Exception as e:
-            log_exception(logger, f"Error capturing locators: {e}")
-        return locators
-    
-    def capture_screenshot_with_highlight(self, details):
-        """Capture screenshot and highlight the element"""
-        try:
-            self.screenshot_counter += 1
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            screenshot_filename = f"screenshot_{self.screenshot_counter}_{timestamp}.png"
-            screenshot_path = os.path.join(self.screenshots_dir, screenshot_filename)
-            
-            # Capture full page screenshot
-            screenshot_png = self.driver.get_screenshot_as_png()
-            
-            # Get element coordinates from details
-            coords = details.get('coordinates', {})
-            if coords:
-                # Open image with PIL
-                image = Image.open(BytesIO(screenshot_png))
-                
-                # Add visual marker for VLM focus (optional but helpful)
-                from PIL import ImageDraw
-                draw = ImageDraw.Draw(image)
-                
-                # Get element bounds
-                left = coords.get('elementLeft', 0)
-                top = coords.get('elementTop', 0)
-                width = coords.get('elementWidth', 0)
-                height = coords.get('elementHeight', 0)
-                
-                # Draw red bounding box around element
-                if left > 0 and top > 0 and width > 0 and height > 0:
-                    # Draw rectangle
-                    draw.rectangle(
-                        [(left, top), (left + width, top + height)],
-                        outline='red',
-                        width=3
-                    )
-                    
-                    # Draw center crosshair
-                    center_x = coords.get('elementCenterX', left + width/2)
-                    center_y = coords.get('elementCenterY', top + height/2)
-                    crosshair_size = 10
-                    draw.line(
-                        [(center_x - crosshair_size, center_y), (center_x + crosshair_size, center_y)],
-                        fill='red',
-                        width=2
-                    )
-                    draw.line(
-                        [(center_x, center_y - crosshair_size), (center_x, center_y + crosshair_size)],
-                        fill='red',
-                        width=2
-                    )
-                
-                # Save the highlighted screenshot
-                image.save(screenshot_path)
-                
-                # Return screenshot metadata
-                return {
-                    "filename": screenshot_filename,
-                    "path": screenshot_path,
-                    "element_bounds": {
-                        "left": coords.get('elementLeft', 0),
-                        "top": coords.get('elementTop', 0),
-                        "width": coords.get('elementWidth', 0),
-                        "height": coords.get('elementHeight', 0)
-                    },
-                    "viewport_size": {
-                        "width": coords.get('viewportWidth', 0),
-                        "height": coords.get('viewportHeight', 0)
+                // Climb with the most specific segment (id anchors the path)
+                var anchor = el.id ? segs[0] : segs[segs.length - 1];
+                suffix = suffix ? anchor + ' > ' + suffix : anchor;
+                if (el.id) break;
+                el = el.parentElement;
+            }
+            return suffix;
+        };
+    })();
+}
+"""
+
+# CDP binding the trackers call to announce new events (see __pushEvent)
+TRACKER_SINK_BINDING = "__trackerSink"
+
+# Hands all pending tracker events to Python in one call. At most `limit`
+# events of each kind are returned; the rest stay queued for the next drain.
+# Click, hover and input events share one ring of arguments[0] slots
+# (EVENT_BUFFER_SIZE) holding {t: kind, p: event} records: pushes and drains
+# never shift or reallocate the buffer, a full ring overwrites its oldest record, and a kind with its
+# own cap (hovers) stops taking new records at the cap so it cannot crowd
+# out clicks and inputs while the drain is stalled.
+DRAIN_EVENTS_JS = """
+window.__eventBufferSize = arguments[0] || window.__eventBufferSize || 2000;
+if (!window.__eventRing) {
+    window.__eventRing = {
+        slots: new Array(window.__eventBufferSize),
+        size: window.__eventBufferSize,
+        head: 0,
+        tail: 0,
+        counts: {clicks: 0, hovers: 0, inputs: 0}
+    };
+}
+if (!window.__pushEvent) {
+    window.__pushEvent = function(kind, item, cap) {
+        var ring = window.__eventRing;
+        if (cap && ring.counts[kind] >= cap) return;
+        if (ring.head - ring.tail >= ring.size) {
+            var oldest = ring.slots[ring.tail % ring.size];
+            ring.counts[oldest.t]--;
+            ring.tail++;
+        }
+        ring.slots[ring.head % ring.size] = {t: kind, p: item};
+        ring.head++;
+        ring.counts[kind]++;
+        // First event since the last drain: wake the recorder through the
+        // CDP binding (when present) instead of waiting for its next poll
+        if (ring.head - ring.tail === 1 && typeof window.__trackerSink === 'function') {
+            try { window.__trackerSink(''); } catch (e) {}
+        }
+    };
+}
+if (!window.__drainEvents) {
+    // kind (optional) drains only that kind; records left behind are
+    // compacted towards the tail in the same pass
+    window.__drainEvents = function(limit, kind) {
+        var ring = window.__eventRing;
+        var out = {clicks: [], hovers: [], inputs: []};
+        limit = limit || 500;
+        var kept = ring.tail;
+        for (var i = ring.tail; i < ring.head; i++) {
+            var rec = ring.slots[i % ring.size];
+            ring.slots[i % ring.size] = undefined;
+            var list = out[rec.t];
+            if ((!kind || rec.t === kind) && list.length < limit) {
+                list.push(rec.p);
+                ring.counts[rec.t]--;
+            } else {
+                ring.slots[kept % ring.size] = rec;
+                kept++;
+            }
+        }
+        ring.head = kept;
+        if (window.__materializeClick) out.clicks = out.clicks.map(window.__materializeClick);
+        return out;
+    };
+}
+"""
+
+# Drains every pending event of one kind (arguments[1]) as a JSON list;
+# used by the single-kind collect_*_events() calls
+DRAIN_KIND_JS = """
+return JSON.stringify(window.__drainEvents ? window.__drainEvents(arguments[0], arguments[1])[arguments[1]] : []);
+"""
+
+# Lets a tracker hook iframes and shadow roots that appear after injection
+# without rescanning the whole page: a MutationObserver hands each added
+# iframe (also on load, when its document is replaced) and each shadow host
+# in an added subtree to the tracker's callbacks. Shadow roots handed out are
+# observed as well, and roots attached later through attachShadow() are
+# reported by a one-time patch. The initial scan is done by the tracker.
+WATCH_DYNAMIC_CONTEXTS_JS = """
+// Calls fn(host) for every shadow host under root (document or shadow root).
+// A TreeWalker visits the subtree without materialising a NodeList of every
+// element; only hosts are accepted.
+if (!window.__forEachShadowHost) {
+    window.__forEachShadowHost = function(root, fn) {
+        var walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT, {
+            acceptNode: function(n) {
+                return n.shadowRoot ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_SKIP;
+            }
+        });
+        var node;
+        while ((node = walker.nextNode())) fn(node);
+    };
+}
+var forEachShadowHost = window.__forEachShadowHost;
+// Calls fn(shadowRoot) for every shadow root under root, nested ones
+// included, using an explicit stack instead of recursion. Returning false
+// from fn skips the roots nested inside that one.
+if (!window.__forEachShadowRoot) {
+    window.__forEachShadowRoot = function(root, fn) {
+        var stack = [root];
+        var pushNested = function(host) {
+            if (fn(host.shadowRoot) !== false) stack.push(host.shadowRoot);
+        };
+        while (stack.length) forEachShadowHost(stack.pop(), pushNested);
+    };
+}
+var forEachShadowRoot = window.__forEachShadowRoot;
+if (!window.__watchDynamicContexts) {
+    window.__watchDynamicContexts = function(onIframe, onShadowRoot) {
+        function iframeIndex(iframe) {
+            return Array.prototype.indexOf.call(document.querySelectorAll('iframe'), iframe);
+        }
+        function handleIframe(iframe) {
+            onIframe(iframe, iframeIndex(iframe));
+            iframe.addEventListener('load', function() {
+                onIframe(iframe, iframeIndex(iframe));
+            });
+        }
+        var observer;
+        function watchShadowRoot(sr) {
+            onShadowRoot(sr);
+            observer.observe(sr, {childList: true, subtree: true});
+        }
+        function handleShadowRoot(sr) {
+            watchShadowRoot(sr);
+            forEachShadowRoot(sr, watchShadowRoot);
+        }
+        function handleHost(host) {
+            handleShadowRoot(host.shadowRoot);
+        }
+        observer = new MutationObserver(function(mutations) {
+            for (var m = 0; m < mutations.length; m++) {
+                var added = mutations[m].addedNodes;
+                for (var a = 0; a < added.length; a++) {
+                    var node = added[a];
+                    if (node.nodeType !== Node.ELEMENT_NODE) continue;
+                    try {
+                        if (node.tagName === 'IFRAME') {
+                            handleIframe(node);
+                        } else {
+                            var nested = node.getElementsByTagName('iframe');
+                            for (var f = 0; f < nested.length; f++) handleIframe(nested[f]);
+                        }
+                        if (node.shadowRoot) handleShadowRoot(node.shadowRoot);
+                        forEachShadowHost(node, handleHost);
+                    } catch (e) {}
+                }
+            }
+        });
+        observer.observe(document, {childList: true, subtree: true});
+        forEachShadowRoot(document, watchShadowRoot);
+        // attachShadow() on an element already in the tree causes no
+        // mutation, so report those roots from the call itself
+        if (!window.__shadowWatchers) {
+            window.__shadowWatchers = [];
+            var attachShadow = Element.prototype.attachShadow;
+            if (attachShadow) {
+                Element.prototype.attachShadow = function() {
+                    var sr = attachShadow.apply(this, arguments);
+                    for (var w = 0; w < window.__shadowWatchers.length; w++) {
+                        try { window.__shadowWatchers[w](sr); } catch (e) {}
                     }
+                    return sr;
+                };
+            }
+        }
+        window.__shadowWatchers.push(handleShadowRoot);
+        return observer;
+    };
+}
+"""
+
+# Helpers shared by the click, hover and input trackers: memoized XPath and
+# CSS selector generation, visual properties, text and the iframe/shadow DOM
+# path, installed once per window as window.__trk
+TRACKER_HELPERS_JS = """
+// Installed once per window as window.__trk; tracker scripts only bind the
+// short names below, so re-sending the prelude does not recreate the helpers
+if (!window.__trk) {
+    window.__trk = (function() {
+        // Selector results are memoized per element; WeakMap entries go away
+        // with the nodes, so detached elements are never kept alive
+        window.__selCache = window.__selCache || new WeakMap();
+        // Helper function to get XPath
+        function getXPath(element) {
+            var c = window.__selCache.get(element);
+            if (c && c.xpath) return c.xpath;
+            var s = computeXPath(element);
+            window.__selCache.set(element, Object.assign(c || {}, {xpath: s}));
+            return s;
+        }
+        function computeXPath(element) {
+            // Iterative walk up the ancestors; same-tag predecessors are counted with
+            // previousElementSibling, so text nodes are never visited. Stops at an
+            // id, <body>, or an ancestor whose XPath is already cached.
+            var parts = [];
+            var prefix = '/html/body';
+            var el = element;
+            var body = document.body;
+            while (el && el.nodeType === Node.ELEMENT_NODE) {
+                if (el.id) {
+                    prefix = '//*[@id="' + el.id + '"]';
+                    break;
                 }
-            else:
-                # No coordinates, just save screenshot
-                image = Image.open(BytesIO(screenshot_png))
-                image.save(screenshot_path)
-                return {
-                    "filename": screenshot_filename,
-                    "path": screenshot_path
+                if (el === body) break;
+                if (el !== element) {
+                    var cached = window.__selCache.get(el);
+                    if (cached && cached.xpath) {
+                        prefix = cached.xpath;
+                        break;
+                    }
                 }
-        except Exception as e:
-            print(f"[WARNING] Screenshot capture failed: {str(e)[:100]}")
-            return None
-    
-    def get_element_html(self, xpath=None, css_selector=None, in_shadow_root=False, in_iframe=False):
-        """Get the full HTML of a specific element, including shadow DOM and iframe contexts"""
-        try:
-            # Generate the appropriate JavaScript code based on context
-            if in_shadow_root:
-                # Search in shadow DOM recursively
-                if css_selector:
-                    js_code = f"""
-                    // Recursive shadow DOM search for CSS selector
-                    function findInShadowDOM(root, selector) {{
-                        // Try to find in current root
-                        let element = root.querySelector(selector);
-                        if (element) return element;
-                        
-                        // Search in all shadow roots
-                        let allElements = root.querySelectorAll('*');
-                        for (let el of allElements) {{
-                            if (el.shadowRoot) {{
-                                element = findInShadowDOM(el.shadowRoot, selector);
-                                if (element) return element;
-                            }}
-                        }}
-                        return null;
-                    }}
-                    
-                    let element = findInShadowDOM(document, "{css_selector}");
-                    return element ? element.outerHTML : null;
-                    """
-                elif xpath:
-                    # XPath in shadow DOM is more complex - convert to attributes
-                    js_code = f"""
-                    // Recursive shadow DOM search for XPath attributes
-                    function findInShadowDOM(root) {{
-                        // Try to find in current root using XPath
-                        try {{
-                            let result = document.evaluate("{xpath}", root, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
-                            if (result && result.singleNodeValue) return result.singleNodeValue;
-                        }} catch (e) {{
-                            // XPath might not work in shadow root, try alternative
-                        }}
-                        
-                        // Search in all shadow roots
-                        let allElements = root.querySelectorAll('*');
-                        for (let el of allElements) {{
-                            if (el.shadowRoot) {{
-                                let element = findInShadowDOM(el.shadowRoot);
-                                if (element) return element;
-                            }}
-                        }}
-                        return null;
-                    }}
-                    
-                    let element = findInShadowDOM(document);
-                    return element ? element.outerHTML : null;
-                    """
-                else:
-                    return None
-                    
-            elif in_iframe:
-                # Search in iframes
-                if css_selector:
-                    js_code = f"""
-                    // Search in all iframes for CSS selector
-                    function findInIframes(selector) {{
-                        // Try main document first
-                        let element = document.querySelector(selector);
-                        if (element) return element.outerHTML;
-                        
-                        // Search in all iframes
-                        let iframes = document.querySelectorAll('iframe');
-                        for (let iframe of iframes) {{
-                            try {{
-                                let iframeDoc = iframe.contentDocument || iframe.contentWindow.document;
-                                element = iframeDoc.querySelector(selector);
-                                if (element) return element.outerHTML;
-                            }} catch (e) {{
-                                // Cross-origin iframe, skip
-                                console.log('Cross-origin iframe, skipping');
-                            }}
-                        }}
-                        return null;
-                    }}
-                    
-                    return findInIframes("{css_selector}");
-                    """
-                elif xpath:
-                    js_code = f"""
-                    // Search in all iframes for XPath
-                    function findInIframes(xpath) {{
-                        // Try main document first
-                        try {{
-                            let result = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
-                            if (result && result.singleNodeValue) return result.singleNodeValue.outerHTML;
-                        }} catch (e) {{
-                            console.log('XPath error in main document:', e);
-                        }}
-                        
-                        // Search in all iframes
-                        let iframes = document.querySelectorAll('iframe');
-                        for (let iframe of iframes) {{
-                            try {{
-                                let iframeDoc = iframe.contentDocument || iframe.contentWindow.document;
-                                let result = iframeDoc.evaluate(xpath, iframeDoc, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
-                                if (result && result.singleNodeValue) return result.singleNodeValue.outerHTML;
-                            }} catch (e) {{
-                                // Cross-origin iframe or XPath error, skip
-                                console.log('Error in iframe:', e);
-                            }}
-                        }}
-                        return null;
-                    }}
-                    
-                    return findInIframes("{xpath}");
-                    """
-                else:
-                    return None
-                    
-            else:
-                # Regular DOM search (existing logic)
-                if xpath:
-                    js_code = f"""
-                    var element = document.evaluate("{xpath}", document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                    return element ? element.outerHTML : null;
-                    """
-                elif css_selector:
-                    js_code = f"""
-                    var element = document.querySelector("{css_selector}");
-                    return element ? element.outerHTML : null;
-                    """
-                else:
-                    return None
-            
-            element_html = self.driver.execute_script(js_code)
-            return element_html if element_html else None
-            
-        except Exception as e:
-            print(f"[WARNING] Failed to extract element HTML: {e}")
-            return None
-    
-    def _process_vlm_description(self, activity_index, screenshot_path, element_html, coordinates, event_type):
-        """Process VLM description generation (runs in background thread)"""
-        try:
-            # Generate VLM description
-            description = self.vlm.generate_element_description(
-                image_path=screenshot_path,
-                element_html=element_html or "HTML not available",
-                coordinates=coordinates,
-                event_type=event_type
-            )
-            
-            # Store result
-            with self.vlm_lock:
-                self.vlm_results[activity_index] = {
-                    'vlm_description': description,
-                    'element_html': element_html,
-                    'processing_completed': True
+                var tagName = el.tagName;
+                var ix = 1;
+                for (var sib = el.previousElementSibling; sib; sib = sib.previousElementSibling) {
+                    if (sib.tagName === tagName) ix++;
                 }
-                
-        except Exception as e:
-            print(f"[ERROR] VLM processing failed for activity {activity_index}: {e}")
-            with self.vlm_lock:
-                self.vlm_results[activity_index] = {
-                    'vlm_description': f"VLM processing failed: {str(e)}",
-                    'element_html': element_html,
-                    'processing_completed': False
+                parts.unshift(tn(el) + '[' + ix + ']');
+                el = el.parentNode;
+            }
+            return parts.length ? prefix + '/' + parts.join('/') : prefix;
+        }
+
+        // Helper function to get CSS selector
+        function cachedCssSelector(element) {
+            var c = window.__selCache.get(element);
+            return c && c.css ? c.css : null;
+        }
+        function getCssSelector(element) {
+            var c = window.__selCache.get(element);
+            if (c && c.css) return c.css;
+            var s = window.__finder(element, {
+                threshold: 1000,
+                maxNumberOfTries: 10000,
+                timeoutMs: 50,
+                anchor: cachedCssSelector
+            });
+            window.__selCache.set(element, Object.assign(c || {}, {css: s}));
+            return s;
+        }
+
+        // Computed style is read with one getPropertyValue per entry of a constant
+        // list; width/height come from the element's box (pass the rect if the
+        // caller already has one) instead of computed style. getComputedStyle
+        // returns a live declaration, so one per element is kept and reused
+        window.__styleCache = window.__styleCache || new WeakMap();
+        var VISUAL_PROPS = [
+            ['backgroundColor', 'background-color'],
+            ['color', 'color'],
+            ['fontSize', 'font-size'],
+            ['fontFamily', 'font-family'],
+            ['fontWeight', 'font-weight'],
+            ['border', 'border'],
+            ['padding', 'padding'],
+            ['margin', 'margin'],
+            ['display', 'display'],
+            ['position', 'position'],
+            ['zIndex', 'z-index'],
+            ['opacity', 'opacity'],
+            ['cursor', 'cursor']
+        ];
+        function getVisualProperties(element, rect) {
+            var computed = window.__styleCache.get(element);
+            if (!computed) {
+                computed = window.getComputedStyle(element);
+                window.__styleCache.set(element, computed);
+            }
+            var out = {};
+            for (var i = 0; i < VISUAL_PROPS.length; i++) {
+                out[VISUAL_PROPS[i][0]] = computed.getPropertyValue(VISUAL_PROPS[i][1]);
+            }
+            rect = rect || element.getBoundingClientRect();
+            out.width = rect.width + 'px';
+            out.height = rect.height + 'px';
+            return out;
+        }
+
+        // Element text for event descriptors. textContent does not need layout
+        // (innerText does); its source whitespace is collapsed on a bounded slice
+        // so the result still reads like rendered text
+        function textSnippet(element) {
+            var text = element.textContent;
+            if (!text) return '';
+            if (text.length > 400) text = text.slice(0, 400);
+            text = text.replace(/\s+/g, ' ').trim();
+            return text.length > 100 ? text.slice(0, 100) : text;
+        }
+
+        // Viewport size and scroll offsets are refreshed from resize/scroll events
+        // instead of being read (and possibly flushing layout) on every event
+        if (!window.__viewport) {
+            window.__viewport = {};
+            var refreshViewport = function() {
+                var de = document.documentElement;
+                window.__viewport.width = window.innerWidth || (de ? de.clientWidth : 0);
+                window.__viewport.height = window.innerHeight || (de ? de.clientHeight : 0);
+                window.__viewport.scrollX = window.scrollX || window.pageXOffset;
+                window.__viewport.scrollY = window.scrollY || window.pageYOffset;
+            };
+            refreshViewport();
+            window.addEventListener('resize', refreshViewport, { passive: true });
+            window.addEventListener('scroll', refreshViewport, { passive: true });
+        }
+
+        // Copies every attribute into out.attributes and data-* ones into
+        // out.dataAttributes. getAttributeNames() is a plain array, unlike the
+        // live NamedNodeMap; the charCode checks ('d' ... '-') avoid building
+        // a substring for the data- test
+        function copyAttributes(element, out) {
+            var names = element.getAttributeNames ? element.getAttributeNames() : [];
+            for (var i = 0, n = names.length; i < n; i++) {
+                var name = names[i];
+                var val = element.getAttribute(name);
+                out.attributes[name] = val;
+                if (name.charCodeAt(0) === 100 && name.charCodeAt(4) === 45 && name.startsWith('data-')) {
+                    out.dataAttributes[name] = val;
                 }
-    
-    def trigger_async_vlm_description(self, activity_index, screenshot_path, details, event_type):
-        """Trigger async VLM description generation"""
-        # Extract element HTML with context awareness
-        xpath = details.get('xpath')
-        css_selector = details.get('cssSelector')
-        in_shadow_root = details.get('inShadowRoot', False)
-        in_iframe = details.get('inIframe', False)
-        element_html = self.get_element_html(
-            xpath=xpath, 
-            css_selector=css_selector,
-            in_shadow_root=in_shadow_root,
-            in_iframe=in_iframe
-        )
-        
-        # Get coordinates
-        coordinates = details.get('coordinates', {})
-        
-        # Submit to thread pool
-        # Fire-and-forget; joined later during finalize_vlm_processing
-        _vlm_future = self.vlm_executor.submit(
-            self._process_vlm_description,
-            activity_index,
-            screenshot_path,
-            element_html,
-            coordinates,
-            event_type
-        )
-        
-        print(f"[VLM] Queued description generation for activity {activity_index}")
-        
-    def finalize_vlm_processing(self):
-        """Wait for all VLM tasks to complete and update activity log"""
-        print("\n[VLM] Waiting for async description generation to complete...")
-        
-        # Shutdown executor and wait for all tasks
-        self.vlm_executor.shutdown(wait=True)
-        
-        # Update activity log with VLM results
-        with self.vlm_lock:
-            for activity_index, vlm_data in self.vlm_results.items():
-                if activity_index < len(self.activity_log):
-                    self.activity_log[activity_index]['vlm_description'] = vlm_data.get('vlm_description', '')
-                    self.activity_log[activity_index]['element_html'] = vlm_data.get('element_html', '')
-        
-        print(f"[VLM] Completed {len(self.vlm_results)} descriptions")
-    
-    def optimize_activity_log(self):
-        """
-        Use VLM to optimize activity log by consolidating sequential actions
-        - Merge sequential typing in same field into single action with final value
-        - Remove redundant clicks on same element
-        - Keep only meaningful navigation changes
-        """
-        print("\n[OPTIMIZER] Analyzing activity log for optimization...")
-        original_count = len(self.activity_log)
-        
-        if original_count == 0:
-            return
-        
-        optimized_log = []
-        i = 0
-        
-        while i < len(self.activity_log):
-            current = self.activity_log[i]
-            action = current.get('action', '')
-            
-            # Handle text input consolidation
-            if action == 'text_input':
-                consolidated = self._consolidate_text_inputs(i)
-                if consolidated:
-                    optimized_log.append(consolidated['activity'])
-                    i = consolidated['end_index'] + 1
-                    print(f"[OPTIMIZER] Consolidated {consolidated['merged_count']} typing actions into 1")
-                    continue
-            
-            # Handle click deduplication
-            elif action == 'click':
-                if self._is_redundant_click(i, optimized_log):
-                    print(f"[OPTIMIZER] Removed redundant click at index {i}")
-                    i += 1
-                    continue
-            
-            # Keep all other actions (navigation, etc.)
-            optimized_log.append(current)
-            i += 1
-        
-        # Update activity log
-        self.activity_log = optimized_log
-        removed_count = original_count - len(optimized_log)
-        
-        print(f"[OPTIMIZER] ✓ Optimization complete:")
-        print(f"[OPTIMIZER]   Original: {original_count} activities")
-        print(f"[OPTIMIZER]   Optimized: {len(optimized_log)} activities")
-        print(f"[OPTIMIZER]   Removed: {removed_count} redundant activities ({removed_count/original_count*100:.1f}%)")
-    
-    def _consolidate_text_inputs(self, start_index):
-        """
-        Consolidate sequential text inputs into the same field
-        Returns: {activity, end_index, merged_count} or None
-        """
-        if start_index >= len(self.activity_log):
-            return None
-        
-        first_activity = self.activity_log[start_index]
-        first_details = first_activity.get('details', {})
-        
-        # Get field identifier (xpath, id, or name)
-        field_xpath = first_details.get('xpath', '')
-        field_id = first_details.get('id', '')
-        field_name = first_details.get('name', '')
-        
-        if not (field_xpath or field_id or field_name):
-            return None
-        
-        # Find all consecutive text inputs to the same field
-        merged_activities = [first_activity]
-        j = start_index + 1
-        
-        while j < len(self.activity_log):
-            next_activity = self.activity_log[j]
-            next_action = next_activity.get('action', '')
-            
-            # Stop if not a text input
-            if next_action != 'text_input':
-                break
-            
-            next_details = next_activity.get('details', {})
-            
-            # Check if same field
-            same_field = False
-            if field_xpath and next_details.get('xpath') == field_xpath:
-                same_field = True
-            elif field_id and next_details.get('id') == field_id:
-                same_field = True
-            elif field_name and next_details.get('name') == field_name:
-                same_field = True
-            
-            if not same_field:
-                break
-            
-            merged_activities.append(next_activity)
-            j += 1
-        
-        # If only one activity, no consolidation needed
-        if len(merged_activities) == 1:
-            return None
-        
-        # Get final value from last activity
-        last_activity = merged_activities[-1]
-        final_value = last_activity.get('details', {}).get('value', '')
-        
-        # Create consolidated activity using last activity as base
-        consolidated_activity = last_activity.copy()
-        
-        # Update value to show it was consolidated
-        consolidated_details = consolidated_activity.get('details', {}).copy()
-        consolidated_details['value'] = final_value
-        consolidated_details['consolidated_from'] = len(merged_activities)
-        consolidated_activity['details'] = consolidated_details
-        
-        # Keep the VLM description and screenshot from the last action
-        # (most accurate representation of final state)
-        
+            }
+        }
+
+        // Helper function to capture DOM path (iframe and shadow DOM chain)
+        function getDomPath(element) {
+            var path = [];
+            var currentElement = element;
+            var currentRoot = document;
+
+            while (currentElement && currentElement !== currentRoot) {
+                // Check if we're crossing a shadow boundary
+                var host = currentElement.getRootNode();
+                if (host && host !== document && host.host) {
+                    // We're in a shadow root
+                    var shadowHost = host.host;
+                    path.unshift({
+                        type: 'shadow',
+                        host: tn(shadowHost) + (shadowHost.id ? '#' + shadowHost.id : ''),
+                        hostSelector: getCssSelector(shadowHost)
+                    });
+                    currentElement = shadowHost;
+                    continue;
+                }
+
+                // Check if parent is in an iframe
+                if (currentElement === currentRoot.body || currentElement === currentRoot.documentElement) {
+                    // Check if this document is inside an iframe
+                    try {
+                        if (currentRoot !== window.top.document && currentRoot.defaultView && currentRoot.defaultView.frameElement) {
+                            var iframe = currentRoot.defaultView.frameElement;
+                            var iframeDoc = window.top.document;
+                            var iframeSelector = getCssSelector.call({nodeType: Node.ELEMENT_NODE}, iframe);
+
+                            // Find iframe index
+                            var iframes = iframeDoc.querySelectorAll('iframe');
+                            var iframeIndex = -1;
+                            for (var i = 0; i < iframes.length; i++) {
+                                if (iframes[i] === iframe) {
+                                    iframeIndex = i;
+                                    break;
+                                }
+                            }
+
+                            path.unshift({
+                                type: 'iframe',
+                                selector: iframeSelector,
+                                index: iframeIndex,
+                                name: iframe.name || '',
+                                id: iframe.id || ''
+                            });
+
+                            currentRoot = iframeDoc;
+                            currentElement = iframe;
+                            continue;
+                        }
+                    } catch(e) {
+                        // Cross-origin or top-level, stop traversal
+                        break;
+                    }
+                }
+
+                currentElement = currentElement.parentNode;
+            }
+
+            // Add the element itself at the end
+            path.push({
+                type: 'element',
+                selector: getCssSelector(element),
+                xpath: getXPath(element),
+                tagName: tn(element),
+                id: element.id || '',
+                name: element.name || '',
+                className: element.className || ''
+            });
+
+            return path;
+        }
         return {
-            'activity': consolidated_activity,
-            'end_index': j - 1,
-            'merged_count': len(merged_activities)
+            xpath: getXPath,
+            css: getCssSelector,
+            visual: getVisualProperties,
+            domPath: getDomPath,
+            text: textSnippet,
+            attributes: copyAttributes
+        };
+    })();
+}
+var getXPath = window.__trk.xpath;
+var getCssSelector = window.__trk.css;
+var getVisualProperties = window.__trk.visual;
+var getDomPath = window.__trk.domPath;
+var textSnippet = window.__trk.text;
+var copyAttributes = window.__trk.attributes;
+// Tracker listeners only observe (never preventDefault), so they are
+// registered passive and in the capture phase
+var listenerOptions = { capture: true, passive: true };
+"""
+
+# Everything a tracker needs before installing its listeners
+TRACKER_PRELUDE_JS = FINDER_JS + DRAIN_EVENTS_JS + WATCH_DYNAMIC_CONTEXTS_JS + TRACKER_HELPERS_JS
+
+# Click tracker: records clicks in the document, same-origin iframes and
+# shadow roots into the event ring as 'clicks' (expects TRACKER_PRELUDE_JS)
+CLICK_TRACKER_JS = """
+// Adds the style and attribute snapshots to a click recorded with its
+// element (__el) and rect (__rect). Runs when Python drains the queue, so
+// debounced or dropped clicks never pay for computed styles. Selectors and
+// the DOM path are taken at click time instead: a click that closes a modal
+// or re-renders the page leaves the element detached by drain time.
+function materializeClick(clickData) {
+    var element = clickData.__el;
+    var rect = clickData.__rect;
+    delete clickData.__el;
+    delete clickData.__rect;
+    if (!element) return clickData;
+
+    // Visual properties; a detached element has no computed style left,
+    // so only the size seen at click time is kept
+    if (element.isConnected) {
+        clickData.visualProperties = getVisualProperties(element, rect);
+    } else {
+        clickData.visualProperties = {
+            width: rect.width + 'px',
+            height: rect.height + 'px'
+        };
+    }
+
+    // Collect all attributes, and data-* attributes separately
+    clickData.attributes = {};
+    clickData.dataAttributes = {};
+    copyAttributes(element, clickData);
+    return clickData;
+}
+
+if (!window.clickTrackerInjected) {
+    window.__materializeClick = materializeClick;
+    window.lastClickTime = 0;
+    window.clickPending = false;
+
+    // Capture click immediately and mark as pending
+    document.addEventListener('click', function(e) {
+        var element = e.target;
+        var now = Date.now();
+
+        // Debounce to avoid duplicate events
+        if (now - window.lastClickTime < 100) return;
+        window.lastClickTime = now;
+        window.clickPending = true;
+
+        // Get bounding rectangle for coordinates
+        var rect = element.getBoundingClientRect();
+
+        // Get viewport dimensions
+        var viewportWidth = window.__viewport.width;
+        var viewportHeight = window.__viewport.height;
+
+        // Calculate click coordinates relative to element
+        var relativeX = e.clientX - rect.left;
+        var relativeY = e.clientY - rect.top;
+
+        var clickData = {
+            // Basic element info
+            tagName: element.tagName,
+            id: element.id || '',
+            className: element.className || '',
+            name: element.name || '',
+            type: element.type || '',
+            value: element.value || '',
+
+            // Text content
+            text: textSnippet(element),
+            textContent: element.textContent ? element.textContent.substring(0, 100) : '',
+            title: element.title || '',
+            alt: element.alt || '',
+            placeholder: element.placeholder || '',
+
+            // Link information
+            href: element.href || '',
+            target: element.target || '',
+
+            // Coordinates
+            coordinates: {
+                // Click position in viewport
+                clickX: e.clientX,
+                clickY: e.clientY,
+                // Click position in page
+                pageX: e.pageX,
+                pageY: e.pageY,
+                // Click position relative to element
+                relativeX: relativeX,
+                relativeY: relativeY,
+                // Element position and size
+                elementLeft: rect.left,
+                elementTop: rect.top,
+                elementRight: rect.right,
+                elementBottom: rect.bottom,
+                elementWidth: rect.width,
+                elementHeight: rect.height,
+                // Element center point
+                elementCenterX: rect.left + rect.width / 2,
+                elementCenterY: rect.top + rect.height / 2,
+                // Viewport dimensions
+                viewportWidth: viewportWidth,
+                viewportHeight: viewportHeight,
+                // Scroll position
+                scrollX: window.__viewport.scrollX,
+                scrollY: window.__viewport.scrollY
+            },
+
+            // Selectors for element identification
+            selectors: {
+                xpath: getXPath(element),
+                cssSelector: getCssSelector(element)
+            },
+
+            // DOM traversal path (iframe and shadow DOM chain)
+            domPath: getDomPath(element),
+
+            // Visual properties and attributes are filled in by
+            // materializeClick() when the event is drained
+            __el: element,
+            __rect: rect,
+
+            // Parent information
+            parent: {
+                tagName: element.parentElement ? element.parentElement.tagName : '',
+                id: element.parentElement ? element.parentElement.id : '',
+                className: element.parentElement ? element.parentElement.className : ''
+            },
+
+            // Siblings count
+            siblingsCount: element.parentElement ? element.parentElement.children.length : 0,
+
+            // Image source if applicable
+            src: element.src || '',
+
+            // ARIA attributes for accessibility
+            ariaLabel: element.getAttribute('aria-label') || '',
+            ariaRole: element.getAttribute('role') || '',
+
+            // Timestamp
+            timestamp: new Date().toISOString()
+        };
+
+        window.__pushEvent('clicks', clickData);
+
+        // Clear pending flag after a short delay to ensure event is captured
+        setTimeout(function() {
+            window.clickPending = false;
+        }, 50);
+    }, listenerOptions);
+    window.clickTrackerInjected = true;
+
+    // Inject into one iframe's document
+    function injectClickIframe(iframe, iframeIndex) {
+        try {
+            var iframeDoc = iframe.contentDocument || iframe.contentWindow.document;
+            if (iframeDoc && !iframeDoc._clickTrackerInjected) {
+                iframeDoc.addEventListener('click', function(e) {
+                    var element = e.target;
+                    var now = Date.now();
+                    if (now - window.lastClickTime < 100) return;
+                    window.lastClickTime = now;
+                    window.clickPending = true;
+
+                    var rect = element.getBoundingClientRect();
+                    var clickData = {
+                        tagName: element.tagName,
+                        id: element.id || '',
+                        className: element.className || '',
+                        text: textSnippet(element),
+                        href: element.href || '',
+                        type: element.type || '',
+                        domPath: getDomPath(element),
+                        inIframe: true,
+                        iframeIndex: iframeIndex,
+                        coordinates: {
+                            clickX: e.clientX,
+                            clickY: e.clientY,
+                            pageX: e.pageX,
+                            pageY: e.pageY
+                        },
+                        timestamp: new Date().toISOString()
+                    };
+                    window.__pushEvent('clicks', clickData);
+                    setTimeout(function() { window.clickPending = false; }, 50);
+                }, listenerOptions);
+                iframeDoc._clickTrackerInjected = true;
+            }
+        } catch(e) {
+            // Cross-origin iframe, skip
         }
+    }
+
+    // Inject into one shadow root (nested ones are visited by the caller)
+    function injectClickShadowRoot(shadowRoot) {
+        if (shadowRoot._clickTrackerInjected) return false;
+        shadowRoot.addEventListener('click', function(e) {
+            var element = e.target;
+            var now = Date.now();
+            if (now - window.lastClickTime < 100) return;
+            window.lastClickTime = now;
+            window.clickPending = true;
+
+            var rect = element.getBoundingClientRect();
+            var clickData = {
+                tagName: element.tagName,
+                id: element.id || '',
+                className: element.className || '',
+                text: textSnippet(element),
+                href: element.href || '',
+                type: element.type || '',
+                domPath: getDomPath(element),
+                inShadowRoot: true,
+                coordinates: {
+                    clickX: e.clientX,
+                    clickY: e.clientY,
+                    pageX: e.pageX,
+                    pageY: e.pageY
+                },
+                timestamp: new Date().toISOString()
+            };
+            window.__pushEvent('clicks', clickData);
+            setTimeout(function() { window.clickPending = false; }, 50);
+        }, listenerOptions);
+        shadowRoot._clickTrackerInjected = true;
+    }
+    function injectIntoShadowRoots(root) {
+        forEachShadowRoot(root, injectClickShadowRoot);
+    }
+
+    // Scan existing iframes and shadow DOMs once; after that only added
+    // nodes are looked at
+    try {
+        var iframes = document.querySelectorAll('iframe');
+        for (var i = 0; i < iframes.length; i++) {
+            injectClickIframe(iframes[i], i);
+        }
+    } catch(e) {}
+    try {
+        injectIntoShadowRoots(document);
+    } catch(e) {}
+    try {
+        window.__watchDynamicContexts(injectClickIframe, injectClickShadowRoot);
+    } catch(e) {}
+}
+"""
+
+# Hover tracker: debounced mouseover records into the event ring as 'hovers'
+# (expects TRACKER_PRELUDE_JS)
+HOVER_TRACKER_JS = """
+if (!window.hoverTrackerInjected) {
+    var HOVER_BUFFER_SIZE = 500;
+    window.lastHover = { selector: null, ts: 0 };
+    // Hovered elements are observed lazily; the observer's entries carry a
+    // bounding box computed off the event path, so repeat hovers skip the
+    // synchronous layout. Scrolling or resizing invalidates the boxes
+    window.__rectCache = new WeakMap();
+    var rectObserver = null;
+    try {
+        rectObserver = new IntersectionObserver(function(entries) {
+            for (var i = 0; i < entries.length; i++) {
+                window.__rectCache.set(entries[i].target, entries[i].boundingClientRect);
+            }
+        }, { threshold: 0 });
+        var dropRects = function() { window.__rectCache = new WeakMap(); };
+        window.addEventListener('scroll', dropRects, { capture: true, passive: true });
+        window.addEventListener('resize', dropRects, { passive: true });
+    } catch(_e) {}
+    function hoverRect(el) {
+        var rect = window.__rectCache.get(el);
+        if (rect) return rect;
+        if (rectObserver) {
+            // Re-observing queues a fresh entry for the next hover
+            rectObserver.unobserve(el);
+            rectObserver.observe(el);
+        }
+        return el.getBoundingClientRect();
+    }
+    // Layout and document-level targets are not worth a descriptor, and the
+    // parts of an inline SVG icon stand for the icon itself
+    var SKIPPED_HOVER_TAGS = {HTML: true, BODY: true, HEAD: true, SCRIPT: true, STYLE: true, META: true, LINK: true};
+    function hoverTarget(el) {
+        if (!el || !el.tagName || SKIPPED_HOVER_TAGS[el.tagName]) return null;
+        return el.ownerSVGElement || el;
+    }
+    function captureHover(el) {
+        var now = Date.now();
+        var selector = getCssSelector(el);
+        // Debounce same element within 400ms
+        if (window.lastHover.selector === selector && (now - window.lastHover.ts) < 400) return;
+        window.lastHover.selector = selector; window.lastHover.ts = now;
+        var rect = hoverRect(el);
+        var data = {
+            tagName: el.tagName,
+            id: el.id || '',
+            className: el.className || '',
+            text: textSnippet(el),
+            title: el.title || '',
+            href: el.href || '',
+            type: el.type || '',
+            coordinates: {
+                elementLeft: rect.left,
+                elementTop: rect.top,
+                elementWidth: rect.width,
+                elementHeight: rect.height,
+                elementCenterX: rect.left + rect.width/2,
+                elementCenterY: rect.top + rect.height/2,
+                viewportWidth: window.__viewport.width,
+                viewportHeight: window.__viewport.height,
+                scrollX: window.__viewport.scrollX,
+                scrollY: window.__viewport.scrollY
+            },
+            selectors: {
+                xpath: getXPath(el),
+                cssSelector: selector
+            },
+            domPath: getDomPath(el),
+            inIframe: false,
+            inShadowRoot: false,
+            timestamp: new Date().toISOString()
+        };
+        window.__pushEvent('hovers', data, HOVER_BUFFER_SIZE);
+    }
+    // mouseover only remembers the target; the descriptor is built once per
+    // animation frame for the latest one, so work follows the refresh rate
+    // rather than the pointer's event rate
+    var pendingHover = null, hoverScheduled = false, lastHoverTarget = null;
+    function flushHover() {
+        hoverScheduled = false;
+        var el = pendingHover;
+        pendingHover = null;
+        if (el) captureHover(el);
+    }
+    document.addEventListener('mouseover', function(e) {
+        var el = hoverTarget(e.target);
+        if (!el || el === lastHoverTarget) return;
+        lastHoverTarget = el;
+        pendingHover = el;
+        if (!hoverScheduled) {
+            hoverScheduled = true;
+            requestAnimationFrame(flushHover);
+        }
+    }, listenerOptions);
+    function injectHoverIframe(iframe, iframeIndex) {
+        try {
+            var idoc = iframe.contentDocument || iframe.contentWindow.document;
+            if (idoc && !idoc._hoverTrackerInjected) {
+                idoc.addEventListener('mouseover', function(e){
+                    var el = hoverTarget(e.target); if(!el) return;
+                    var data = {
+                        tagName: el.tagName,
+                        id: el.id || '',
+                        className: el.className || '',
+                        text: textSnippet(el),
+                        inIframe: true,
+                        iframeIndex: iframeIndex,
+                        selectors: { xpath: getXPath(el), cssSelector: getCssSelector(el) },
+                        timestamp: new Date().toISOString()
+                    };
+                    window.__pushEvent('hovers', data, HOVER_BUFFER_SIZE);
+                }, listenerOptions);
+                idoc._hoverTrackerInjected = true;
+            }
+        } catch(_e) {}
+    }
+    function injectHoverShadowRoot(sr) {
+        if (sr._hoverTrackerInjected) return false;
+        sr.addEventListener('mouseover', function(e){
+            var el = hoverTarget(e.target); if(!el) return;
+            var data = {
+                tagName: el.tagName,
+                id: el.id || '',
+                className: el.className || '',
+                text: textSnippet(el),
+                inShadowRoot: true,
+                selectors: { xpath: getXPath(el), cssSelector: getCssSelector(el) },
+                timestamp: new Date().toISOString()
+            };
+            window.__pushEvent('hovers', data, HOVER_BUFFER_SIZE);
+        }, listenerOptions);
+        sr._hoverTrackerInjected = true;
+    }
+    function injectShadow(root){
+        forEachShadowRoot(root, injectHoverShadowRoot);
+    }
+    // Existing iframes and shadow roots once, then only added nodes
+    try {
+        var iframes = document.querySelectorAll('iframe');
+        for (var i=0;i<iframes.length;i++) injectHoverIframe(iframes[i], i);
+    } catch(_e) {}
+    try { injectShadow(document); } catch(_e) {}
+    try { window.__watchDynamicContexts(injectHoverIframe, injectHoverShadowRoot); } catch(_e) {}
+    window.hoverTrackerInjected = true;
+}
+"""
+
+# Input tracker: debounced text input and checkbox/radio changes into
+# the event ring as 'inputs' (expects TRACKER_PRELUDE_JS)
+INPUT_TRACKER_JS = """
+if (!window.inputTrackerInjected) {
+    // Fields typed into since the last capture. One shared timer restarts on
+    // every keystroke (300ms after the last one); when it fires, the whole
+    // set is captured in a single idle callback instead of one timer and
+    // closure per field. Idle callbacks (or the next frame as a fallback) run
+    // after layout, so the geometry and style reads do not force one
+    window.__dirtyInputs = new Set();
+    var inputTimer = null;
+    var whenIdle = window.requestIdleCallback
+        ? function(fn) { window.requestIdleCallback(fn, { timeout: 500 }); }
+        : function(fn) { requestAnimationFrame(fn); };
+
+    function captureInput(element) {
+        // Get bounding rectangle for coordinates
+        var rect = element.getBoundingClientRect();
+
+        // Get viewport dimensions
+        var viewportWidth = window.__viewport.width;
+        var viewportHeight = window.__viewport.height;
+
+        var inputData = {
+            // Basic element info
+            tagName: element.tagName,
+            type: element.type || 'text',
+            id: element.id || '',
+            name: element.name || '',
+            className: element.className || '',
+
+            // Input properties
+            placeholder: element.placeholder || '',
+            value: element.value,
+            maxLength: element.maxLength || -1,
+            minLength: element.minLength || -1,
+            required: element.required || false,
+            disabled: element.disabled || false,
+            readOnly: element.readOnly || false,
+            autocomplete: element.autocomplete || '',
+
+            // Label association
+            label: '',
+
+            // Coordinates
+            coordinates: {
+                // Element position and size
+                elementLeft: rect.left,
+                elementTop: rect.top,
+                elementRight: rect.right,
+                elementBottom: rect.bottom,
+                elementWidth: rect.width,
+                elementHeight: rect.height,
+                // Element center point
+                elementCenterX: rect.left + rect.width / 2,
+                elementCenterY: rect.top + rect.height / 2,
+                // Viewport dimensions
+                viewportWidth: viewportWidth,
+                viewportHeight: viewportHeight,
+                // Scroll position
+                scrollX: window.__viewport.scrollX,
+                scrollY: window.__viewport.scrollY
+            },
+
+            // Selectors for element identification
+            selectors: {
+                xpath: getXPath(element),
+                cssSelector: getCssSelector(element)
+            },
+
+            // DOM traversal path (iframe and shadow DOM chain)
+            domPath: getDomPath(element),
+
+            // Visual properties
+            visualProperties: getVisualProperties(element, rect),
+
+            // Attributes
+            attributes: {},
+
+            // Parent information
+            parent: {
+                tagName: element.parentElement ? element.parentElement.tagName : '',
+                id: element.parentElement ? element.parentElement.id : '',
+                className: element.parentElement ? element.parentElement.className : ''
+            },
+
+            // Form information if in a form
+            form: {
+                id: element.form ? element.form.id : '',
+                name: element.form ? element.form.name : '',
+                action: element.form ? element.form.action : '',
+                method: element.form ? element.form.method : ''
+            },
+
+            // ARIA attributes
+            ariaLabel: element.getAttribute('aria-label') || '',
+            ariaDescribedBy: element.getAttribute('aria-describedby') || '',
+            ariaRequired: element.getAttribute('aria-required') || '',
+
+            // Data attributes
+            dataAttributes: {},
+
+            // Input state
+            selectionStart: element.selectionStart || 0,
+            selectionEnd: element.selectionEnd || 0,
+
+            // Timestamp
+            timestamp: new Date().toISOString()
+        };
+
+        // Try to find associated label
+        var label = element.labels ? element.labels[0] : null;
+        if (!label && element.id) {
+            label = document.querySelector('label[for="' + element.id + '"]');
+        }
+        if (label) {
+            inputData.label = label.innerText || label.textContent || '';
+        }
+
+        // Collect all attributes, and data-* attributes separately
+        copyAttributes(element, inputData);
+
+        window.__pushEvent('inputs', inputData);
+    }
+
+    function flushInputs() {
+        var dirty = window.__dirtyInputs;
+        window.__dirtyInputs = new Set();
+        dirty.forEach(function(element) { captureInput(element); });
+    }
+
+    document.addEventListener('input', function(e) {
+        var element = e.target;
+        if (element.tagName === 'INPUT' || element.tagName === 'TEXTAREA') {
+            window.__dirtyInputs.add(element);
+            clearTimeout(inputTimer);
+            inputTimer = setTimeout(function() {
+                inputTimer = null;
+                whenIdle(flushInputs);
+            }, 300);
+        }
+    }, listenerOptions);
+
+    // Add change event listener for checkboxes and radio buttons
+    document.addEventListener('change', function(e) {
+        var element = e.target;
+        if (element.tagName === 'INPUT' && (element.type === 'checkbox' || element.type === 'radio')) {
+            // Get bounding rectangle for coordinates
+            var rect = element.getBoundingClientRect();
+
+            // Get viewport dimensions
+            var viewportWidth = window.__viewport.width;
+            var viewportHeight = window.__viewport.height;
+
+            var changeData = {
+                // Basic element info
+                tagName: element.tagName,
+                type: element.type,
+                id: element.id || '',
+                name: element.name || '',
+                className: element.className || '',
+
+                // Checkbox/Radio specific properties
+                checked: element.checked,
+                value: element.value || '',
+                required: element.required || false,
+                disabled: element.disabled || false,
+
+                // Label association
+                label: '',
+
+                // Coordinates
+                coordinates: {
+                    // Element position and size
+                    elementLeft: rect.left,
+                    elementTop: rect.top,
+                    elementRight: rect.right,
+                    elementBottom: rect.bottom,
+                    elementWidth: rect.width,
+                    elementHeight: rect.height,
+                    // Element center point
+                    elementCenterX: rect.left + rect.width / 2,
+                    elementCenterY: rect.top + rect.height / 2,
+                    // Viewport dimensions
+                    viewportWidth: viewportWidth,
+                    viewportHeight: viewportHeight,
+                    // Scroll position
+                    scrollX: window.__viewport.scrollX,
+                    scrollY: window.__viewport.scrollY
+                },
+
+                // Selectors for element identification
+                selectors: {
+                    xpath: getXPath(element),
+                    cssSelector: getCssSelector(element)
+                },
+
+                // DOM traversal path (iframe and shadow DOM chain)
+                domPath: getDomPath(element),
+
+                // Visual properties
+                visualProperties: getVisualProperties(element, rect),
+
+                // Attributes
+                attributes: {},
+
+                // Parent information
+                parent: {
+                    tagName: element.parentElement ? element.parentElement.tagName : '',
+                    id: element.parentElement ? element.parentElement.id : '',
+                    className: element.parentElement ? element.parentElement.className : ''
+                },
+
+                // Form information if in a form
+                form: {
+                    id: element.form ? element.form.id : '',
+                    name: element.form ? element.form.name : '',
+                    action: element.form ? element.form.action : '',
+                    method: element.form ? element.form.method : ''
+                },
+
+                // ARIA attributes
+                ariaLabel: element.getAttribute('aria-label') || '',
+                ariaDescribedBy: element.getAttribute('aria-describedby') || '',
+                ariaRequired: element.getAttribute('aria-required') || '',
+
+                // Data attributes
+                dataAttributes: {},
+
+                // Timestamp
+                timestamp: new Date().toISOString()
+            };
+
+            // Try to find associated label
+            var label = element.labels ? element.labels[0] : null;
+            if (!label && element.id) {
+                label = document.querySelector('label[for="' + element.id + '"]');
+            }
+            if (label) {
+                changeData.label = label.innerText || label.textContent || '';
+            }
+
+            // Collect all attributes, and data-* attributes separately
+            copyAttributes(element, changeData);
+
+            window.__pushEvent('inputs', changeData);
+        }
+    }, listenerOptions);
+
+    window.inputTrackerInjected = true;
+
+    // Inject into one iframe's document
+    function injectInputIframe(iframe, iframeIndex) {
+        try {
+            var iframeDoc = iframe.contentDocument || iframe.contentWindow.document;
+            if (iframeDoc && !iframeDoc._inputTrackerInjected) {
+                iframeDoc.addEventListener('input', function(e) {
+                    var element = e.target;
+                    if (element.tagName === 'INPUT' || element.tagName === 'TEXTAREA') {
+                        clearTimeout(element._inputTimeout);
+                        element._inputTimeout = setTimeout(function() {
+                            var inputData = {
+                                tagName: element.tagName,
+                                id: element.id || '',
+                                name: element.name || '',
+                                type: element.type || 'text',
+                                value: element.value,
+                                placeholder: element.placeholder || '',
+                                domPath: getDomPath(element),
+                                inIframe: true,
+                                iframeIndex: iframeIndex,
+                                timestamp: new Date().toISOString()
+                            };
+                            window.__pushEvent('inputs', inputData);
+                        }, 300);
+                    }
+                }, listenerOptions);
+
+                // Add change event listener for checkboxes and radio buttons in iframes
+                iframeDoc.addEventListener('change', function(e) {
+                    var element = e.target;
+                    if (element.tagName === 'INPUT' && (element.type === 'checkbox' || element.type === 'radio')) {
+                        var changeData = {
+                            tagName: element.tagName,
+                            id: element.id || '',
+                            name: element.name || '',
+                            type: element.type,
+                            checked: element.checked,
+                            value: element.value || '',
+                            inIframe: true,
+                            iframeIndex: iframeIndex,
+                            timestamp: new Date().toISOString()
+                        };
+                        window.__pushEvent('inputs', changeData);
+                    }
+                }, listenerOptions);
+
+                iframeDoc._inputTrackerInjected = true;
+            }
+        } catch(e) {
+            // Cross-origin iframe, skip
+        }
+    }
+
+    // Inject into one shadow root (nested ones are visited by the caller)
+    function injectInputShadowRoot(shadowRoot) {
+        if (shadowRoot._inputTrackerInjected) return false;
+        shadowRoot.addEventListener('input', function(e) {
+            var element = e.target;
+            if (element.tagName === 'INPUT' || element.tagName === 'TEXTAREA') {
+                clearTimeout(element._inputTimeout);
+                element._inputTimeout = setTimeout(function() {
+                    var inputData = {
+                        tagName: element.tagName,
+                        id: element.id || '',
+                        name: element.name || '',
+                        type: element.type || 'text',
+                        value: element.value,
+                        placeholder: element.placeholder || '',
+                        domPath: getDomPath(element),
+                        inShadowRoot: true,
+                        timestamp: new Date().toISOString()
+                    };
+                    window.__pushEvent('inputs', inputData);
+                }, 300);
+            }
+        }, listenerOptions);
+
+        // Add change event listener for checkboxes and radio buttons in shadow DOMs
+        shadowRoot.addEventListener('change', function(e) {
+            var element = e.target;
+            if (element.tagName === 'INPUT' && (element.type === 'checkbox' || element.type === 'radio')) {
+                var changeData = {
+                    tagName: element.tagName,
+                    id: element.id || '',
+                    name: element.name || '',
+                    type: element.type,
+                    checked: element.checked,
+                    value: element.value || '',
+                    inShadowRoot: true,
+                    timestamp: new Date().toISOString()
+                };
+                window.__pushEvent('inputs', changeData);
+            }
+        }, listenerOptions);
+
+        shadowRoot._inputTrackerInjected = true;
+    }
+    function injectInputIntoShadowRoots(root) {
+        forEachShadowRoot(root, injectInputShadowRoot);
+    }
+
+    // Scan existing iframes and shadow DOMs once; after that only added
+    // nodes are looked at
+    try {
+        var iframes = document.querySelectorAll('iframe');
+        for (var i = 0; i < iframes.length; i++) {
+            injectInputIframe(iframes[i], i);
+        }
+    } catch(e) {}
+    try {
+        injectInputIntoShadowRoots(document);
+    } catch(e) {}
+    try {
+        window.__watchDynamicContexts(injectInputIframe, injectInputShadowRoot);
+    } catch(e) {}
+}
+"""
+
+# Standalone installers used by inject_*_tracker(), concatenated once at import
+CLICK_TRACKER_INSTALL_JS = TRACKER_PRELUDE_JS + CLICK_TRACKER_JS + "return window.clickTrackerInjected;"
+HOVER_TRACKER_INSTALL_JS = TRACKER_PRELUDE_JS + HOVER_TRACKER_JS + "return window.hoverTrackerInjected;"
+INPUT_TRACKER_INSTALL_JS = TRACKER_PRELUDE_JS + INPUT_TRACKER_JS + "return window.inputTrackerInjected;"
+
+# Loading-detection trackers (DOM mutation observer + fetch/XHR counter).
+# Installed with a single call and, when CDP is available, registered via
+# Page.addScriptToEvaluateOnNewDocument so every navigation gets them
+# before page scripts run.
+LOADING_TRACKERS_JS = """
+if (!window._loadingObserver) {
+    window._mutationCount = 0;
+    window._lastMutationTime = Date.now();
     
-    def _is_redundant_click(self, current_index, optimized_log):
-        """
-        Check if a click is redundant (clicking same element multiple times)
-        """
-        if not optimized_log:
-            return False
-        
-        current = self.activity_log[current_index]
-        current_details = current.get('details', {})
-        
-        # Look at last few activities in optimized log
-        for prev_activity in reversed(optimized_log[-3:]):
-            if prev_activity.get('action') != 'click':
-                continue
-            
-            prev_details = prev_activity.get('details', {})
-            
-            # Check if same element by comparing identifiers
-            same_element = False
-            
-            # Compare by xpath
-            if current_details.get('xpath') and current_details.get('xpath') == prev_details.get('xpath'):
-                same_element = True
-            # Compare by id
-            elif current_details.get('id') and current_details.get('id') == prev_details.get('id'):
-                same_element = True
-            # Compare by coordinates (within tolerance)
-            elif self._same_coordinates(current_details.get('coordinates', {}), 
-                                       prev_details.get('coordinates', {})):
-                same_element = True
-            
-            if same_element:
-                # Check if clicks are close in time (within 2 seconds)
-                current_time = current.get('timestamp', '')
-                prev_time = prev_activity.get('timestamp', '')
-                
-                try:
-                    current_dt = datetime.fromisoformat(current_time)
-                    prev_dt = datetime.fromisoformat(prev_time)
-                    time_diff = (current_dt - prev_dt).total_seconds()
-                    
-                    if time_diff < 2:  # Clicks within 2 seconds
-                        return True  # Redundant
-                except Exception:
-                    pass
-        
-        return False
-    
-    def _same_coordinates(self, coords1, coords2, tolerance=10):
-        """Check if two sets of coordinates are the same (within tolerance)"""
-        if not coords1 or not coords2:
-            return False
+    // Observer callbacks only queue records; counting/filtering happens once
+    // per burst in an idle callback (setTimeout fallback)
+    let pendingRecords = [];
+    let pendingOverflow = 0;
+    let lastSeen = Date.now();
+    let flushScheduled = false;
+    
+    function flushMutations() {
+        flushScheduled = false;
         
-        x1 = coords1.get('elementCenterX', 0)
-        y1 = coords1.get('elementCenterY', 0)
-        x2 = coords2.get('elementCenterX', 0)
-        y2 = coords2.get('elementCenterY', 0)
+        // Filter out trivial mutations
+        let significantMutations = pendingRecords.filter(m => {
+            // Ignore style/class changes unless significant
+            if (m.type === 'attributes') {
+                return m.attributeName === 'class' && 
+                       (m.target.className.includes('loading') || 
+                        m.target.className.includes('skeleton'));
+            }
+            return true;
+        });
         
-        if x1 == 0 or y1 == 0 or x2 == 0 or y2 == 0:
-            return False
+        window._mutationCount += significantMutations.length + pendingOverflow;
+        window._lastMutationTime = lastSeen;
+        pendingRecords = [];
+        pendingOverflow = 0;
+    }
+    
+    window._loadingObserver = new MutationObserver((mutations) => {
+        lastSeen = Date.now();
         
-        return abs(x1 - x2) <= tolerance and abs(y1 - y2) <= tolerance
+        if (window._mutationCount > 500) {
+            // Already well past the "heavy mutations" threshold - just count
+            pendingOverflow++;
+        } else if (pendingRecords.length < 200) {
+            // Bounded number of records to filter per flush
+            pendingRecords.push(...mutations.slice(0, 200 - pendingRecords.length));
+        }
         
-    def track_navigation(self):
-        """Track URL changes"""
-        current_url = self.driver.current_url
-        current_title = self.driver.title
+        if (flushScheduled) return;
+        flushScheduled = true;
+        if (window.requestIdleCallback) {
+            window.requestIdleCallback(flushMutations, { timeout: 50 });
+        } else {
+            setTimeout(flushMutations, 0);
+        }
+    });
+    
+    // Observe document body for changes (the whole document when evaluated
+    // on a new document, before <body> exists)
+    window._loadingObserver.observe(document.body || document, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        attributeFilter: ['class', 'style', 'hidden']
+    });
+    
+    console.log('[MUTATION] Observer initialized');
+}
+
+if (!window._networkTracker) {
+    window._networkTracker = {
+        pendingRequests: 0,
+        lastRequestTime: 0
+    };
+    
+    // Track fetch requests
+    const originalFetch = window.fetch;
+    window.fetch = function(...args) {
+        window._networkTracker.pendingRequests++;
+        window._networkTracker.lastRequestTime = Date.now();
         
-        if current_url != self.previous_url:
-            self.record_activity("navigation", {
-                "url": current_url,
-                "title": current_title,
-                "previous_url": self.previous_url
+        return originalFetch.apply(this, args)
+            .then(response => {
+                window._networkTracker.pendingRequests--;
+                return response;
             })
-            self.previous_url = current_url
-            self.previous_title = current_title
-            
-            # Return True to indicate page changed (need to re-inject)
-            return True
-        return False
+            .catch(error => {
+                window._networkTracker.pendingRequests--;
+                throw error;
+            });
+    };
+    
+    // Track XMLHttpRequest
+    const originalOpen = XMLHttpRequest.prototype.open;
+    const originalSend = XMLHttpRequest.prototype.send;
+    
+    XMLHttpRequest.prototype.open = function(...args) {
+        this._tracked = true;
+        return originalOpen.apply(this, args);
+    };
+    
+    XMLHttpRequest.prototype.send = function(...args) {
+        if (this._tracked) {
+            window._networkTracker.pendingRequests++;
+            window._networkTracker.lastRequestTime = Date.now();
             
-    def track_tab_switching(self):
-        """Track tab/window switching"""
-        # Initialization
-        if not hasattr(self, 'tab_metadata'):
-            self.tab_metadata = {}
-        if not hasattr(self, 'previous_handle'):
-            try:
-                self.previous_handle = self.driver.current_window_handle
-            except Exception:
-                self.previous_handle = None
-        if not self.previous_window_handles:
-            try:
-                self.previous_window_handles = list(self.driver.window_handles)
-            except Exception:
-                self.previous_window_handles = []
+            this.addEventListener('loadend', () => {
+                window._networkTracker.pendingRequests--;
+            });
+        }
+        return originalSend.apply(this, args);
+    };
+    
+    console.log('[NETWORK] Tracker initialized');
+}
+"""
 
-        try:
-            current_handles = list(self.driver.window_handles)
-        except Exception:
-            return False
+# Loading checks, each a script body returning a reason string or null.
+# Run standalone by the _check_* methods, or fused into BROWSER_STATE_JS.
+DOM_MUTATION_CHECK_JS = """
+if (!window._loadingObserver) return null;
 
-        switched = False
+let now = Date.now();
+let timeSinceLastMutation = now - window._lastMutationTime;
+let recentMutations = window._mutationCount;
 
-        # Detect added/removed tabs without switching context (avoid forcing focus)
-        if current_handles != self.previous_window_handles:
-            added = [h for h in current_handles if h not in self.previous_window_handles]
-            removed = [h for h in self.previous_window_handles if h not in current_handles]
+// Reset counter for next check
+window._mutationCount = 0;
 
-            for h in added:
-                # Don't switch; metadata will be enriched on first activation
-                self.tab_metadata[h] = {"first_title": None, "first_url": None, "created_at": datetime.now().isoformat()}
-                self.record_activity("new_tab", {
-                    "handle": h,
-                    "title": None,
-                    "url": None,
-                    "total_tabs": len(current_handles)
-                })
-            for h in removed:
-                self.record_activity("tab_closed", {"handle": h, "total_tabs": len(current_handles)})
-                if h in self.tab_metadata:
-                    del self.tab_metadata[h]
-            self.previous_window_handles = current_handles.copy()
+// More lenient thresholds to avoid pausing after click-triggered DOM changes
+// Only consider loading if:
+// 1. Very recent mutations (< 150ms) AND many mutations (> 10)
+// 2. OR sustained heavy mutations (> 20 changes)
+if (timeSinceLastMutation < 150 && recentMutations > 10) {
+    return 'DOM mutations ' + timeSinceLastMutation + 'ms ago (' + recentMutations + ' changes)';
+}
+if (recentMutations > 20) {
+    return 'Heavy DOM mutations: ' + recentMutations + ' changes';
+}
 
-        # Current active handle as reported by driver
-        try:
-            current_handle = self.driver.current_window_handle
-        except Exception:
-            current_handle = None
+return null;
+"""
 
-        # If no change, nothing to do
-        if current_handle is None or current_handle == self.previous_handle:
-            return False
+VISUAL_LOADER_CHECK_JS = """
+const LOADING_WORDS = ['loading', 'please wait', 'processing', 'cargando'];
 
-        # Update metadata for newly active tab
-        try:
-            cur_title = self.driver.title
-            cur_url = self.driver.current_url
-        except Exception:
-            cur_title = ""
-            cur_url = ""
-        if current_handle in self.tab_metadata:
-            meta = self.tab_metadata[current_handle]
-            if meta.get('first_title') is None:
-                meta['first_title'] = cur_title
-            if meta.get('first_url') is None:
-                meta['first_url'] = cur_url
-        else:
-            self.tab_metadata[current_handle] = {"first_title": cur_title, "first_url": cur_url, "created_at": datetime.now().isoformat()}
+// Plain substring scan - no regex work for the vast majority of
+// text nodes that mention none of the loading words
+function hasLoadingText(t) {
+    if (t.length < 7 || t.length > 2000) return false;
+    const tl = t.toLowerCase();
+    for (let i = 0; i < LOADING_WORDS.length; i++) {
+        if (tl.indexOf(LOADING_WORDS[i]) >= 0) return true;
+    }
+    return false;
+}
+let found = [];
 
-        # Record switch
-        self.record_activity("switch_tab", {
-            "from_window": self.previous_handle,
-            "to_window": current_handle,
-            "title": cur_title,
-            "url": cur_url,
-            "pattern": cur_title[:80],
-            "match_type": "title",
-            "use_regex": False
-        })
-        switched = True
+// Helper function to check if element is truly visible
+function isElementVisible(el) {
+    // Cheap layout checks first: offsetParent is null for display:none
+    // (or detached) subtrees, and an unrendered box has no client rects
+    if (el.getClientRects().length === 0) {
+        return false;
+    }
 
-        # Re-inject trackers in the now-active context (safe; no tab iteration)
-        try:
-            self.inject_click_tracker()
-            self.inject_input_tracker()
-        except Exception as reinject_err:
-            print(f"[TAB] Reinjection failed after switch: {reinject_err}")
+    let style = null;
+    if (!el.offsetParent && el.tagName !== 'BODY' && el.tagName !== 'HTML') {
+        // position:fixed elements have no offsetParent but can still render
+        style = window.getComputedStyle(el);
+        if (style.position !== 'fixed') {
+            return false;
+        }
+    }
 
-        self.previous_handle = current_handle
-        return switched
-            
-    def is_page_loading(self):
-        """
-        Enhanced page loading detection with network monitoring and DOM mutations
-        Combines multiple detection methods for accuracy
-        Returns: (is_loading: bool, reason: str)
-        """
+    // Must have dimensions and not be off-screen (negative positioning)
+    let rect = el.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) {
+        return false;
+    }
+    if (rect.right < 0 || rect.bottom < 0) {
+        return false;
+    }
+
+    // Only now touch computed style: first for the element itself, then
+    // (below) for its ancestors, since opacity is not inherited
+    style = style || window.getComputedStyle(el);
+
+    // Visibility check
+    if (style.visibility === 'hidden' || style.visibility === 'collapse') {
+        return false;
+    }
+
+    // Opacity check - consider < 0.1 as invisible
+    if (parseFloat(style.opacity) < 0.1) {
+        return false;
+    }
+
+    // Check for clip that hides the element
+    if (style.clip && style.clip !== 'auto' && style.clip.includes('rect(0')) {
+        return false;
+    }
+
+    // Check ALL parent elements up to body/html for hidden properties;
+    // only candidates that passed the checks above get this far
+    let parent = el.parentElement;
+    while (parent && parent.tagName !== 'BODY' && parent.tagName !== 'HTML') {
+        let parentStyle = window.getComputedStyle(parent);
+
+        if (parentStyle.visibility === 'hidden' || parentStyle.visibility === 'collapse') {
+            return false;
+        }
+
+        if (parseFloat(parentStyle.opacity) < 0.1) {
+            return false;
+        }
+
+        // Check if parent has zero dimensions (collapsed)
+        if (parent.offsetWidth === 0 || parent.offsetHeight === 0) {
+            return false;
+        }
+
+        parent = parent.parentElement;
+    }
+
+    return true;
+}
+
+// Check for common loading class names
+const loadingClasses = [
+    'loading', 'spinner', 'loader', 'skeleton',
+    'shimmer', 'progress', 'loading-overlay', 'preloader'
+];
+
+for (let cls of loadingClasses) {
+    let elements = document.querySelectorAll(`[class*="${cls}"]`);
+    for (let el of elements) {
+        if (isElementVisible(el)) {
+            found.push('[class*="' + cls + '"]');
+            break;
+        }
+    }
+}
+
+// Check for loading text - walk text nodes directly (no innerText
+// pre-check, which forces a full layout) and stop at first visible match
+let walker = document.createTreeWalker(
+    document.body,
+    NodeFilter.SHOW_TEXT,
+    {
+        acceptNode: (node) => hasLoadingText(node.textContent)
+            ? NodeFilter.FILTER_ACCEPT
+            : NodeFilter.FILTER_SKIP
+    }
+);
+
+while (walker.nextNode()) {
+    let parent = walker.currentNode.parentElement;
+    if (parent && isElementVisible(parent)) {
+        found.push('Loading text');
+        break;
+    }
+}
+
+// Check for progress bars
+let progressBars = document.querySelectorAll('progress, [role="progressbar"]');
+for (let bar of progressBars) {
+    if (isElementVisible(bar)) {
+        found.push('Progress bar');
+        break;
+    }
+}
+
+// Check for CSS animations (spinners) - ask the animation engine for
+// running animations instead of computing style on every candidate
+if (document.getAnimations) {
+    for (const a of document.getAnimations()) {
+        const n = a.animationName || '';
+        if (/rotate|spin|pulse|bounce/i.test(n)) {
+            const el = a.effect && a.effect.target;
+            if (el && isElementVisible(el)) {
+                found.push('CSS animation');
+                break;
+            }
+        }
+    }
+}
+
+return found.length > 0 ? found.join(', ') : null;
+"""
+
+FRAMEWORK_LOADING_CHECK_JS = """
+let found = [];
+
+// Angular
+if (window.getAllAngularRootElements) {
+    try {
+        let roots = window.getAllAngularRootElements();
+        if (roots && roots.length > 0) {
+            let ngApp = roots[0];
+            // Check for Angular loading indicators
+            if (ngApp.querySelector('[ng-if*="loading"]') ||
+                ngApp.querySelector('[ng-show*="loading"]')) {
+                found.push('Angular loading');
+            }
+        }
+    } catch(e) {}
+}
+
+// Vue (check for v-loading directive)
+if (window.__VUE__) {
+    let vLoading = document.querySelector('[v-loading="true"]');
+    if (vLoading) found.push('Vue v-loading');
+}
+
+// React (check for common loading components)
+let reactLoading = document.querySelector('[data-testid*="loading"], [class*="Loading"]');
+if (reactLoading && reactLoading.offsetParent !== null) {
+    found.push('React loading component');
+}
+
+// jQuery AJAX
+if (window.jQuery && jQuery.active > 0) {
+    found.push('jQuery.active: ' + jQuery.active);
+}
+
+return found.length > 0 ? found.join(', ') : null;
+"""
+
+# Everything the monitor loop needs per tick in one round-trip, including the
+# tracker event queues. Loader checks
+# short-circuit in the same order as is_page_loading().
+BROWSER_STATE_JS = """
+var state = {
+    url: location.href,
+    title: document.title,
+    ready: document.readyState,
+    mut: null,
+    loaders: null,
+    fw: null,
+    // arguments[0] > 0 also drains pending tracker events (at most that many per kind)
+    events: (arguments[0] && window.__drainEvents) ? window.__drainEvents(arguments[0]) : null
+};
+if (state.ready === 'complete') {
+    // A failing check counts as "not loading", like the standalone _check_* methods
+    try { state.mut = (function() {""" + DOM_MUTATION_CHECK_JS + """})(); } catch (e) {}
+    if (!state.mut) {
+        try { state.loaders = (function() {""" + VISUAL_LOADER_CHECK_JS + """})(); } catch (e) {}
+    }
+    if (!state.mut && !state.loaders) {
+        try { state.fw = (function() {""" + FRAMEWORK_LOADING_CHECK_JS + """})(); } catch (e) {}
+    }
+}
+return state;
+"""
+
+# BROWSER_STATE_JS for execute_script, handing its result back as one JSON
+# string so Selenium does not unmarshal the nested event dicts key by key
+BROWSER_STATE_JSON_JS = "return JSON.stringify((function() {" + BROWSER_STATE_JS + "}).apply(null, arguments));"
+
+BrowserState = namedtuple("BrowserState", "url title handles ready mut loaders fw events", defaults=(None,))
+
+# Placeholder for LLM integration
+def convert_to_natural_language(activity_log):
+    """Placeholder: convert activity logs to natural language (LLM hook)."""
+    print("\n=== Activity Log ===")
+    for activity in activity_log:
+        print(json.dumps(activity, indent=2))
+
+
+class BrowserActivityRecorder:
+    # Containers recognised as custom (HTML/CSS) modal dialogs, in priority order
+    _MODAL_SELECTORS = (
+        "[role='dialog']",
+        ".modal.show",
+        ".modal.in",
+        ".popup-overlay",
+        ".dialog-overlay",
+        "[aria-modal='true']",
+        ".sweet-alert",
+        ".swal2-container",
+        ".dialog",
+        ".popup"
+    )
+    
+    # Button-like elements inside custom modals, joined so one query finds them all
+    _MODAL_BUTTON_SELECTORS = (
+        'button',
+        '[role="button"]',
+        'a.btn',
+        'a.button',
+        '.btn',
+        '.button',
+        'input[type="button"]',
+        'input[type="submit"]',
+        '[data-dismiss="modal"]',
+        '.modal-close',
+        '.dialog-close',
+        '.close',
+        '.swal2-confirm',
+        '.swal2-cancel'
+    )
+    _MODAL_BUTTON_SELECTOR_CSS = ", ".join(_MODAL_BUTTON_SELECTORS)
+    
+    # Close buttons that mark a modal as dismissable
+    _CLOSE_BUTTON_SELECTORS = (
+        "button.close",
+        "[aria-label='Close']",
+        ".modal-close",
+        "[data-dismiss='modal']"
+    )
+    _CLOSE_BUTTON_SELECTOR_CSS = ", ".join(_CLOSE_BUTTON_SELECTORS)
+    
+    # Max events of each kind returned by one __drainEvents() call
+    DRAIN_BATCH_SIZE = 500
+    # Max events of each kind buffered in the page between drains (oldest dropped)
+    EVENT_BUFFER_SIZE = 2000
+    # Screenshots waiting to be saved in the background before we save inline
+    MAX_PENDING_SCREENSHOTS = 8
+    # Visible modal buttons considered for text matching (best-scored first)
+    MAX_MODAL_BUTTONS = 32
+    # Activities are also appended to a JSONL journal, written in batches;
+    # one file per recording session so a new session never truncates the last
+    ACTIVITY_JOURNAL_PATH = "activity_log_{session}.jsonl"
+    JOURNAL_FLUSH_EVERY = 128
+    # Seconds between monitor ticks when polling: back to MIN after a tick that
+    # drained events, growing by POLL_BACKOFF up to MAX while idle. When events
+    # are pushed through the CDP binding, idle ticks (navigation/popup checks)
+    # wait PUSH_POLL_INTERVAL instead
+    MIN_POLL_INTERVAL = 0.01
+    MAX_POLL_INTERVAL = 0.5
+    POLL_BACKOFF = 1.5
+    PUSH_POLL_INTERVAL = 1.0
+    
+    def __init__(self, driver, enable_hover_recording=True):
+        self.driver = driver
+        self.activity_log = []
+        self.previous_url = ""
+        self.previous_title = ""
+        self.previous_window_handles = ()  # tuple, so unchanged state compares cheaply
+        self.element_tracker = {}
+        self.use_cdp = False
+        self.injection_failed_count = 0
+        self.screenshot_counter = 0
+        self.enable_hover_recording = enable_hover_recording  # Control hover recording
+        self.is_recording = True  # Control flag for monitor loop
+        self._poll_interval = self.MIN_POLL_INTERVAL  # adapted by _wait_for_activity()
+        
+        # Click, input and (optionally) hover trackers as one script, sent only
+        # when the page does not already have them (window.__trackersInjected)
+        self._tracker_script = (
+            "if (window.__trackersInjected) return true;\n"
+            + TRACKER_PRELUDE_JS + CLICK_TRACKER_JS + INPUT_TRACKER_JS
+            + (HOVER_TRACKER_JS if enable_hover_recording else "")
+            + "window.__trackersInjected = !!(window.clickTrackerInjected && window.inputTrackerInjected"
+            + (" && window.hoverTrackerInjected" if enable_hover_recording else "")
+            + ");\nreturn window.__trackersInjected;"
+        )
+        self._trackers_injected_for_url = None
+        self._trackers_registered = False  # set once CDP injects them into every new document
+        self._browser_state_expr = "JSON.stringify((function() {" + BROWSER_STATE_JS + "}).call(null, "
+        
+        # Create screenshots directory
+        self.screenshots_dir = "screenshots"
+        if not os.path.exists(self.screenshots_dir):
+            os.makedirs(self.screenshots_dir)
+        
+        # Initialize VLM for async description generation
+        self.vlm = OllamaVLM(model="granite3.2-vision")
+        
+        # Async task queue for VLM processing
+        self.vlm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="VLM")
+        self.vlm_task_queue = queue.Queue()
+        self.vlm_results = {}  # Store VLM results by activity index
+        self.vlm_lock = threading.Lock()
+        
+        # Highlighted modal-button screenshots are decoded/saved off the monitor thread
+        self._screenshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Screenshot")
+        self._screenshot_slots = threading.BoundedSemaphore(self.MAX_PENDING_SCREENSHOTS)
+        
+        # Modals whose button was clicked but that stayed open (by driver
+        # element id); they are left alone instead of being re-clicked each tick
+        self._persistent_modal_ids = set()
+        
+        # Incremental on-disk copy of the session, flushed every JOURNAL_FLUSH_EVERY
+        # activities so a long recording is not only held in memory
+        self._journal_pending = []
+        self._journal_written = 0  # activities already in the file
+        self.journal_path = self.ACTIVITY_JOURNAL_PATH.format(session=datetime.now().strftime("%Y%m%d_%H%M%S"))
         try:
-            # Check 1: Document ready state (1ms)
-            doc_state = self.driver.execute_script("return document.readyState;")
-            if doc_state != "complete":
-                return True, f"document.readyState = '{doc_state}'"
-            
-            # Check 2: Network activity monitoring (5ms) - COMMENTED OUT
-            # network_reason = self._check_network_activity()
-            # if network_reason:
-            #     return True, network_reason
-            
-            # Check 3: DOM mutations (10ms)
-            mutation_reason = self._check_dom_mutations()
-            if mutation_reason:
-                return True, mutation_reason
-            
-            # Check 4: Visual loaders and animations (50ms)
-            loader_reason = self._check_visual_loaders()
-            if loader_reason:
-                return True, loader_reason
-            
-            # Check 5: Framework-specific checks (5ms)
-            framework_reason = self._check_framework_loading()
-            if framework_reason:
-                return True, framework_reason
-            
-            # All checks passed - page is ready
-            return False, "All checks passed"
-            
+            self._journal = open(self.journal_path, 'ab', buffering=1 << 16)
         except Exception as e:
-            # On error, assume loading (safe default)
-            return True, f"Check error: {str(e)}"
+            logger.warning(f"Could not open activity journal: {e}")
+            self._journal = None
+        
+        # Network monitoring for loading detection
+        self.pending_network_requests = 0
+        self.network_monitoring_enabled = False
+        self._last_loading_snapshot = None  # (monotonic_ts, BrowserState) from poll_browser_state
+        
+        # Try to enable CDP for more reliable tracking
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Page.enable', {})
+            self.use_cdp = True
+            self.network_monitoring_enabled = True
+            logger.info("Chrome DevTools Protocol enabled for enhanced tracking")
+            print("[INFO] Chrome DevTools Protocol enabled for enhanced tracking")
+        except Exception as e:
+            logger.warning(f"CDP not available: {e}")
+            print("[INFO] CDP not available, using JavaScript injection method")
+        
+        # Setup DOM mutation observer and network tracker for loading detection
+        self._tracker_tabs = set()  # window handles _install_all_trackers has run in
+        self._install_all_trackers()
+        
+        # Subscribe to CDP Target events for tab-change detection
+        self._start_target_listener()
+        
+    def record_activity(self, action_type, details):
+        """Record an activity with timestamp"""
+        activity = {
+            "timestamp": datetime.now().isoformat(),
+            "action": action_type,
+            "details": details
+        }
+
+        # Attach window/tab context so replay can properly switch
+        try:
+            current_handle = self.driver.current_window_handle
+            handles = list(self.driver.window_handles)
+            activity["window_handle"] = current_handle
+            activity["tab_index"] = handles.index(current_handle) if current_handle in handles else 0
+            activity["total_tabs"] = len(handles)
+        except Exception:
+            # If driver context not available, skip adding tab metadata
+            pass
+        
+        # Capture multiple locators for click, input, and hover events (Phase 1 enhancement)
+        if action_type in ["click", "text_input", "hover"]:
+            locators = self.capture_multiple_locators(details)
+            if locators:
+                activity["locators"] = locators
+        
+        # Get activity index before appending
+        activity_index = len(self.activity_log)
+        self.activity_log.append(activity)
+        
+        # Capture screenshot & trigger VLM for click and text input events
+        if action_type in ["click", "text_input"]:
+            screenshot_info = self.capture_screenshot_with_highlight(details)
+            if screenshot_info:
+                activity["screenshot"] = screenshot_info
+                screenshot_path = screenshot_info.get('path')
+                if screenshot_path:
+                    self.trigger_async_vlm_description(
+                        activity_index,
+                        screenshot_path,
+                        details,
+                        action_type
+                    )
+            # Print concise summary
+            if action_type == "click":
+                summary = f"Element: {details.get('tagName', 'N/A')}"
+                if details.get('id'):
+                    summary += f", ID: {details['id']}"
+                if details.get('text'):
+                    summary += f", Text: {details['text'][:30]}"
+                coords = details.get('coordinates', {})
+                if coords:
+                    summary += f", Position: ({coords.get('clickX', 0):.0f}, {coords.get('clickY', 0):.0f})"
+                print(f"[{action_type}] {summary}")
+            else:  # text_input
+                summary = f"Field: {details.get('tagName', 'N/A')}"
+                if details.get('id'):
+                    summary += f", ID: {details['id']}"
+                elif details.get('name'):
+                    summary += f", Name: {details['name']}"
+                if details.get('label'):
+                    summary += f", Label: {details['label'][:30]}"
+                if details.get('value'):
+                    value = details['value'][:30] + "..." if len(details['value']) > 30 else details['value']
+                    summary += f", Value: {value}"
+                print(f"[{action_type}] {summary}")
+        elif action_type == "hover":
+            # Add a synthesized description for VLM hover fallback
+            txt = details.get('text') or details.get('title') or details.get('ariaLabel') or ''
+            tag = details.get('tagName','element')
+            description_parts = [tag]
+            if txt:
+                description_parts.append(f"with text '{txt[:60]}'")
+            if details.get('id'):
+                description_parts.append(f"id '{details['id']}'")
+            if details.get('className'):
+                # keep only first class token to avoid noise
+                first_class = str(details.get('className')).split()[0]
+                description_parts.append(f"class '{first_class}'")
+            synthesized = ' '.join(description_parts)
+            details['vlm_description'] = synthesized  # mutate details so executor receives it
+            summary = f"Hover: {synthesized[:100]}"
+            print(f"[{action_type}] {summary}")
+            # (No screenshot captured for hover events)
+        
+        # Journaled last, once the screenshot and hover description are attached
+        self._journal_activity(activity)
+    
+    def stop_recording(self):
+        """Stop the recording loop"""
+        print("[INFO] Stopping recording...")
+        self.is_recording = False
+        self._stop_target_listener()
     
-    def _setup_mutation_observer(self):
+    def _stop_target_listener(self):
         """
-        Setup MutationObserver to track DOM changes
-        Called once during initialization
+        Cancel the CDP target listener now; it only checks is_recording when
+        a target event arrives, which may not happen again for a long time
         """
+        cancel = getattr(self, "_target_listener_cancel", None)
+        if cancel is None:
+            return
+        self._target_listener_cancel = None
+        token, scope = cancel
         try:
-            self.driver.execute_script("""
-                if (!window._loadingObserver) {
-                    window._mutationCount = 0;
-                    window._lastMutationTime = Date.now();
-                    
-                    window._loadingObserver = new MutationObserver((mutations) => {
-                        // Filter out trivial mutations
-                        let significantMutations = mutations.filter(m => {
-                            // Ignore style/class changes unless significant
-                            if (m.type === 'attributes') {
-                                return m.attributeName === 'class' && 
-                                       (m.target.className.includes('loading') || 
-                                        m.target.className.includes('skeleton'));
-                            }
-                            return true;
-                        });
-                        
-                        window._mutationCount += significantMutations.length;
-                        window._lastMutationTime = Date.now();
-                    });
-                    
-                    // Observe document body for changes
-                    window._loadingObserver.observe(document.body, {
-                        childList: true,
-                        subtree: true,
-                        attributes: true,
-                        attributeFilter: ['class', 'style', 'hidden']
-                    });
-                    
-                    console.log('[MUTATION] Observer initialized');
-                }
-            """)
-        except Exception as e:
-            print(f"[WARNING] Could not setup mutation observer: {e}")
+            trio.from_thread.run_sync(scope.cancel, trio_token=token)
+        except Exception:
+            # The trio run already ended
+            pass
     
-    def _setup_network_tracker(self):
-        """
-        Setup JavaScript-based network request tracking
-        Tracks fetch and XMLHttpRequest
-        """
+    def capture_multiple_locators(self, element_details):
+        """Return a dictionary of multiple locator strategies for robust replay."""
+        locators = {}
         try:
-            self.driver.execute_script("""
-                if (!window._networkTracker) {
-                    window._networkTracker = {
-                        pendingRequests: 0,
-                        lastRequestTime: 0
-                    };
-                    
-                    // Track fetch requests
-                    const originalFetch = window.fetch;
-                    window.fetch = function(...args) {
-                        window._networkTracker.pendingRequests++;
-                        window._networkTracker.lastRequestTime = Date.now();
-                        
-                        return originalFetch.apply(this, args)
-                            .then(response => {
-                                window._networkTracker.pendingRequests--;
-                                return response;
-                            })
-                            .catch(error => {
-                                window._networkTracker.pendingRequests--;
-                                throw error;
-                            });
-                    };
-                    
-                    // Track XMLHttpRequest
-                    const originalOpen = XMLHttpRequest.prototype.open;
-                    const originalSend = XMLHttpRequest.prototype.send;
-                    
-                    XMLHttpRequest.prototype.open = function(...args) {
-                        this._tracked = true;
-                        return originalOpen.apply(this, args);
-                    };
-                    
-                    XMLHttpRequest.prototype.send = function(...args) {
-                        if (this._tracked) {
-                            window._networkTracker.pendingRequests++;
-                            window._networkTracker.lastRequestTime = Date.now();
-                            
-                            this.addEventListener('loadend', () => {
-                                window._networkTracker.pendingRequests--;
-                            });
-                        }
-                        return originalSend.apply(this, args);
-                    };
-                    
-                    console.log('[NETWORK] Tracker initialized');
+            if element_details.get('id'):
+                locators['id'] = element_details['id']
+            if element_details.get('name'):
+                locators['name'] = element_details['name']
+            if element_details.get('className'):
+                locators['class'] = element_details['className']
+            if element_details.get('tagName'):
+                locators['tag_name'] = element_details['tagName']
+            if element_details.get('text'):
+                locators['text'] = element_details['text'][:100]
+            if element_details.get('placeholder'):
+                locators['placeholder'] = element_details['placeholder']
+            if element_details.get('type'):
+                locators['type'] = element_details['type']
+            if element_details.get('ariaLabel'):
+                locators['aria_label'] = element_details['ariaLabel']
+            if element_details.get('value'):
+                locators['value'] = element_details['value']
+            if element_details.get('cssSelector'):
+                locators['css_selector'] = element_details['cssSelector']
+            if element_details.get('xpath'):
+                locators['xpath'] = element_details['xpath']
+            
+            # Handle nested selectors object (from new recording format)
+            selectors = element_details.get('selectors', {})
+            if selectors:
+                if selectors.get('cssSelector') and not locators.get('css_selector'):
+                    locators['css_selector'] = selectors['cssSelector']
+                if selectors.get('xpath') and not locators.get('xpath'):
+                    locators['xpath'] = selectors['xpath']
+            
+            coords = element_details.get('coordinates', {})
+            if coords and all(k in coords for k in ['clickX', 'clickY', 'width', 'height']):
+                locators['coordinates'] = {
+                    'x': coords['clickX'],
+                    'y': coords['clickY'],
+                    'width': coords['width'],
+                    'height': coords['height']
                 }
-            """)
+            if element_details.get('inShadowRoot'):
+                locators['in_shadow_root'] = True
+            if element_details.get('inIframe'):
+                locators['in_iframe'] = True
+            if element_details.get('domPath'):
+                locators['dom_path'] = element_details['domPath']
+            if element_details.get('label'):
+                locators['label'] = element_details['label']
         except Exception as e:
-            print(f"[WARNING] Could not setup network tracker: {e}")
+            log_exception(logger, f"Error capturing locators: {e}")
+        return locators
     
-    def _check_network_activity(self):
-        """
-        Check if there are active network requests
-        Uses both JavaScript tracker and Performance API
-        Returns: reason string if active, None if not active
-        """
-        try:
-            result = self.driver.execute_script("""
-                let reasons = [];
-                
-                // Check JavaScript tracker
-                if (window._networkTracker && window._networkTracker.pendingRequests > 0) {
-                    reasons.push('Active fetch/XHR: ' + window._networkTracker.pendingRequests);
-                }
-                
-                // Check Performance API for in-progress requests
-                let inProgress = window.performance.getEntriesByType('resource')
-                    .filter(r => r.duration === 0 || (performance.now() - r.startTime) < 100);
-                
-                if (inProgress.length > 0) {
-                    reasons.push('Resources loading: ' + inProgress.length);
-                }
+    def _next_screenshot_path(self):
+        """Reserve the next screenshot filename; returns (filename, path)"""
+        self.screenshot_counter += 1
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        screenshot_filename = f"screenshot_{self.screenshot_counter}_{timestamp}.png"
+        return screenshot_filename, os.path.join(self.screenshots_dir, screenshot_filename)
+    
+    def _save_highlighted_screenshot(self, screenshot_png, screenshot_filename, screenshot_path, coords):
+        """Decode a captured PNG, draw the element highlight and save it"""
+        if coords:
+            # Open image with PIL
+            image = Image.open(BytesIO(screenshot_png))
+            
+            # Add visual marker for VLM focus (optional but helpful)
+            from PIL import ImageDraw
+            draw = ImageDraw.Draw(image)
+            
+            # Get element bounds
+            left = coords.get('elementLeft', 0)
+            top = coords.get('elementTop', 0)
+            width = coords.get('elementWidth', 0)
+            height = coords.get('elementHeight', 0)
+            
+            # Draw red bounding box around element
+            if left > 0 and top > 0 and width > 0 and height > 0:
+                # Draw rectangle
+                draw.rectangle(
+                    [(left, top), (left + width, top + height)],
+                    outline='red',
+                    width=3
+                )
                 
-                // Check jQuery if present
-                if (window.jQuery && jQuery.active > 0) {
-                    reasons.push('jQuery.active: ' + jQuery.active);
+                # Draw center crosshair
+                center_x = coords.get('elementCenterX', left + width/2)
+                center_y = coords.get('elementCenterY', top + height/2)
+                crosshair_size = 10
+                draw.line(
+                    [(center_x - crosshair_size, center_y), (center_x + crosshair_size, center_y)],
+                    fill='red',
+                    width=2
+                )
+                draw.line(
+                    [(center_x, center_y - crosshair_size), (center_x, center_y + crosshair_size)],
+                    fill='red',
+                    width=2
+                )
+            
+            # Save the highlighted screenshot
+            image.save(screenshot_path)
+            
+            # Return screenshot metadata
+            return {
+                "filename": screenshot_filename,
+                "path": screenshot_path,
+                "element_bounds": {
+                    "left": coords.get('elementLeft', 0),
+                    "top": coords.get('elementTop', 0),
+                    "width": coords.get('elementWidth', 0),
+                    "height": coords.get('elementHeight', 0)
+                },
+                "viewport_size": {
+                    "width": coords.get('viewportWidth', 0),
+                    "height": coords.get('viewportHeight', 0)
                 }
-                
-                return reasons.length > 0 ? reasons.join(', ') : null;
-            """)
+            }
+        else:
+            # No coordinates, just save screenshot
+            image = Image.open(BytesIO(screenshot_png))
+            image.save(screenshot_path)
+            return {
+                "filename": screenshot_filename,
+                "path": screenshot_path
+            }
+    
+    def capture_screenshot_with_highlight(self, details):
+        """Capture screenshot and highlight the element"""
+        try:
+            screenshot_filename, screenshot_path = self._next_screenshot_path()
             
-            if result:
-                return f"Network activity - {result}"
-                
-            return None
+            # Capture full page screenshot
+            screenshot_png = self.driver.get_screenshot_as_png()
             
-        except Exception:
+            # Get element coordinates from details
+            coords = details.get('coordinates', {})
+            return self._save_highlighted_screenshot(screenshot_png, screenshot_filename, screenshot_path, coords)
+        except Exception as e:
+            print(f"[WARNING] Screenshot capture failed: {str(e)[:100]}")
             return None
     
-    def _check_dom_mutations(self):
+    def capture_screenshot_with_highlight_async(self, details):
         """
-        Check if DOM is actively mutating
-        Indicates dynamic content loading
-        Returns: reason string if mutating, None if not
+        Capture the screenshot now but decode/highlight/save it on a background thread
+        The PNG is grabbed synchronously so it shows the page as it is now; only
+        the PIL work is deferred. Returns the screenshot metadata dict right away
+        (filename and path); the remaining keys are filled in once it is saved.
+        Falls back to saving inline when too many screenshots are pending.
         """
         try:
-            result = self.driver.execute_script("""
-                if (!window._loadingObserver) return null;
-                
-                let now = Date.now();
-                let timeSinceLastMutation = now - window._lastMutationTime;
-                let recentMutations = window._mutationCount;
-                
-                // Reset counter for next check
-                window._mutationCount = 0;
-                
-                // More lenient thresholds to avoid pausing after click-triggered DOM changes
-                // Only consider loading if:
-                // 1. Very recent mutations (< 150ms) AND many mutations (> 10)
-                // 2. OR sustained heavy mutations (> 20 changes)
-                if (timeSinceLastMutation < 150 && recentMutations > 10) {
-                    return 'DOM mutations ' + timeSinceLastMutation + 'ms ago (' + recentMutations + ' changes)';
-                }
-                if (recentMutations > 20) {
-                    return 'Heavy DOM mutations: ' + recentMutations + ' changes';
-                }
-                
-                return null;
-            """)
-            
-            return result
-            
-        except Exception:
+            screenshot_filename, screenshot_path = self._next_screenshot_path()
+            screenshot_png = self.driver.get_screenshot_as_png()
+            coords = details.get('coordinates', {})
+        except Exception as e:
+            print(f"[WARNING] Screenshot capture failed: {str(e)[:100]}")
             return None
+        
+        if not self._screenshot_slots.acquire(blocking=False):
+            return self._save_highlighted_screenshot(screenshot_png, screenshot_filename, screenshot_path, coords)
+        
+        info = {"filename": screenshot_filename, "path": screenshot_path}
+        
+        def _save():
+            try:
+                info.update(self._save_highlighted_screenshot(
+                    screenshot_png, screenshot_filename, screenshot_path, coords
+                ))
+            except Exception as e:
+                print(f"[WARNING] Screenshot save failed: {str(e)[:100]}")
+            finally:
+                self._screenshot_slots.release()
+        
+        self._screenshot_executor.submit(_save)
+        return info
     
-    def _check_visual_loaders(self):
-        """
-        Check for common visual loading indicators using JavaScript
-        Much faster than VLM analysis
-        Returns: reason string if loaders found, None if not
-        """
+    def get_element_html(self, xpath=None, css_selector=None, in_shadow_root=False, in_iframe=False):
+        """Get the full HTML of a specific element, including shadow DOM and iframe contexts"""
         try:
-            result = self.driver.execute_script("""
-                let found = [];
-                
-                // Helper function to check if element is truly visible
-                function isElementVisible(el) {
-                    // Must have dimensions
-                    if (el.offsetWidth <= 0 || el.offsetHeight <= 0) {
-                        return false;
-                    }
-                    
-                    // Must be in document and have offsetParent (not display:none)
-                    if (!el.offsetParent && el.tagName !== 'BODY' && el.tagName !== 'HTML') {
-                        return false;
-                    }
-                    
-                    // Check computed style
-                    let style = window.getComputedStyle(el);
-                    
-                    // Display check
-                    if (style.display === 'none') {
-                        return false;
-                    }
-                    
-                    // Visibility check
-                    if (style.visibility === 'hidden' || style.visibility === 'collapse') {
-                        return false;
-                    }
-                    
-                    // Opacity check - consider < 0.1 as invisible
-                    let opacity = parseFloat(style.opacity);
-                    if (opacity < 0.1) {
-                        return false;
-                    }
-                    
-                    // Check if element is in viewport or at least rendered
-                    let rect = el.getBoundingClientRect();
-                    if (rect.width === 0 || rect.height === 0) {
-                        return false;
-                    }
+            # Generate the appropriate JavaScript code based on context
+            if in_shadow_root:
+                # Search in shadow DOM recursively
+                if css_selector:
+                    js_code = f"""
+                    // Recursive shadow DOM search for CSS selector
+                    function findInShadowDOM(root, selector) {{
+                        // Try to find in current root
+                        let element = root.querySelector(selector);
+                        if (element) return element;
+                        
+                        // Search in all shadow roots
+                        let allElements = root.querySelectorAll('*');
+                        for (let el of allElements) {{
+                            if (el.shadowRoot) {{
+                                element = findInShadowDOM(el.shadowRoot, selector);
+                                if (element) return element;
+                            }}
+                        }}
+                        return null;
+                    }}
                     
-                    // Check if element is off-screen (negative positioning)
-                    if (rect.right < 0 || rect.bottom < 0) {
-                        return false;
-                    }
+                    let element = findInShadowDOM(document, "{css_selector}");
+                    return element ? element.outerHTML : null;
+                    """
+                elif xpath:
+                    # XPath in shadow DOM is more complex - convert to attributes
+                    js_code = f"""
+                    // Recursive shadow DOM search for XPath attributes
+                    function findInShadowDOM(root) {{
+                        // Try to find in current root using XPath
+                        try {{
+                            let result = document.evaluate("{xpath}", root, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+                            if (result && result.singleNodeValue) return result.singleNodeValue;
+                        }} catch (e) {{
+                            // XPath might not work in shadow root, try alternative
+                        }}
+                        
+                        // Search in all shadow roots
+                        let allElements = root.querySelectorAll('*');
+                        for (let el of allElements) {{
+                            if (el.shadowRoot) {{
+                                let element = findInShadowDOM(el.shadowRoot);
+                                if (element) return element;
+                            }}
+                        }}
+                        return null;
+                    }}
                     
-                    // Check for clip-path or clip that hides the element
-                    if (style.clip && style.clip !== 'auto' && style.clip.includes('rect(0')) {
-                        return false;
-                    }
+                    let element = findInShadowDOM(document);
+                    return element ? element.outerHTML : null;
+                    """
+                else:
+                    return None
                     
-                    // Check ALL parent elements up to body/html for hidden properties
-                    let parent = el.parentElement;
-                    while (parent && parent.tagName !== 'BODY' && parent.tagName !== 'HTML') {
-                        let parentStyle = window.getComputedStyle(parent);
-                        
-                        // Check if parent is hidden in any way
-                        if (parentStyle.display === 'none') {
-                            return false;
-                        }
-                        
-                        if (parentStyle.visibility === 'hidden' || parentStyle.visibility === 'collapse') {
-                            return false;
-                        }
-                        
-                        let parentOpacity = parseFloat(parentStyle.opacity);
-                        if (parentOpacity < 0.1) {
-                            return false;
-                        }
+            elif in_iframe:
+                # Search in iframes
+                if css_selector:
+                    js_code = f"""
+                    // Search in all iframes for CSS selector
+                    function findInIframes(selector) {{
+                        // Try main document first
+                        let element = document.querySelector(selector);
+                        if (element) return element.outerHTML;
                         
-                        // Check if parent has zero dimensions (collapsed)
-                        if (parent.offsetWidth === 0 || parent.offsetHeight === 0) {
-                            return false;
-                        }
+                        // Search in all iframes
+                        let iframes = document.querySelectorAll('iframe');
+                        for (let iframe of iframes) {{
+                            try {{
+                                let iframeDoc = iframe.contentDocument || iframe.contentWindow.document;
+                                element = iframeDoc.querySelector(selector);
+                                if (element) return element.outerHTML;
+                            }} catch (e) {{
+                                // Cross-origin iframe, skip
+                                console.log('Cross-origin iframe, skipping');
+                            }}
+                        }}
+                        return null;
+                    }}
+                    
+                    return findInIframes("{css_selector}");
+                    """
+                elif xpath:
+                    js_code = f"""
+                    // Search in all iframes for XPath
+                    function findInIframes(xpath) {{
+                        // Try main document first
+                        try {{
+                            let result = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+                            if (result && result.singleNodeValue) return result.singleNodeValue.outerHTML;
+                        }} catch (e) {{
+                            console.log('XPath error in main document:', e);
+                        }}
                         
-                        parent = parent.parentElement;
-                    }
+                        // Search in all iframes
+                        let iframes = document.querySelectorAll('iframe');
+                        for (let iframe of iframes) {{
+                            try {{
+                                let iframeDoc = iframe.contentDocument || iframe.contentWindow.document;
+                                let result = iframeDoc.evaluate(xpath, iframeDoc, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+                                if (result && result.singleNodeValue) return result.singleNodeValue.outerHTML;
+                            }} catch (e) {{
+                                // Cross-origin iframe or XPath error, skip
+                                console.log('Error in iframe:', e);
+                            }}
+                        }}
+                        return null;
+                    }}
                     
-                    return true;
-                }
-                
-                // Check for common loading class names
-                const loadingClasses = [
-                    'loading', 'spinner', 'loader', 'skeleton',
-                    'shimmer', 'progress', 'loading-overlay', 'preloader'
-                ];
-                
-                for (let cls of loadingClasses) {
-                    let elements = document.querySelectorAll(`[class*="${cls}"]`);
-                    for (let el of elements) {
-                        if (isElementVisible(el)) {
-                            found.push('[class*="' + cls + '"]');
-                            break;
-                        }
-                    }
-                }
-                
-                // Check for loading text
-                let bodyText = document.body.innerText || '';
-                if (/loading|please wait|processing|cargando/i.test(bodyText)) {
-                    // Make sure it's visible and not just in hidden elements
-                    let walker = document.createTreeWalker(
-                        document.body,
-                        NodeFilter.SHOW_TEXT,
-                        null
-                    );
+                    return findInIframes("{xpath}");
+                    """
+                else:
+                    return None
                     
-                    while (walker.nextNode()) {
-                        let node = walker.currentNode;
-                        if (/loading|please wait|processing/i.test(node.textContent)) {
-                            let parent = node.parentElement;
-                            if (parent && isElementVisible(parent)) {
-                                found.push('Loading text');
-                                break;
-                            }
-                        }
-                    }
-                }
-                
-                // Check for progress bars
-                let progressBars = document.querySelectorAll('progress, [role="progressbar"]');
-                for (let bar of progressBars) {
-                    if (isElementVisible(bar)) {
-                        found.push('Progress bar');
-                        break;
-                    }
-                }
-                
-                // Check for CSS animations (spinners) - only check common loading elements
-                let loadingSelectors = [
-                    '[class*="loading"]', '[class*="spinner"]', '[class*="loader"]',
-                    '[class*="rotating"]', '[class*="spinning"]'
-                ];
-                
-                for (let selector of loadingSelectors) {
-                    let elements = document.querySelectorAll(selector);
-                    for (let el of elements) {
-                        if (!isElementVisible(el)) continue;
-                        
-                        let style = window.getComputedStyle(el);
-                        if (style.animation && style.animation !== 'none') {
-                            // Check if animation looks like a loader (rotating, spinning)
-                            if (/rotate|spin|pulse|bounce/i.test(style.animation)) {
-                                found.push('CSS animation');
-                                break;
-                            }
-                        }
-                    }
-                    if (found.includes('CSS animation')) break;
-                }
-                
-                return found.length > 0 ? found.join(', ') : null;
-            """)
-            
-            if result:
-                return f"Visible loaders: {result}"
+            else:
+                # Regular DOM search (existing logic)
+                if xpath:
+                    js_code = f"""
+                    var element = document.evaluate("{xpath}", document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+                    return element ? element.outerHTML : null;
+                    """
+                elif css_selector:
+                    js_code = f"""
+                    var element = document.querySelector("{css_selector}");
+                    return element ? element.outerHTML : null;
+                    """
+                else:
+                    return None
             
-            return None
+            element_html = self.driver.execute_script(js_code)
+            return element_html if element_html else None
             
-        except Exception:
+        except Exception as e:
+            print(f"[WARNING] Failed to extract element HTML: {e}")
             return None
     
-    def _check_framework_loading(self):
-        """
-        Check loading state for popular JavaScript frameworks
-        Returns: reason string if loading detected, None if not
-        """
+    def _process_vlm_description(self, activity_index, screenshot_path, element_html, coordinates, event_type):
+        """Process VLM description generation (runs in background thread)"""
         try:
-            result = self.driver.execute_script("""
-                let found = [];
-                
-                // Angular
-                if (window.getAllAngularRootElements) {
-                    try {
-                        let roots = window.getAllAngularRootElements();
-                        if (roots && roots.length > 0) {
-                            let ngApp = roots[0];
-                            // Check for Angular loading indicators
-                            if (ngApp.querySelector('[ng-if*="loading"]') ||
-                                ngApp.querySelector('[ng-show*="loading"]')) {
-                                found.push('Angular loading');
-                            }
-                        }
-                    } catch(e) {}
-                }
-                
-                // Vue (check for v-loading directive)
-                if (window.__VUE__) {
-                    let vLoading = document.querySelector('[v-loading="true"]');
-                    if (vLoading) found.push('Vue v-loading');
-                }
-                
-                // React (check for common loading components)
-                let reactLoading = document.querySelector('[data-testid*="loading"], [class*="Loading"]');
-                if (reactLoading && reactLoading.offsetParent !== null) {
-                    found.push('React loading component');
+            # Generate VLM description
+            description = self.vlm.generate_element_description(
+                image_path=screenshot_path,
+                element_html=element_html or "HTML not available",
+                coordinates=coordinates,
+                event_type=event_type
+            )
+            
+            # Store result
+            with self.vlm_lock:
+                self.vlm_results[activity_index] = {
+                    'vlm_description': description,
+                    'element_html': element_html,
+                    'processing_completed': True
                 }
                 
-                // jQuery AJAX
-                if (window.jQuery && jQuery.active > 0) {
-                    found.push('jQuery.active: ' + jQuery.active);
+        except Exception as e:
+            print(f"[ERROR] VLM processing failed for activity {activity_index}: {e}")
+            with self.vlm_lock:
+                self.vlm_results[activity_index] = {
+                    'vlm_description': f"VLM processing failed: {str(e)}",
+                    'element_html': element_html,
+                    'processing_completed': False
                 }
-                
-                return found.length > 0 ? found.join(', ') : null;
-            """)
+    
+    def trigger_async_vlm_description(self, activity_index, screenshot_path, details, event_type):
+        """Trigger async VLM description generation"""
+        # Extract element HTML with context awareness
+        xpath = details.get('xpath')
+        css_selector = details.get('cssSelector')
+        in_shadow_root = details.get('inShadowRoot', False)
+        in_iframe = details.get('inIframe', False)
+        element_html = self.get_element_html(
+            xpath=xpath, 
+            css_selector=css_selector,
+            in_shadow_root=in_shadow_root,
+            in_iframe=in_iframe
+        )
+        
+        # Get coordinates
+        coordinates = details.get('coordinates', {})
+        
+        # Submit to thread pool
+        # Fire-and-forget; joined later during finalize_vlm_processing
+        _vlm_future = self.vlm_executor.submit(
+            self._process_vlm_description,
+            activity_index,
+            screenshot_path,
+            element_html,
+            coordinates,
+            event_type
+        )
+        
+        print(f"[VLM] Queued description generation for activity {activity_index}")
+        
+    def _journal_activity(self, activity):
+        """Queue an activity for the JSONL journal, writing once a batch is full"""
+        if self._journal is None:
+            return
+        self._journal_pending.append(activity)
+        if len(self._journal_pending) >= self.JOURNAL_FLUSH_EVERY:
+            self._flush_journal()
+    
+    def _flush_journal(self):
+        """Write queued activities to the journal in one call"""
+        if self._journal is None or not self._journal_pending:
+            return
+        self._write_journal_lines(self._journal_pending)
+        self._journal_written += len(self._journal_pending)
+        self._journal_pending = []
+    
+    def _write_journal_lines(self, records):
+        """Append records to the journal as JSON lines"""
+        try:
+            if ORJSON_AVAILABLE:
+                lines = [orjson.dumps(r, default=str) for r in records]
+            else:
+                lines = [json.dumps(r, default=str).encode('utf-8') for r in records]
+            self._journal.write(b'\n'.join(lines) + b'\n')
+            self._journal.flush()
+        except Exception as e:
+            logger.warning(f"Could not write activity journal: {e}")
+    
+    def finalize_vlm_processing(self):
+        """Wait for all VLM tasks to complete and update activity log"""
+        print("\n[VLM] Waiting for async description generation to complete...")
+        
+        # Shutdown executors and wait for all tasks
+        self.vlm_executor.shutdown(wait=True)
+        self._screenshot_executor.shutdown(wait=True)
+        
+        # Update activity log with VLM results
+        journal_updates = []
+        with self.vlm_lock:
+            for activity_index, vlm_data in self.vlm_results.items():
+                if activity_index < len(self.activity_log):
+                    self.activity_log[activity_index]['vlm_description'] = vlm_data.get('vlm_description', '')
+                    self.activity_log[activity_index]['element_html'] = vlm_data.get('element_html', '')
+                    if activity_index < self._journal_written:
+                        journal_updates.append({
+                            "action": "vlm_update",
+                            "activity_index": activity_index,
+                            "vlm_description": vlm_data.get('vlm_description', ''),
+                            "element_html": vlm_data.get('element_html', '')
+                        })
+        
+        # Write the rest of the journal, which now carries the VLM results;
+        # activities written in earlier batches get a vlm_update record
+        self._flush_journal()
+        if self._journal is not None:
+            if journal_updates:
+                self._write_journal_lines(sorted(journal_updates, key=lambda u: u["activity_index"]))
+            self._journal.close()
+            self._journal = None
+        
+        print(f"[VLM] Completed {len(self.vlm_results)} descriptions")
+    
+    def optimize_activity_log(self):
+        """
+        Use VLM to optimize activity log by consolidating sequential actions
+        - Merge sequential typing in same field into single action with final value
+        - Remove redundant clicks on same element
+        - Keep only meaningful navigation changes
+        """
+        print("\n[OPTIMIZER] Analyzing activity log for optimization...")
+        original_count = len(self.activity_log)
+        
+        if original_count == 0:
+            return
+        
+        optimized_log = []
+        i = 0
+        
+        while i < len(self.activity_log):
+            current = self.activity_log[i]
+            action = current.get('action', '')
             
-            if result:
-                return f"Framework loading - {result}"
+            # Handle text input consolidation
+            if action == 'text_input':
+                consolidated = self._consolidate_text_inputs(i)
+                if consolidated:
+                    optimized_log.append(consolidated['activity'])
+                    i = consolidated['end_index'] + 1
+                    print(f"[OPTIMIZER] Consolidated {consolidated['merged_count']} typing actions into 1")
+                    continue
             
-            return None
+            # Handle click deduplication
+            elif action == 'click':
+                if self._is_redundant_click(i, optimized_log):
+                    print(f"[OPTIMIZER] Removed redundant click at index {i}")
+                    i += 1
+                    continue
             
-        except Exception:
-            return None
+            # Keep all other actions (navigation, etc.)
+            optimized_log.append(current)
+            i += 1
+        
+        # Update activity log
+        self.activity_log = optimized_log
+        removed_count = original_count - len(optimized_log)
+        
+        print(f"[OPTIMIZER] ✓ Optimization complete:")
+        print(f"[OPTIMIZER]   Original: {original_count} activities")
+        print(f"[OPTIMIZER]   Optimized: {len(optimized_log)} activities")
+        print(f"[OPTIMIZER]   Removed: {removed_count} redundant activities ({removed_count/original_count*100:.1f}%)")
     
-    def get_loading_details(self):
+    def _consolidate_text_inputs(self, start_index):
         """
-        Get detailed information about what's causing loading state
-        Useful for debugging
+        Consolidate sequential text inputs into the same field
+        Returns: {activity, end_index, merged_count} or None
         """
-        details = {
-            'document_ready': False,
-            'network_activity': False,
-            'dom_mutations': False,            # bool
-            'dom_mutations_reason': '',        # textual reason
-            'visual_loaders': False,           # bool
-            'visual_loaders_reason': '',       # textual reason
-            'framework_loading': False,        # bool
-            'framework_loading_reason': '',    # textual reason
-            'overall_loading': False,
-            'error': ''
-        }
+        if start_index >= len(self.activity_log):
+            return None
         
-        try:
-            # Check each component
-            doc_state = self.driver.execute_script("return document.readyState;")
-            details['document_ready'] = (doc_state == "complete")
-            # details['network_activity'] = self._check_network_activity()  # COMMENTED OUT
-            details['network_activity'] = False  # Always false (network check disabled)
-            dom_mut = self._check_dom_mutations()
-            details['dom_mutations'] = bool(dom_mut)
-            details['dom_mutations_reason'] = dom_mut or ''
-
-            vis_load = self._check_visual_loaders()
-            details['visual_loaders'] = bool(vis_load)
-            details['visual_loaders_reason'] = vis_load or ''
-
-            fw_load = self._check_framework_loading()
-            details['framework_loading'] = bool(fw_load)
-            details['framework_loading_reason'] = fw_load or ''
+        first_activity = self.activity_log[start_index]
+        first_details = first_activity.get('details', {})
+        
+        # Get field identifier (xpath, id, or name)
+        field_xpath = first_details.get('xpath', '')
+        field_id = first_details.get('id', '')
+        field_name = first_details.get('name', '')
+        
+        if not (field_xpath or field_id or field_name):
+            return None
+        
+        # Find all consecutive text inputs to the same field
+        merged_activities = [first_activity]
+        j = start_index + 1
+        
+        while j < len(self.activity_log):
+            next_activity = self.activity_log[j]
+            next_action = next_activity.get('action', '')
             
-            # Overall status
-            details['overall_loading'] = (
-                not details['document_ready'] or
-                # details['network_activity'] or  # COMMENTED OUT
-                details['dom_mutations'] or
-                details['visual_loaders'] or
-                details['framework_loading']
-            )
+            # Stop if not a text input
+            if next_action != 'text_input':
+                break
             
-        except Exception as e:
-            details['error'] = str(e)
+            next_details = next_activity.get('details', {})
+            
+            # Check if same field
+            same_field = False
+            if field_xpath and next_details.get('xpath') == field_xpath:
+                same_field = True
+            elif field_id and next_details.get('id') == field_id:
+                same_field = True
+            elif field_name and next_details.get('name') == field_name:
+                same_field = True
+            
+            if not same_field:
+                break
+            
+            merged_activities.append(next_activity)
+            j += 1
         
-        return details
+        # If only one activity, no consolidation needed
+        if len(merged_activities) == 1:
+            return None
+        
+        # Get final value from last activity
+        last_activity = merged_activities[-1]
+        final_value = last_activity.get('details', {}).get('value', '')
+        
+        # Create consolidated activity using last activity as base
+        consolidated_activity = last_activity.copy()
+        
+        # Update value to show it was consolidated
+        consolidated_details = consolidated_activity.get('details', {}).copy()
+        consolidated_details['value'] = final_value
+        consolidated_details['consolidated_from'] = len(merged_activities)
+        consolidated_activity['details'] = consolidated_details
+        
+        # Keep the VLM description and screenshot from the last action
+        # (most accurate representation of final state)
+        
+        return {
+            'activity': consolidated_activity,
+            'end_index': j - 1,
+            'merged_count': len(merged_activities)
+        }
     
-    def check_and_handle_popup(self):
+    def _is_redundant_click(self, current_index, optimized_log):
         """
-        Detect and handle browser pop-ups (alert, confirm, prompt)
-        Returns: True if popup was handled, False otherwise
+        Check if a click is redundant (clicking same element multiple times)
         """
-        try:
-            # Check for alert/confirm/prompt
-            alert = self.driver.switch_to.alert
-            
-            # Get alert details
-            alert_text = alert.text
-            alert_type = self._detect_alert_type(alert)
+        if not optimized_log:
+            return False
+        
+        current = self.activity_log[current_index]
+        current_details = current.get('details', {})
+        
+        # Look at last few activities in optimized log
+        for prev_activity in reversed(optimized_log[-3:]):
+            if prev_activity.get('action') != 'click':
+                continue
             
-            print(f"[POPUP] Detected {alert_type}: {alert_text[:50]}...")
+            prev_details = prev_activity.get('details', {})
             
-            # Capture screenshot before handling
-            screenshot_info = None
-            try:
-                self.screenshot_counter += 1
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                screenshot_filename = f"popup_{self.screenshot_counter}_{timestamp}.png"
-                screenshot_path = os.path.join(self.screenshots_dir, screenshot_filename)
-                self.driver.save_screenshot(screenshot_path)
-                screenshot_info = {"filename": screenshot_filename, "path": screenshot_path}
-            except Exception:
-                print("[POPUP] Failed capturing popup screenshot")
+            # Check if same element by comparing identifiers
+            same_element = False
             
-            # Record the popup
-            popup_details = {
-                "type": alert_type,
-                "text": alert_text,
-                "action": "accept",  # Default action
-                "input_value": None
-            }
+            # Compare by xpath
+            if current_details.get('xpath') and current_details.get('xpath') == prev_details.get('xpath'):
+                same_element = True
+            # Compare by id
+            elif current_details.get('id') and current_details.get('id') == prev_details.get('id'):
+                same_element = True
+            # Compare by coordinates (within tolerance)
+            elif self._same_coordinates(current_details.get('coordinates', {}), 
+                                       prev_details.get('coordinates', {})):
+                same_element = True
             
-            # Handle based on type
-            if alert_type == "prompt":
-                # For prompt, we'll accept with empty string
-                # In future, could use VLM to determine appropriate input
+            if same_element:
+                # Check if clicks are close in time (within 2 seconds)
+                current_time = current.get('timestamp', '')
+                prev_time = prev_activity.get('timestamp', '')
+                
                 try:
-                    alert.send_keys("")  # Send empty or default value
-                    popup_details["input_value"] = ""
+                    current_dt = datetime.fromisoformat(current_time)
+                    prev_dt = datetime.fromisoformat(prev_time)
+                    time_diff = (current_dt - prev_dt).total_seconds()
+                    
+                    if time_diff < 2:  # Clicks within 2 seconds
+                        return True  # Redundant
                 except Exception:
-                    print("[POPUP] Prompt input send failed")
-            
-            # Accept the alert/confirm/prompt
-            alert.accept()
-            popup_details["action"] = "accept"
-            
-            # Record activity
-            self.record_activity("popup_handled", popup_details)
-            
-            if screenshot_info:
-                self.activity_log[-1]["screenshot"] = screenshot_info
+                    pass
+        
+        return False
+    
+    def _same_coordinates(self, coords1, coords2, tolerance=10):
+        """Check if two sets of coordinates are the same (within tolerance)"""
+        if not coords1 or not coords2:
+            return False
+        
+        x1 = coords1.get('elementCenterX', 0)
+        y1 = coords1.get('elementCenterY', 0)
+        x2 = coords2.get('elementCenterX', 0)
+        y2 = coords2.get('elementCenterY', 0)
+        
+        if x1 == 0 or y1 == 0 or x2 == 0 or y2 == 0:
+            return False
+        
+        return abs(x1 - x2) <= tolerance and abs(y1 - y2) <= tolerance
+        
+    def track_navigation(self, state=None):
+        """Track URL changes (reads url/title from state when given)"""
+        if state is not None:
+            current_url = state.url
+            current_title = state.title
+        else:
+            current_url = self.driver.current_url
+            current_title = self.driver.title
+        
+        if current_url != self.previous_url:
+            self.record_activity("navigation", {
+                "url": current_url,
+                "title": current_title,
+                "previous_url": self.previous_url
+            })
+            self.previous_url = current_url
+            self.previous_title = current_title
             
-            print(f"[POPUP] Handled {alert_type} by accepting")
+            # Return True to indicate page changed (need to re-inject)
             return True
+        return False
             
-        except Exception as e:
-            # No alert present or error handling it
-            error_str = str(e).lower()
-            if "no such alert" not in error_str and "no alert is present" not in error_str:
-                # Real error, not just "no alert"
-                pass
-            return False
-    
-    def _detect_alert_type(self, alert):
+    def _start_target_listener(self):
         """
-        Detect if alert is alert, confirm, or prompt
-        This is tricky as Selenium doesn't directly expose the type
+        Subscribe to CDP Target events so tab opens/closes are pushed to us
+        instead of polling driver.window_handles on every tick
         """
+        self._tab_lock = threading.Lock()
+        self._page_targets = {}  # target_id -> {"title", "url"}, in creation order
+        self._tabs_dirty = True
+        self._target_listener_active = False
+        self._target_listener_cancel = None  # (trio token, cancel scope) while running
+        self._target_cache_verified = False
+        self._cached_handles = None
+        
+        # Set by the __trackerSink binding when the page queues new events
+        self._activity_event = threading.Event()
+        self._tracker_sink_active = False
+        
+        if not (self.use_cdp and TRIO_AVAILABLE):
+            return
+        
+        listener = threading.Thread(target=self._run_target_listener, name="CDPTargets", daemon=True)
+        listener.start()
+    
+    def _run_target_listener(self):
+        """Run the CDP target event loop (background thread)"""
         try:
-            # Try to send keys - only prompts accept input
-            alert.send_keys("")
-            return "prompt"
-        except Exception:
-            return "confirm"
+            trio.run(self._listen_target_events)
+        except Exception as e:
+            logger.warning(f"CDP target listener stopped, falling back to polling: {e}")
+        finally:
+            self._target_listener_cancel = None
+            self._target_listener_active = False
+            self._tracker_sink_active = False
+            self._tabs_dirty = True
     
-    def check_modal_dialogs(self):
-        """
-        Detect custom modal dialogs (non-native popups) and automatically click buttons
-        These are HTML/CSS modals, not browser alerts
-        """
+    async def _listen_tracker_sink(self, session, devtools):
+        """Wake the monitor loop whenever the page calls the __trackerSink binding"""
+        runtime = devtools.runtime
         try:
-            # Common modal patterns
-            modal_selectors = [
-                "[role='dialog']",
-                ".modal.show",
-                ".modal.in",
-                ".popup-overlay",
-                ".dialog-overlay",
-                "[aria-modal='true']",
-                ".sweet-alert",
-                ".swal2-container",
-                ".dialog",
-                ".popup"
-            ]
-            
-            for selector in modal_selectors:
-                try:
-                    modals = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for modal in modals:
-                        if modal.is_displayed():
-                            print(f"[MODAL] Detected custom modal dialog with selector: {selector}")
-                            
-                            # Try to find and click a button automatically
-                            button_clicked = self._find_and_click_dialog_button(modal, selector)
-                            
-                            if button_clicked:
-                                return True
-                            else:
-                                # Just record detection if no button found
-                                self._record_modal_detection(modal, selector)
-                                return True
-                except Exception:
-                    continue
-            
-            return False
+            calls = session.listen(runtime.BindingCalled)
+            await session.execute(runtime.enable())
+            await session.execute(runtime.add_binding(name=TRACKER_SINK_BINDING))
+        except Exception as e:
+            logger.warning(f"CDP tracker binding unavailable, polling for events: {e}")
+            return
+        self._tracker_sink_active = True
+        try:
+            async for call in calls:
+                if call.name == TRACKER_SINK_BINDING:
+                    self._activity_event.set()
+        finally:
+            self._tracker_sink_active = False
+    
+    async def _listen_target_events(self):
+        """Keep self._page_targets in sync with Target.targetCreated/Destroyed/InfoChanged"""
+        async with self.driver.bidi_connection() as connection:
+            session, devtools = connection.session, connection.devtools
+            async with trio.open_nursery() as nursery:
+                # Kept so _stop_target_listener can cancel us from another thread
+                self._target_listener_cancel = (trio.lowlevel.current_trio_token(), nursery.cancel_scope)
+                nursery.start_soon(self._listen_tracker_sink, session, devtools)
+                await self._follow_targets(session, devtools)
+                nursery.cancel_scope.cancel()
+    
+    async def _follow_targets(self, session, devtools):
+        """Consume Target events until recording stops"""
+        target = devtools.target
+        events = session.listen(target.TargetCreated, target.TargetInfoChanged, target.TargetDestroyed)
+        # Discovery also replays targetCreated for every existing target
+        await session.execute(target.set_discover_targets(discover=True))
+        self._target_listener_active = True
+        
+        async for event in events:
+            if not self.is_recording:
+                break
+            if isinstance(event, target.TargetDestroyed):
+                with self._tab_lock:
+                    if self._page_targets.pop(event.target_id, None) is not None:
+                        self._tabs_dirty = True
+                continue
             
-        except Exception:
-            return False
+            info = event.target_info
+            if info.type_ != 'page':
+                continue
+            with self._tab_lock:
+                is_new = info.target_id not in self._page_targets
+                self._page_targets[info.target_id] = {"title": info.title, "url": info.url}
+                if is_new:
+                    self._tabs_dirty = True
     
-    def _find_and_click_dialog_button(self, modal, modal_selector):
+    def _get_window_handles(self):
         """
-        Find and click dialog buttons automatically based on text or position
-        Returns: True if button was clicked, False otherwise
+        Return the current window handles, from the CDP target cache when the
+        listener is running (ChromeDriver window handles are CDP target ids)
         """
-        try:
-            # Common button text patterns (priority order)
-            button_texts = [
-                'OK', 'Ok', 'okay', 'Okay',
-                'Close', 'close', 
-                'Confirm', 'confirm',
-                'Accept', 'accept',
-                'Yes', 'yes',
-                'Continue', 'continue',
-                'Submit', 'submit',
-                'Got it', 'got it',
-                'Dismiss', 'dismiss',
-                'Cancel', 'cancel',
-                'No', 'no'
-            ]
-            
-            # Common button selectors
-            button_selectors = [
-                'button',
-                '[role="button"]',
-                'a.btn',
-                'a.button',
-                '.btn',
-                '.button',
-                'input[type="button"]',
-                'input[type="submit"]',
-                '[data-dismiss="modal"]',
-                '.modal-close',
-                '.dialog-close',
-                '.close',
-                '.swal2-confirm',
-                '.swal2-cancel'
-            ]
-            
-            # Find all potential buttons in the modal
-            all_buttons = []
-            for btn_selector in button_selectors:
-                try:
-                    buttons = modal.find_elements(By.CSS_SELECTOR, btn_selector)
-                    all_buttons.extend(buttons)
-                except Exception:
-                    continue
-            
-            if not all_buttons:
-                print("[MODAL] No buttons found in modal")
-                return False
-            
-            # Remove duplicates
-            unique_buttons = []
-            seen = set()
-            for btn in all_buttons:
-                try:
-                    # Use location as unique identifier
-                    loc = (btn.location['x'], btn.location['y'])
-                    if loc not in seen and btn.is_displayed():
-                        seen.add(loc)
-                        unique_buttons.append(btn)
-                except Exception:
-                    continue
-            
-            print(f"[MODAL] Found {len(unique_buttons)} unique button(s)")
-            
-            # Try to match button by text (priority order)
-            for text_pattern in button_texts:
-                for button in unique_buttons:
-                    try:
-                        btn_text = button.text.strip()
-                        btn_value = button.get_attribute('value') or ''
-                        btn_aria = button.get_attribute('aria-label') or ''
-                        
-                        # Check if text matches
-                        if (text_pattern.lower() in btn_text.lower() or 
-                            text_pattern.lower() in btn_value.lower() or
-                            text_pattern.lower() in btn_aria.lower()):
-                            
-                            print(f"[MODAL] Found button with text: '{btn_text or btn_value or btn_aria}'")
-                            
-                            # Capture details before clicking
-                            button_details = self._capture_button_details(button, modal_selector, text_pattern)
-                            
-                            # Scroll into view
-                            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
-                            time.sleep(0.3)
-                            
-                            # Click the button
-                            try:
-                                button.click()
-                            except Exception:
-                                # Fallback to JavaScript click
-                                self.driver.execute_script("arguments[0].click();", button)
-                            
-                            print(f"[MODAL] Clicked button: '{btn_text or btn_value or btn_aria}'")
-                            
-                            # Record the click
-                            self.record_activity("modal_button_click", button_details)
-                            
-                            # Wait for modal to close
-                            time.sleep(0.5)
-                            
-                            return True
-                    except Exception:
-                        continue
-            
-            # If no text match, click the first visible button (fallback)
-            if unique_buttons:
-                button = unique_buttons[0]
-                try:
-                    btn_text = button.text.strip() or button.get_attribute('value') or 'Unknown'
-                    print(f"[MODAL] No text match, clicking first button: '{btn_text}'")
-                    
-                    button_details = self._capture_button_details(button, modal_selector, 'first_button')
-                    
-                    self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
-                    time.sleep(0.3)
-                    
-                    try:
-                        button.click()
-                    except Exception:
-                        self.driver.execute_script("arguments[0].click();", button)
-                    
-                    print(f"[MODAL] Clicked first available button")
-                    
-                    self.record_activity("modal_button_click", button_details)
-                    time.sleep(0.5)
-                    
-                    return True
-                except Exception as click_err:
-                    print(f"[MODAL] Error clicking button: {click_err}")
-                    return False
-            
-            return False
-            
-        except Exception as modal_err:
-            print(f"[MODAL] Error finding/clicking button: {modal_err}")
-            return False
+        if self._target_listener_active:
+            with self._tab_lock:
+                # Rebuild the tuple only when targets changed, so callers can
+                # short-circuit on identity
+                if self._tabs_dirty or self._cached_handles is None:
+                    self._cached_handles = tuple(self._page_targets)
+                handles = self._cached_handles
+                self._tabs_dirty = False
+            if handles:
+                if self._target_cache_verified:
+                    return handles
+                # Verify once that handles and target ids line up, else keep polling
+                polled = tuple(self.driver.window_handles)
+                if set(polled) == set(handles):
+                    self._target_cache_verified = True
+                    return handles
+                logger.warning("CDP target ids do not match window handles; polling window_handles instead")
+                self._target_listener_active = False
+                return polled
+        return tuple(self.driver.window_handles)
     
-    def _capture_button_details(self, button, modal_selector, matched_text):
-        """Capture comprehensive details about a dialog button"""
-        try:
-            # Get button properties
-            btn_text = button.text.strip()
-            btn_tag = button.tag_name
-            btn_id = button.get_attribute('id') or ''
-            btn_class = button.get_attribute('class') or ''
-            btn_type = button.get_attribute('type') or ''
-            btn_value = button.get_attribute('value') or ''
-            btn_aria = button.get_attribute('aria-label') or ''
-            
-            # Get coordinates
-            location = button.location
-            size = button.size
-            
-            # Get XPath/CSS
+    def get_tab_created_at(self, handle):
+        """Return when a tab was first seen as an ISO timestamp (formatted on read)"""
+        meta = getattr(self, 'tab_metadata', {}).get(handle)
+        if not meta or 'created_at_ns' not in meta:
+            return None
+        return datetime.fromtimestamp(meta['created_at_ns'] / 1e9).isoformat()
+    
+    def track_tab_switching(self, state=None):
+        """Track tab/window switching (reads handles from state when given)"""
+        # Initialization
+        if not hasattr(self, 'tab_metadata'):
+            self.tab_metadata = {}
+        if not hasattr(self, 'previous_handle'):
             try:
-                btn_xpath = self.driver.execute_script("""
-                    function getXPath(element) {
-                        if (element.id !== '') return '//*[@id="' + element.id + '"]';
-                        if (element === document.body) return '/html/body';
-                        var ix = 0;
-                        var siblings = element.parentNode.childNodes;
-                        for (var i = 0; i < siblings.length; i++) {
-                            var sibling = siblings[i];
-                            if (sibling === element) {
-                                return getXPath(element.parentNode) + '/' + element.tagName.toLowerCase() + '[' + (ix + 1) + ']';
-                            }
-                            if (sibling.nodeType === 1 && sibling.tagName === element.tagName) ix++;
-                        }
-                    }
-                    return getXPath(arguments[0]);
-                """, button)
+                self.previous_handle = self.driver.current_window_handle
             except Exception:
-                btn_xpath = ''
-            
-            details = {
-                "modal_selector": modal_selector,
-                "matched_text": matched_text,
-                "button_text": btn_text,
-                "button_tag": btn_tag,
-                "button_id": btn_id,
-                "button_class": btn_class,
-                "button_type": btn_type,
-                "button_value": btn_value,
-                "button_aria_label": btn_aria,
-                "coordinates": {
-                    "x": location['x'],
-                    "y": location['y'],
-                    "width": size['width'],
-                    "height": size['height']
-                },
-                "xpath": btn_xpath
-            }
-            
-            # Capture screenshot with button highlighted
+                self.previous_handle = None
+        if not self.previous_window_handles:
             try:
-                screenshot_details = {
-                    "coordinates": {
-                        "x": location['x'],
-                        "y": location['y'],
-                        "width": size['width'],
-                        "height": size['height']
-                    }
-                }
-                screenshot_path = self.capture_screenshot_with_highlight(screenshot_details)
-                details["screenshot"] = screenshot_path
-            except Exception as screenshot_err:
-                print(f"[MODAL] Screenshot capture failed: {screenshot_err}")
-            
-            return details
-            
-        except Exception as e:
-            print(f"[MODAL] Error capturing button details: {e}")
-            return {
-                "modal_selector": modal_selector,
-                "matched_text": matched_text,
-                "error": str(e)
-            }
-    
-    def _record_modal_detection(self, modal, selector):
-        """Record detection of custom modal dialog"""
+                self.previous_window_handles = tuple(self.driver.window_handles)
+            except Exception:
+                self.previous_window_handles = ()
+
+        # Nothing was created or destroyed since the last tick. Handles that
+        # came with state were fetched because tabs changed, and fetching
+        # them cleared the dirty flag, so those are always compared
+        has_state_handles = state is not None and state.handles is not None
+        if (not has_state_handles and self._target_listener_active
+                and self._target_cache_verified and not self._tabs_dirty):
+            return False
+
         try:
-            # Get modal details
-            modal_text = modal.text[:200] if modal.text else ""
-            
-            # Try to find close button
-            close_selectors = [
-                "button.close",
-                "[aria-label='Close']",
-                ".modal-close",
-                "[data-dismiss='modal']"
-            ]
-            
-            has_close_button = False
-            for close_sel in close_selectors:
-                try:
-                    if modal.find_elements(By.CSS_SELECTOR, close_sel):
-                        has_close_button = True
-                        break
-                except Exception:
-                    continue
-            
-            # Record modal detection
-            self.record_activity("modal_detected", {
-                "selector": selector,
-                "text": modal_text,
-                "has_close_button": has_close_button,
-                "note": "Custom modal dialog detected - may require manual handling"
-            })
+            if has_state_handles:
+                current_handles = state.handles
+            else:
+                current_handles = self._get_window_handles()
+        except Exception:
+            return False
+
+        switched = False
+
+        # Detect added/removed tabs without switching context (avoid forcing focus)
+        # Identity check first: an unchanged CDP cache hands back the same tuple
+        if current_handles is not self.previous_window_handles and current_handles != self.previous_window_handles:
+            previous = set(self.previous_window_handles)
+            current = set(current_handles)
+            added = [h for h in current_handles if h not in previous]
+            removed = [h for h in self.previous_window_handles if h not in current]
+
+            for h in added:
+                # Don't switch; use CDP target info if we have it, otherwise
+                # metadata will be enriched on first activation
+                target_info = self._page_targets.get(h, {})
+                title = target_info.get("title")
+                url = target_info.get("url")
+                self.tab_metadata[h] = {"first_title": title, "first_url": url, "created_at_ns": time.time_ns()}
+                self.record_activity("new_tab", {
+                    "handle": h,
+                    "title": title,
+                    "url": url,
+                    "total_tabs": len(current_handles)
+                })
+            for h in removed:
+                self.record_activity("tab_closed", {
+                    "handle": h,
+                    "created_at": self.get_tab_created_at(h),
+                    "total_tabs": len(current_handles)
+                })
+                if h in self.tab_metadata:
+                    del self.tab_metadata[h]
+            self.previous_window_handles = current_handles
+
+        # Current active handle as reported by driver
+        try:
+            current_handle = self.driver.current_window_handle
+        except Exception:
+            current_handle = None
+
+        # If no change, nothing to do
+        if current_handle is None or current_handle == self.previous_handle:
+            return False
+
+        # Update metadata for newly active tab
+        try:
+            cur_title = self.driver.title
+            cur_url = self.driver.current_url
+        except Exception:
+            cur_title = ""
+            cur_url = ""
+        if current_handle in self.tab_metadata:
+            meta = self.tab_metadata[current_handle]
+            if meta.get('first_title') is None:
+                meta['first_title'] = cur_title
+            if meta.get('first_url') is None:
+                meta['first_url'] = cur_url
+        else:
+            self.tab_metadata[current_handle] = {"first_title": cur_title, "first_url": cur_url, "created_at_ns": time.time_ns()}
+
+        # Record switch
+        self.record_activity("switch_tab", {
+            "from_window": self.previous_handle,
+            "to_window": current_handle,
+            "tab_created_at": self.get_tab_created_at(current_handle),
+            "title": cur_title,
+            "url": cur_url,
+            "pattern": cur_title[:80],
+            "match_type": "title",
+            "use_regex": False
+        })
+        switched = True
+
+        self.previous_handle = current_handle
+        return switched
             
-        except Exception as e:
-            print(f"[MODAL] Error recording modal: {e}")
+    def _evaluate_browser_state(self, drain_limit):
+        """
+        Run BROWSER_STATE_JS in the page
+        The result comes back as one JSON string (from Runtime.evaluate with
+        CDP, else from execute_script), so Selenium does not walk the nested
+        event dicts key by key
+        """
+        if self.use_cdp:
+            try:
+                result = self.driver.execute_cdp_cmd("Runtime.evaluate", {
+                    "expression": f"{self._browser_state_expr}{int(drain_limit)}))",
+                    "returnByValue": True
+                })
+                value = result.get('result', {}).get('value')
+                if value is not None:
+                    return _json_loads(value)
+            except Exception:
+                pass
+        value = self.driver.execute_script(BROWSER_STATE_JSON_JS, drain_limit)
+        return _json_loads(value) if value else None
     
-    def inject_click_tracker(self):
-        """Inject JavaScript to track clicks with comprehensive element information"""
-        script = """
-        // Helper function to get XPath
-        function getXPath(element) {
-            if (element.id !== '') {
-                return '//*[@id="' + element.id + '"]';
-            }
-            if (element === document.body) {
-                return '/html/body';
-            }
-            var ix = 0;
-            var siblings = element.parentNode ? element.parentNode.childNodes : [];
-            for (var i = 0; i < siblings.length; i++) {
-                var sibling = siblings[i];
-                if (sibling === element) {
-                    var tagName = element.tagName.toLowerCase();
-                    return getXPath(element.parentNode) + '/' + tagName + '[' + (ix + 1) + ']';
-                }
-                if (sibling.nodeType === 1 && sibling.tagName === element.tagName) {
-                    ix++;
-                }
-            }
-        }
-        
-        // Helper function to get CSS selector
-        function getCssSelector(element) {
-            if (element.id) {
-                return '#' + element.id;
-            }
-            var path = [];
-            while (element.nodeType === Node.ELEMENT_NODE) {
-                var selector = element.nodeName.toLowerCase();
-                if (element.id) {
-                    selector += '#' + element.id;
-                    path.unshift(selector);
-                    break;
-                } else {
-                    var sibling = element;
-                    var nth = 1;
-                    while (sibling.previousElementSibling) {
-                        sibling = sibling.previousElementSibling;
-                        if (sibling.nodeName.toLowerCase() === selector) nth++;
-                    }
-                    if (nth !== 1) selector += ':nth-of-type(' + nth + ')';
-                }
-                path.unshift(selector);
-                element = element.parentNode;
-            }
-            return path.join(' > ');
-        }
+    def poll_browser_state(self, include_handles=True, drain_events=False):
+        """
+        Read url, title, readyState and run the loading checks in one round-trip
+        With drain_events, pending click/input/hover events come back in the
+        same call (BrowserState.events)
+        Window handles are only fetched when they may have changed
+        Returns: BrowserState
+        """
+        raw = self._evaluate_browser_state(self.DRAIN_BATCH_SIZE if drain_events else 0) or {}
         
-        // Helper function to get computed styles
-        function getVisualProperties(element) {
-            var computed = window.getComputedStyle(element);
-            return {
-                backgroundColor: computed.backgroundColor,
-                color: computed.color,
-                fontSize: computed.fontSize,
-                fontFamily: computed.fontFamily,
-                fontWeight: computed.fontWeight,
-                border: computed.border,
-                padding: computed.padding,
-                margin: computed.margin,
-                display: computed.display,
-                width: computed.width,
-                height: computed.height,
-                position: computed.position,
-                zIndex: computed.zIndex,
-                opacity: computed.opacity,
-                cursor: computed.cursor
-            };
-        }
+        handles = None
+        tabs_unchanged = self._target_listener_active and self._target_cache_verified and not self._tabs_dirty
+        if include_handles and not tabs_unchanged:
+            try:
+                handles = self._get_window_handles()
+            except Exception:
+                handles = None
         
-        // Helper function to capture DOM path (iframe and shadow DOM chain)
-        function getDomPath(element) {
-            var path = [];
-            var currentElement = element;
-            var currentRoot = document;
+        state = BrowserState(
+            url=raw.get('url', ''),
+            title=raw.get('title', ''),
+            handles=handles,
+            ready=raw.get('ready', ''),
+            mut=raw.get('mut'),
+            loaders=raw.get('loaders'),
+            fw=raw.get('fw'),
+            events=raw.get('events')
+        )
+        self._last_loading_snapshot = (time.monotonic(), state)
+        return state
+    
+    def is_page_loading(self, state=None):
+        """
+        Enhanced page loading detection with network monitoring and DOM mutations
+        Combines multiple detection methods for accuracy
+        Pass a BrowserState from poll_browser_state() to reuse this tick's checks
+        Returns: (is_loading: bool, reason: str)
+        """
+        try:
+            if state is None:
+                state = self.poll_browser_state(include_handles=False)
             
-            while (currentElement && currentElement !== currentRoot) {
-                // Check if we're crossing a shadow boundary
-                var host = currentElement.getRootNode();
-                if (host && host !== document && host.host) {
-                    // We're in a shadow root
-                    var shadowHost = host.host;
-                    path.unshift({
-                        type: 'shadow',
-                        host: shadowHost.tagName.toLowerCase() + (shadowHost.id ? '#' + shadowHost.id : ''),
-                        hostSelector: getCssSelector(shadowHost)
-                    });
-                    currentElement = shadowHost;
-                    continue;
-                }
-                
-                // Check if parent is in an iframe
-                if (currentElement === currentRoot.body || currentElement === currentRoot.documentElement) {
-                    // Check if this document is inside an iframe
-                    try {
-                        if (currentRoot !== window.top.document && currentRoot.defaultView && currentRoot.defaultView.frameElement) {
-                            var iframe = currentRoot.defaultView.frameElement;
-                            var iframeDoc = window.top.document;
-                            var iframeSelector = getCssSelector.call({nodeType: Node.ELEMENT_NODE}, iframe);
-                            
-                            // Find iframe index
-                            var iframes = iframeDoc.querySelectorAll('iframe');
-                            var iframeIndex = -1;
-                            for (var i = 0; i < iframes.length; i++) {
-                                if (iframes[i] === iframe) {
-                                    iframeIndex = i;
-                                    break;
-                                }
-                            }
-                            
-                            path.unshift({
-                                type: 'iframe',
-                                selector: iframeSelector,
-                                index: iframeIndex,
-                                name: iframe.name || '',
-                                id: iframe.id || ''
-                            });
-                            
-                            currentRoot = iframeDoc;
-                            currentElement = iframe;
-                            continue;
-                        }
-                    } catch(e) {
-                        // Cross-origin or top-level, stop traversal
-                        break;
-                    }
-                }
-                
-                currentElement = currentElement.parentNode;
-            }
+            # Check 1: Document ready state
+            if state.ready != "complete":
+                return True, f"document.readyState = '{state.ready}'"
             
-            // Add the element itself at the end
-            path.push({
-                type: 'element',
-                selector: getCssSelector(element),
-                xpath: getXPath(element),
-                tagName: element.tagName.toLowerCase(),
-                id: element.id || '',
-                name: element.name || '',
-                className: element.className || ''
-            });
+            # Check 2: Network activity monitoring - COMMENTED OUT
+            # network_reason = self._check_network_activity()
+            # if network_reason:
+            #     return True, network_reason
             
-            return path;
-        }
-        
-        if (!window.clickTrackerInjected) {
-            window.clickEvents = [];
-            window.lastClickTime = 0;
-            window.clickPending = false;
+            # Check 3: DOM mutations
+            if state.mut:
+                return True, state.mut
             
-            // Capture click immediately and mark as pending
-            document.addEventListener('click', function(e) {
-                var element = e.target;
-                var now = Date.now();
-                
-                // Debounce to avoid duplicate events
-                if (now - window.lastClickTime < 100) return;
-                window.lastClickTime = now;
-                window.clickPending = true;
-                
-                // Get bounding rectangle for coordinates
-                var rect = element.getBoundingClientRect();
-                
-                // Get viewport dimensions
-                var viewportWidth = window.innerWidth || document.documentElement.clientWidth;
-                var viewportHeight = window.innerHeight || document.documentElement.clientHeight;
-                
-                // Calculate click coordinates relative to element
-                var relativeX = e.clientX - rect.left;
-                var relativeY = e.clientY - rect.top;
-                
-                var clickData = {
-                    // Basic element info
-                    tagName: element.tagName,
-                    id: element.id || '',
-                    className: element.className || '',
-                    name: element.name || '',
-                    type: element.type || '',
-                    value: element.value || '',
-                    
-                    // Text content
-                    text: element.innerText ? element.innerText.substring(0, 100) : '',
-                    textContent: element.textContent ? element.textContent.substring(0, 100) : '',
-                    title: element.title || '',
-                    alt: element.alt || '',
-                    placeholder: element.placeholder || '',
-                    
-                    // Link information
-                    href: element.href || '',
-                    target: element.target || '',
-                    
-                    // Coordinates
-                    coordinates: {
-                        // Click position in viewport
-                        clickX: e.clientX,
-                        clickY: e.clientY,
-                        // Click position in page
-                        pageX: e.pageX,
-                        pageY: e.pageY,
-                        // Click position relative to element
-                        relativeX: relativeX,
-                        relativeY: relativeY,
-                        // Element position and size
-                        elementLeft: rect.left,
-                        elementTop: rect.top,
-                        elementRight: rect.right,
-                        elementBottom: rect.bottom,
-                        elementWidth: rect.width,
-                        elementHeight: rect.height,
-                        // Element center point
-                        elementCenterX: rect.left + rect.width / 2,
-                        elementCenterY: rect.top + rect.height / 2,
-                        // Viewport dimensions
-                        viewportWidth: viewportWidth,
-                        viewportHeight: viewportHeight,
-                        // Scroll position
-                        scrollX: window.scrollX || window.pageXOffset,
-                        scrollY: window.scrollY || window.pageYOffset
-                    },
-                    
-                    // Selectors for element identification
-                    selectors: {
-                        xpath: getXPath(element),
-                        cssSelector: getCssSelector(element)
-                    },
-                    
-                    // DOM traversal path (iframe and shadow DOM chain)
-                    domPath: getDomPath(element),
-                    
-                    // Visual properties
-                    visualProperties: getVisualProperties(element),
-                    
-                    // Attributes
-                    attributes: {},
-                    
-                    // Parent information
-                    parent: {
-                        tagName: element.parentElement ? element.parentElement.tagName : '',
-                        id: element.parentElement ? element.parentElement.id : '',
-                        className: element.parentElement ? element.parentElement.className : ''
-                    },
-                    
-                    // Siblings count
-                    siblingsCount: element.parentElement ? element.parentElement.children.length : 0,
-                    
-                    // Image source if applicable
-                    src: element.src || '',
-                    
-                    // ARIA attributes for accessibility
-                    ariaLabel: element.getAttribute('aria-label') || '',
-                    ariaRole: element.getAttribute('role') || '',
-                    
-                    // Data attributes
-                    dataAttributes: {},
-                    
-                    // Timestamp
-                    timestamp: new Date().toISOString()
-                };
-                
-                // Collect all attributes
-                if (element.attributes) {
-                    for (var i = 0; i < element.attributes.length; i++) {
-                        var attr = element.attributes[i];
-                        clickData.attributes[attr.name] = attr.value;
-                        
-                        // Separately collect data-* attributes
-                        if (attr.name.startsWith('data-')) {
-                            clickData.dataAttributes[attr.name] = attr.value;
-                        }
-                    }
-                }
-                
-                window.clickEvents.push(clickData);
-                
-                // Clear pending flag after a short delay to ensure event is captured
-                setTimeout(function() {
-                    window.clickPending = false;
-                }, 50);
-            }, true);
-            window.clickTrackerInjected = true;
-            
-            // Inject into iframes
-            try {
-                var iframes = document.querySelectorAll('iframe');
-                for (var i = 0; i < iframes.length; i++) {
-                    try {
-                        var iframeDoc = iframes[i].contentDocument || iframes[i].contentWindow.document;
-                        if (iframeDoc && !iframeDoc._clickTrackerInjected) {
-                            iframeDoc.addEventListener('click', function(e) {
-                                var element = e.target;
-                                var now = Date.now();
-                                if (now - window.lastClickTime < 100) return;
-                                window.lastClickTime = now;
-                                window.clickPending = true;
-                                
-                                var rect = element.getBoundingClientRect();
-                                var clickData = {
-                                    tagName: element.tagName,
-                                    id: element.id || '',
-                                    className: element.className || '',
-                                    text: element.innerText ? element.innerText.substring(0, 100) : '',
-                                    href: element.href || '',
-                                    type: element.type || '',
-                                    domPath: getDomPath(element),
-                                    inIframe: true,
-                                    iframeIndex: i,
-                                    coordinates: {
-                                        clickX: e.clientX,
-                                        clickY: e.clientY,
-                                        pageX: e.pageX,
-                                        pageY: e.pageY
-                                    },
-                                    timestamp: new Date().toISOString()
-                                };
-                                window.clickEvents.push(clickData);
-                                setTimeout(function() { window.clickPending = false; }, 50);
-                            }, true);
-                            iframeDoc._clickTrackerInjected = true;
-                        }
-                    } catch(e) {
-                        // Cross-origin iframe, skip
-                    }
-                }
-            } catch(e) {}
-            
-            // Inject into shadow DOMs
-            try {
-                function injectIntoShadowRoots(root) {
-                    var elements = root.querySelectorAll('*');
-                    for (var i = 0; i < elements.length; i++) {
-                        if (elements[i].shadowRoot && !elements[i].shadowRoot._clickTrackerInjected) {
-                            var shadowRoot = elements[i].shadowRoot;
-                            shadowRoot.addEventListener('click', function(e) {
-                                var element = e.target;
-                                var now = Date.now();
-                                if (now - window.lastClickTime < 100) return;
-                                window.lastClickTime = now;
-                                window.clickPending = true;
-                                
-                                var rect = element.getBoundingClientRect();
-                                var clickData = {
-                                    tagName: element.tagName,
-                                    id: element.id || '',
-                                    className: element.className || '',
-                                    text: element.innerText ? element.innerText.substring(0, 100) : '',
-                                    href: element.href || '',
-                                    type: element.type || '',
-                                    domPath: getDomPath(element),
-                                    inShadowRoot: true,
-                                    coordinates: {
-                                        clickX: e.clientX,
-                                        clickY: e.clientY,
-                                        pageX: e.pageX,
-                                        pageY: e.pageY
-                                    },
-                                    timestamp: new Date().toISOString()
-                                };
-                                window.clickEvents.push(clickData);
-                                setTimeout(function() { window.clickPending = false; }, 50);
-                            }, true);
-                            shadowRoot._clickTrackerInjected = true;
-                            
-                            // Recursively inject into nested shadow roots
-                            injectIntoShadowRoots(shadowRoot);
-                        }
-                    }
-                }
-                injectIntoShadowRoots(document);
-            } catch(e) {}
-        }
-        return window.clickTrackerInjected;
+            # Check 4: Visual loaders and animations
+            if state.loaders:
+                return True, f"Visible loaders: {state.loaders}"
+            
+            # Check 5: Framework-specific checks
+            if state.fw:
+                return True, f"Framework loading - {state.fw}"
+            
+            # All checks passed - page is ready
+            return False, "All checks passed"
+            
+        except Exception as e:
+            # On error, assume loading (safe default)
+            return True, f"Check error: {str(e)}"
+    
+    def _install_all_trackers(self):
+        """
+        Install the loading-detection trackers (mutation observer + network tracker)
+        Registers them with CDP so they are re-installed on every new document,
+        then evaluates them once for the page that is already loaded
+        CDP registrations only apply to the tab the driver is attached to, so
+        this runs again for every tab the recording switches to
         """
         try:
-            result = self.driver.execute_script(script)
-            if result:
-                self.injection_failed_count = 0
-                print("[INFO] Click tracker injected into main DOM, iframes, and shadow roots")
-                return True
-            else:
-                self.injection_failed_count += 1
-                return False
+            self._tracker_tabs.add(self.driver.current_window_handle)
+        except Exception:
+            pass
+        
+        if self.use_cdp:
+            try:
+                self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                    "source": LOADING_TRACKERS_JS
+                })
+            except Exception as e:
+                logger.warning(f"Could not register trackers for new documents: {e}")
+        
+        try:
+            self.driver.execute_script(LOADING_TRACKERS_JS)
         except Exception as e:
-            self.injection_failed_count += 1
-            if self.injection_failed_count <= 2:
-                print(f"[WARNING] Click tracker injection failed: {str(e)[:100]}")
-            return False
-
-    def inject_hover_tracker(self):
-        """Inject JavaScript to track hover (mouseover) events with debounce to avoid noise"""
-        script = """
-        function getXPath(element) {
-            if (element.id !== '') {
-                return '//*[@id="' + element.id + '"]';
-            }
-            if (element === document.body) {
-                return '/html/body';
-            }
-            var ix = 0;
-            var siblings = element.parentNode ? element.parentNode.childNodes : [];
-            for (var i = 0; i < siblings.length; i++) {
-                var sibling = siblings[i];
-                if (sibling === element) {
-                    var tagName = element.tagName.toLowerCase();
-                    return getXPath(element.parentNode) + '/' + tagName + '[' + (ix + 1) + ']';
-                }
-                if (sibling.nodeType === 1 && sibling.tagName === element.tagName) {
-                    ix++;
-                }
-            }
-        }
-        function getCssSelector(element) {
-            if (element.id) {
-                return '#' + element.id;
-            }
-            var path = [];
-            while (element.nodeType === Node.ELEMENT_NODE) {
-                var selector = element.nodeName.toLowerCase();
-                if (element.id) {
-                    selector += '#' + element.id;
-                    path.unshift(selector);
-                    break;
-                } else {
-                    var sibling = element; var nth = 1;
-                    while (sibling.previousElementSibling) {
-                        sibling = sibling.previousElementSibling;
-                        if (sibling.nodeName.toLowerCase() === selector) nth++;
-                    }
-                    if (nth !== 1) selector += ':nth-of-type(' + nth + ')';
+            print(f"[WARNING] Could not setup loading trackers: {e}")
+        
+        self._register_activity_trackers()
+    
+    def _register_activity_trackers(self):
+        """
+        Register the click/input/hover tracker bundle with CDP so Chrome runs it
+        in every new top-level document before page scripts, instead of the
+        monitor loop re-sending it after each navigation
+        Same-origin iframes and shadow roots are hooked by the bundle itself;
+        it is skipped inside frames because events are drained from the top window
+        """
+        if not self.use_cdp:
+            return
+        source = (
+            "(function() {\nif (window.top !== window) return;\n"
+            + self._tracker_script
+            + "\n}).call(window, %d);" % self.EVENT_BUFFER_SIZE
+        )
+        try:
+            self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                "source": source,
+                "runImmediately": True
+            })
+            self._trackers_registered = True
+        except Exception as e:
+            logger.warning(f"Could not register activity trackers for new documents: {e}")
+    
+    def _check_network_activity(self):
+        """
+        Check if there are active network requests
+        Uses both JavaScript tracker and Performance API
+        Returns: reason string if active, None if not active
+        """
+        try:
+            result = self.driver.execute_script("""
+                let reasons = [];
+                
+                // Check JavaScript tracker
+                if (window._networkTracker && window._networkTracker.pendingRequests > 0) {
+                    reasons.push('Active fetch/XHR: ' + window._networkTracker.pendingRequests);
                 }
-                path.unshift(selector);
-                element = element.parentNode;
-            }
-            return path.join(' > ');
-        }
-        // Helper function to capture DOM path (iframe and shadow DOM chain)
-        function getDomPath(element) {
-            var path = [];
-            var currentElement = element;
-            var currentRoot = document;
-            
-            while (currentElement && currentElement !== currentRoot) {
-                // Check if we're crossing a shadow boundary
-                var host = currentElement.getRootNode();
-                if (host && host !== document && host.host) {
-                    // We're in a shadow root
-                    var shadowHost = host.host;
-                    path.unshift({
-                        type: 'shadow',
-                        host: shadowHost.tagName.toLowerCase() + (shadowHost.id ? '#' + shadowHost.id : ''),
-                        hostSelector: getCssSelector(shadowHost)
-                    });
-                    currentElement = shadowHost;
-                    continue;
+                
+                // Check Performance API for in-progress requests
+                let inProgress = window.performance.getEntriesByType('resource')
+                    .filter(r => r.duration === 0 || (performance.now() - r.startTime) < 100);
+                
+                if (inProgress.length > 0) {
+                    reasons.push('Resources loading: ' + inProgress.length);
                 }
                 
-                // Check if parent is in an iframe
-                if (currentElement === currentRoot.body || currentElement === currentRoot.documentElement) {
-                    // Check if this document is inside an iframe
-                    try {
-                        if (currentRoot !== window.top.document && currentRoot.defaultView && currentRoot.defaultView.frameElement) {
-                            var iframe = currentRoot.defaultView.frameElement;
-                            var iframeDoc = window.top.document;
-                            var iframeSelector = getCssSelector.call({nodeType: Node.ELEMENT_NODE}, iframe);
-                            
-                            // Find iframe index
-                            var iframes = iframeDoc.querySelectorAll('iframe');
-                            var iframeIndex = -1;
-                            for (var i = 0; i < iframes.length; i++) {
-                                if (iframes[i] === iframe) {
-                                    iframeIndex = i;
-                                    break;
-                                }
-                            }
-                            
-                            path.unshift({
-                                type: 'iframe',
-                                selector: iframeSelector,
-                                index: iframeIndex,
-                                name: iframe.name || '',
-                                id: iframe.id || ''
-                            });
-                            
-                            currentRoot = iframeDoc;
-                            currentElement = iframe;
-                            continue;
-                        }
-                    } catch(e) {
-                        // Cross-origin or top-level, stop traversal
-                        break;
-                    }
+                // Check jQuery if present
+                if (window.jQuery && jQuery.active > 0) {
+                    reasons.push('jQuery.active: ' + jQuery.active);
                 }
                 
-                currentElement = currentElement.parentNode;
-            }
+                return reasons.length > 0 ? reasons.join(', ') : null;
+            """)
+            
+            if result:
+                return f"Network activity - {result}"
+                
+            return None
+            
+        except Exception:
+            return None
+    
+    def _check_dom_mutations(self):
+        """
+        Check if DOM is actively mutating
+        Indicates dynamic content loading
+        Returns: reason string if mutating, None if not
+        """
+        try:
+            result = self.driver.execute_script(DOM_MUTATION_CHECK_JS)
             
-            // Add the element itself at the end
-            path.push({
-                type: 'element',
-                selector: getCssSelector(element),
-                xpath: getXPath(element),
-                tagName: element.tagName.toLowerCase(),
-                id: element.id || '',
-                name: element.name || '',
-                className: element.className || ''
-            });
+            return result
             
-            return path;
-        }
-        if (!window.hoverTrackerInjected) {
-            window.hoverEvents = [];
-            window.lastHover = { selector: null, ts: 0 };
-            function captureHover(e) {
-                var el = e.target;
-                if (!el) return;
-                var now = Date.now();
-                var selector = getCssSelector(el);
-                // Debounce same element within 400ms
-                if (window.lastHover.selector === selector && (now - window.lastHover.ts) < 400) return;
-                window.lastHover.selector = selector; window.lastHover.ts = now;
-                var rect = el.getBoundingClientRect();
-                var data = {
-                    tagName: el.tagName,
-                    id: el.id || '',
-                    className: el.className || '',
-                    text: el.innerText ? el.innerText.substring(0,100) : '',
-                    title: el.title || '',
-                    href: el.href || '',
-                    type: el.type || '',
-                    coordinates: {
-                        elementLeft: rect.left,
-                        elementTop: rect.top,
-                        elementWidth: rect.width,
-                        elementHeight: rect.height,
-                        elementCenterX: rect.left + rect.width/2,
-                        elementCenterY: rect.top + rect.height/2,
-                        viewportWidth: window.innerWidth || document.documentElement.clientWidth,
-                        viewportHeight: window.innerHeight || document.documentElement.clientHeight,
-                        scrollX: window.scrollX || window.pageXOffset,
-                        scrollY: window.scrollY || window.pageYOffset
-                    },
-                    selectors: {
-                        xpath: getXPath(el),
-                        cssSelector: selector
-                    },
-                    domPath: getDomPath(el),
-                    inIframe: false,
-                    inShadowRoot: false,
-                    timestamp: new Date().toISOString()
-                };
-                window.hoverEvents.push(data);
-            }
-            document.addEventListener('mouseover', captureHover, true);
-            // Iframes
-            try {
-                var iframes = document.querySelectorAll('iframe');
-                for (var i=0;i<iframes.length;i++) {
-                    try {
-                        var idoc = iframes[i].contentDocument || iframes[i].contentWindow.document;
-                        if (idoc && !idoc._hoverTrackerInjected) {
-                            idoc.addEventListener('mouseover', function(e){
-                                var el = e.target; if(!el) return; var rect = el.getBoundingClientRect();
-                                var data = {
-                                    tagName: el.tagName,
-                                    id: el.id || '',
-                                    className: el.className || '',
-                                    text: el.innerText ? el.innerText.substring(0,100) : '',
-                                    inIframe: true,
-                                    iframeIndex: i,
-                                    selectors: { xpath: getXPath(el), cssSelector: getCssSelector(el) },
-                                    timestamp: new Date().toISOString()
-                                };
-                                window.hoverEvents.push(data);
-                            }, true);
-                            idoc._hoverTrackerInjected = true;
-                        }
-                    } catch(_e) {}
-                }
-            } catch(_e) {}
-            // Shadow roots
-            try {
-                function injectShadow(root){
-                    var all = root.querySelectorAll('*');
-                    for (var j=0;j<all.length;j++){
-                        var sr = all[j].shadowRoot;
-                        if (sr && !sr._hoverTrackerInjected){
-                            sr.addEventListener('mouseover', function(e){
-                                var el = e.target; if(!el) return; var rect = el.getBoundingClientRect();
-                                var data = {
-                                    tagName: el.tagName,
-                                    id: el.id || '',
-                                    className: el.className || '',
-                                    text: el.innerText ? el.innerText.substring(0,100) : '',
-                                    inShadowRoot: true,
-                                    selectors: { xpath: getXPath(el), cssSelector: getCssSelector(el) },
-                                    timestamp: new Date().toISOString()
-                                };
-                                window.hoverEvents.push(data);
-                            }, true);
-                            sr._hoverTrackerInjected = true;
-                            injectShadow(sr);
-                        }
-                    }
-                }
-                injectShadow(document);
-            } catch(_e) {}
-            window.hoverTrackerInjected = true;
-        }
-        return window.hoverTrackerInjected;
+        except Exception:
+            return None
+    
+    def _check_visual_loaders(self):
+        """
+        Check for common visual loading indicators using JavaScript
+        Much faster than VLM analysis
+        Returns: reason string if loaders found, None if not
         """
         try:
-            return self.driver.execute_script(script)
+            result = self.driver.execute_script(VISUAL_LOADER_CHECK_JS)
+            
+            if result:
+                return f"Visible loaders: {result}"
+            
+            return None
+            
         except Exception:
-            return False
+            return None
+    
+    def _check_framework_loading(self):
+        """
+        Check loading state for popular JavaScript frameworks
+        Returns: reason string if loading detected, None if not
+        """
+        try:
+            result = self.driver.execute_script(FRAMEWORK_LOADING_CHECK_JS)
             
-    def inject_input_tracker(self):
-        """Inject JavaScript to track text input with comprehensive element information"""
-        script = """
-        // Helper function to get XPath (reuse from click tracker)
-        function getXPath(element) {
-            if (element.id !== '') {
-                return '//*[@id="' + element.id + '"]';
-            }
-            if (element === document.body) {
-                return '/html/body';
-            }
-            var ix = 0;
-            var siblings = element.parentNode ? element.parentNode.childNodes : [];
-            for (var i = 0; i < siblings.length; i++) {
-                var sibling = siblings[i];
-                if (sibling === element) {
-                    var tagName = element.tagName.toLowerCase();
-                    return getXPath(element.parentNode) + '/' + tagName + '[' + (ix + 1) + ']';
-                }
-                if (sibling.nodeType === 1 && sibling.tagName === element.tagName) {
-                    ix++;
-                }
-            }
-        }
-        
-        // Helper function to get CSS selector
-        function getCssSelector(element) {
-            if (element.id) {
-                return '#' + element.id;
-            }
-            var path = [];
-            while (element.nodeType === Node.ELEMENT_NODE) {
-                var selector = element.nodeName.toLowerCase();
-                if (element.id) {
-                    selector += '#' + element.id;
-                    path.unshift(selector);
-                    break;
-                } else {
-                    var sibling = element;
-                    var nth = 1;
-                    while (sibling.previousElementSibling) {
-                        sibling = sibling.previousElementSibling;
-                        if (sibling.nodeName.toLowerCase() === selector) nth++;
-                    }
-                    if (nth !== 1) selector += ':nth-of-type(' + nth + ')';
-                }
-                path.unshift(selector);
-                element = element.parentNode;
-            }
-            return path.join(' > ');
+            if result:
+                return f"Framework loading - {result}"
+            
+            return None
+            
+        except Exception:
+            return None
+    
+    def get_loading_details(self):
+        """
+        Get detailed information about what's causing loading state
+        Useful for debugging
+        """
+        details = {
+            'document_ready': False,
+            'network_activity': False,
+            'dom_mutations': False,            # bool
+            'dom_mutations_reason': '',        # textual reason
+            'visual_loaders': False,           # bool
+            'visual_loaders_reason': '',       # textual reason
+            'framework_loading': False,        # bool
+            'framework_loading_reason': '',    # textual reason
+            'overall_loading': False,
+            'error': ''
         }
         
-        // Helper function to get computed styles
-        function getVisualProperties(element) {
-            var computed = window.getComputedStyle(element);
-            return {
-                backgroundColor: computed.backgroundColor,
-                color: computed.color,
-                fontSize: computed.fontSize,
-                fontFamily: computed.fontFamily,
-                fontWeight: computed.fontWeight,
-                border: computed.border,
-                padding: computed.padding,
-                margin: computed.margin,
-                display: computed.display,
-                width: computed.width,
-                height: computed.height,
-                borderRadius: computed.borderRadius,
-                boxShadow: computed.boxShadow
-            };
-        }
+        try:
+            # Reuse the checks poll_browser_state() ran this tick (if < 50ms old);
+            # components it short-circuited past are run here
+            state = None
+            if self._last_loading_snapshot is not None:
+                snapshot_ts, snapshot_state = self._last_loading_snapshot
+                if time.monotonic() - snapshot_ts < 0.05:
+                    state = snapshot_state
+            ran_mut = state is not None and state.ready == "complete"
+            ran_loaders = ran_mut and not state.mut
+            ran_fw = ran_loaders and not state.loaders
+            
+            # Check each component
+            if state is not None:
+                doc_state = state.ready
+            else:
+                doc_state = self.driver.execute_script("return document.readyState;")
+            details['document_ready'] = (doc_state == "complete")
+            # details['network_activity'] = self._check_network_activity()  # COMMENTED OUT
+            details['network_activity'] = False  # Always false (network check disabled)
+            dom_mut = state.mut if ran_mut else self._check_dom_mutations()
+            details['dom_mutations'] = bool(dom_mut)
+            details['dom_mutations_reason'] = dom_mut or ''
+
+            if ran_loaders:
+                vis_load = f"Visible loaders: {state.loaders}" if state.loaders else None
+            else:
+                vis_load = self._check_visual_loaders()
+            details['visual_loaders'] = bool(vis_load)
+            details['visual_loaders_reason'] = vis_load or ''
+
+            if ran_fw:
+                fw_load = f"Framework loading - {state.fw}" if state.fw else None
+            else:
+                fw_load = self._check_framework_loading()
+            details['framework_loading'] = bool(fw_load)
+            details['framework_loading_reason'] = fw_load or ''
+            
+            # Overall status
+            details['overall_loading'] = (
+                not details['document_ready'] or
+                # details['network_activity'] or  # COMMENTED OUT
+                details['dom_mutations'] or
+                details['visual_loaders'] or
+                details['framework_loading']
+            )
+            
+        except Exception as e:
+            details['error'] = str(e)
         
-        // Helper function to capture DOM path (iframe and shadow DOM chain)
-        function getDomPath(element) {
-            var path = [];
-            var currentElement = element;
-            var currentRoot = document;
+        return details
+    
+    def check_and_handle_popup(self):
+        """
+        Detect and handle browser pop-ups (alert, confirm, prompt)
+        Returns: True if popup was handled, False otherwise
+        """
+        try:
+            # Check for alert/confirm/prompt
+            alert = self.driver.switch_to.alert
             
-            while (currentElement && currentElement !== currentRoot) {
-                // Check if we're crossing a shadow boundary
-                var host = currentElement.getRootNode();
-                if (host && host !== document && host.host) {
-                    // We're in a shadow root
-                    var shadowHost = host.host;
-                    path.unshift({
-                        type: 'shadow',
-                        host: shadowHost.tagName.toLowerCase() + (shadowHost.id ? '#' + shadowHost.id : ''),
-                        hostSelector: getCssSelector(shadowHost)
-                    });
-                    currentElement = shadowHost;
-                    continue;
-                }
-                
-                // Check if parent is in an iframe
-                if (currentElement === currentRoot.body || currentElement === currentRoot.documentElement) {
-                    // Check if this document is inside an iframe
-                    try {
-                        if (currentRoot !== window.top.document && currentRoot.defaultView && currentRoot.defaultView.frameElement) {
-                            var iframe = currentRoot.defaultView.frameElement;
-                            var iframeDoc = window.top.document;
-                            var iframeSelector = getCssSelector.call({nodeType: Node.ELEMENT_NODE}, iframe);
-                            
-                            // Find iframe index
-                            var iframes = iframeDoc.querySelectorAll('iframe');
-                            var iframeIndex = -1;
-                            for (var i = 0; i < iframes.length; i++) {
-                                if (iframes[i] === iframe) {
-                                    iframeIndex = i;
-                                    break;
-                                }
-                            }
-                            
-                            path.unshift({
-                                type: 'iframe',
-                                selector: iframeSelector,
-                                index: iframeIndex,
-                                name: iframe.name || '',
-                                id: iframe.id || ''
-                            });
-                            
-                            currentRoot = iframeDoc;
-                            currentElement = iframe;
-                            continue;
-                        }
-                    } catch(e) {
-                        // Cross-origin or top-level, stop traversal
-                        break;
-                    }
-                }
+            # Get alert details
+            alert_text = alert.text
+            alert_type = self._detect_alert_type(alert)
+            
+            print(f"[POPUP] Detected {alert_type}: {alert_text[:50]}...")
+            
+            # Capture screenshot before handling
+            screenshot_info = None
+            try:
+                self.screenshot_counter += 1
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                screenshot_filename = f"popup_{self.screenshot_counter}_{timestamp}.png"
+                screenshot_path = os.path.join(self.screenshots_dir, screenshot_filename)
+                self.driver.save_screenshot(screenshot_path)
+                screenshot_info = {"filename": screenshot_filename, "path": screenshot_path}
+            except Exception:
+                print("[POPUP] Failed capturing popup screenshot")
+            
+            # Record the popup
+            popup_details = {
+                "type": alert_type,
+                "text": alert_text,
+                "action": "accept",  # Default action
+                "input_value": None
+            }
+            
+            # Handle based on type
+            if alert_type == "prompt":
+                # For prompt, we'll accept with empty string
+                # In future, could use VLM to determine appropriate input
+                try:
+                    alert.send_keys("")  # Send empty or default value
+                    popup_details["input_value"] = ""
+                except Exception:
+                    print("[POPUP] Prompt input send failed")
+            
+            # Accept the alert/confirm/prompt
+            alert.accept()
+            popup_details["action"] = "accept"
+            
+            # Record activity
+            self.record_activity("popup_handled", popup_details)
+            
+            if screenshot_info:
+                self.activity_log[-1]["screenshot"] = screenshot_info
+            
+            print(f"[POPUP] Handled {alert_type} by accepting")
+            return True
+            
+        except Exception as e:
+            # No alert present or error handling it
+            error_str = str(e).lower()
+            if "no such alert" not in error_str and "no alert is present" not in error_str:
+                # Real error, not just "no alert"
+                pass
+            return False
+    
+    def _detect_alert_type(self, alert):
+        """
+        Detect if alert is alert, confirm, or prompt
+        This is tricky as Selenium doesn't directly expose the type
+        """
+        try:
+            # Try to send keys - only prompts accept input
+            alert.send_keys("")
+            return "prompt"
+        except Exception:
+            return "confirm"
+    
+    def check_modal_dialogs(self):
+        """
+        Detect custom modal dialogs (non-native popups) and automatically click buttons
+        These are HTML/CSS modals, not browser alerts
+        """
+        try:
+            # The same modal often matches several selectors; keep the first
+            # selector it matched, keyed by the driver-assigned element id
+            seen_ids = set()
+            candidates = []
+            for selector in self._MODAL_SELECTORS:
+                try:
+                    for modal in self.driver.find_elements(By.CSS_SELECTOR, selector):
+                        if modal.id not in seen_ids and modal.id not in self._persistent_modal_ids:
+                            seen_ids.add(modal.id)
+                            candidates.append((modal, selector))
+                except Exception:
+                    continue
+            
+            if not candidates:
+                return False
+            
+            shown = self.driver.execute_script(ELEMENTS_SHOWN_JS, [modal for modal, _ in candidates])
+            for (modal, selector), is_shown in zip(candidates, shown):
+                if not is_shown:
+                    continue
+                print(f"[MODAL] Detected custom modal dialog with selector: {selector}")
                 
-                currentElement = currentElement.parentNode;
-            }
+                # Try to find and click a button automatically
+                button_clicked = self._find_and_click_dialog_button(modal, selector)
+                
+                if not button_clicked:
+                    # Just record detection if no button found
+                    self._record_modal_detection(modal, selector)
+                return True
             
-            // Add the element itself at the end
-            path.push({
-                type: 'element',
-                selector: getCssSelector(element),
-                xpath: getXPath(element),
-                tagName: element.tagName.toLowerCase(),
-                id: element.id || '',
-                name: element.name || '',
-                className: element.className || ''
-            });
+            return False
             
-            return path;
-        }
-        
-        if (!window.inputTrackerInjected) {
-            window.inputEvents = [];
-            window.inputDebounce = {};
+        except Exception:
+            return False
+    
+    def _find_modal_button_js(self, modal, patterns):
+        """
+        Select and match the modal's buttons in one execute_script call
+        Returns: {element, index, count, details} or None if the modal has no buttons
+        """
+        return self.driver.execute_script(
+            FIND_MODAL_BUTTON_JS, modal, list(patterns), self._MODAL_BUTTON_SELECTOR_CSS,
+            self.MAX_MODAL_BUTTONS
+        )
+    
+    def _find_and_click_dialog_button(self, modal, modal_selector):
+        """
+        Find and click dialog buttons automatically based on text or position
+        Returns: True if button was clicked, False otherwise
+        """
+        try:
+            result = self._find_modal_button_js(modal, DIALOG_BUTTON_TEXTS)
+            if not result:
+                print("[MODAL] No buttons found in modal")
+                return False
             
-            document.addEventListener('input', function(e) {
-                var element = e.target;
-                if (element.tagName === 'INPUT' || element.tagName === 'TEXTAREA') {
-                    var elementId = element.id || element.name || Math.random();
-                    
-                    // Debounce rapid input events
-                    clearTimeout(window.inputDebounce[elementId]);
-                    window.inputDebounce[elementId] = setTimeout(function() {
-                        // Get bounding rectangle for coordinates
-                        var rect = element.getBoundingClientRect();
-                        
-                        // Get viewport dimensions
-                        var viewportWidth = window.innerWidth || document.documentElement.clientWidth;
-                        var viewportHeight = window.innerHeight || document.documentElement.clientHeight;
-                        
-                        var inputData = {
-                            // Basic element info
-                            tagName: element.tagName,
-                            type: element.type || 'text',
-                            id: element.id || '',
-                            name: element.name || '',
-                            className: element.className || '',
-                            
-                            // Input properties
-                            placeholder: element.placeholder || '',
-                            value: element.value,
-                            maxLength: element.maxLength || -1,
-                            minLength: element.minLength || -1,
-                            required: element.required || false,
-                            disabled: element.disabled || false,
-                            readOnly: element.readOnly || false,
-                            autocomplete: element.autocomplete || '',
-                            
-                            // Label association
-                            label: '',
-                            
-                            // Coordinates
-                            coordinates: {
-                                // Element position and size
-                                elementLeft: rect.left,
-                                elementTop: rect.top,
-                                elementRight: rect.right,
-                                elementBottom: rect.bottom,
-                                elementWidth: rect.width,
-                                elementHeight: rect.height,
-                                // Element center point
-                                elementCenterX: rect.left + rect.width / 2,
-                                elementCenterY: rect.top + rect.height / 2,
-                                // Viewport dimensions
-                                viewportWidth: viewportWidth,
-                                viewportHeight: viewportHeight,
-                                // Scroll position
-                                scrollX: window.scrollX || window.pageXOffset,
-                                scrollY: window.scrollY || window.pageYOffset
-                            },
-                            
-                            // Selectors for element identification
-                            selectors: {
-                                xpath: getXPath(element),
-                                cssSelector: getCssSelector(element)
-                            },
-                            
-                            // DOM traversal path (iframe and shadow DOM chain)
-                            domPath: getDomPath(element),
-                            
-                            // Visual properties
-                            visualProperties: getVisualProperties(element),
-                            
-                            // Attributes
-                            attributes: {},
-                            
-                            // Parent information
-                            parent: {
-                                tagName: element.parentElement ? element.parentElement.tagName : '',
-                                id: element.parentElement ? element.parentElement.id : '',
-                                className: element.parentElement ? element.parentElement.className : ''
-                            },
-                            
-                            // Form information if in a form
-                            form: {
-                                id: element.form ? element.form.id : '',
-                                name: element.form ? element.form.name : '',
-                                action: element.form ? element.form.action : '',
-                                method: element.form ? element.form.method : ''
-                            },
-                            
-                            // ARIA attributes
-                            ariaLabel: element.getAttribute('aria-label') || '',
-                            ariaDescribedBy: element.getAttribute('aria-describedby') || '',
-                            ariaRequired: element.getAttribute('aria-required') || '',
-                            
-                            // Data attributes
-                            dataAttributes: {},
-                            
-                            // Input state
-                            selectionStart: element.selectionStart || 0,
-                            selectionEnd: element.selectionEnd || 0,
-                            
-                            // Timestamp
-                            timestamp: new Date().toISOString()
-                        };
-                        
-                        // Try to find associated label
-                        var label = element.labels ? element.labels[0] : null;
-                        if (!label && element.id) {
-                            label = document.querySelector('label[for="' + element.id + '"]');
-                        }
-                        if (label) {
-                            inputData.label = label.innerText || label.textContent || '';
-                        }
-                        
-                        // Collect all attributes
-                        if (element.attributes) {
-                            for (var i = 0; i < element.attributes.length; i++) {
-                                var attr = element.attributes[i];
-                                inputData.attributes[attr.name] = attr.value;
-                                
-                                // Separately collect data-* attributes
-                                if (attr.name.startsWith('data-')) {
-                                    inputData.dataAttributes[attr.name] = attr.value;
-                                }
-                            }
-                        }
-                        
-                        window.inputEvents.push(inputData);
-                    }, 300); // Wait 300ms after last keystroke
-                }
-            }, true);
+            print(f"[MODAL] Found {result['count']} unique button(s)")
+            button = result['element']
+            if button is None:
+                return False
             
-            // Add change event listener for checkboxes and radio buttons
-            document.addEventListener('change', function(e) {
-                var element = e.target;
-                if (element.tagName === 'INPUT' && (element.type === 'checkbox' || element.type === 'radio')) {
-                    // Get bounding rectangle for coordinates
-                    var rect = element.getBoundingClientRect();
-                    
-                    // Get viewport dimensions
-                    var viewportWidth = window.innerWidth || document.documentElement.clientWidth;
-                    var viewportHeight = window.innerHeight || document.documentElement.clientHeight;
-                    
-                    var changeData = {
-                        // Basic element info
-                        tagName: element.tagName,
-                        type: element.type,
-                        id: element.id || '',
-                        name: element.name || '',
-                        className: element.className || '',
-                        
-                        // Checkbox/Radio specific properties
-                        checked: element.checked,
-                        value: element.value || '',
-                        required: element.required || false,
-                        disabled: element.disabled || false,
-                        
-                        // Label association
-                        label: '',
-                        
-                        // Coordinates
-                        coordinates: {
-                            // Element position and size
-                            elementLeft: rect.left,
-                            elementTop: rect.top,
-                            elementRight: rect.right,
-                            elementBottom: rect.bottom,
-                            elementWidth: rect.width,
-                            elementHeight: rect.height,
-                            // Element center point
-                            elementCenterX: rect.left + rect.width / 2,
-                            elementCenterY: rect.top + rect.height / 2,
-                            // Viewport dimensions
-                            viewportWidth: viewportWidth,
-                            viewportHeight: viewportHeight,
-                            // Scroll position
-                            scrollX: window.scrollX || window.pageXOffset,
-                            scrollY: window.scrollY || window.pageYOffset
-                        },
-                        
-                        // Selectors for element identification
-                        selectors: {
-                            xpath: getXPath(element),
-                            cssSelector: getCssSelector(element)
-                        },
-                        
-                        // DOM traversal path (iframe and shadow DOM chain)
-                        domPath: getDomPath(element),
-                        
-                        // Visual properties
-                        visualProperties: getVisualProperties(element),
-                        
-                        // Attributes
-                        attributes: {},
-                        
-                        // Parent information
-                        parent: {
-                            tagName: element.parentElement ? element.parentElement.tagName : '',
-                            id: element.parentElement ? element.parentElement.id : '',
-                            className: element.parentElement ? element.parentElement.className : ''
-                        },
-                        
-                        // Form information if in a form
-                        form: {
-                            id: element.form ? element.form.id : '',
-                            name: element.form ? element.form.name : '',
-                            action: element.form ? element.form.action : '',
-                            method: element.form ? element.form.method : ''
-                        },
-                        
-                        // ARIA attributes
-                        ariaLabel: element.getAttribute('aria-label') || '',
-                        ariaDescribedBy: element.getAttribute('aria-describedby') || '',
-                        ariaRequired: element.getAttribute('aria-required') || '',
-                        
-                        // Data attributes
-                        dataAttributes: {},
-                        
-                        // Timestamp
-                        timestamp: new Date().toISOString()
-                    };
-                    
-                    // Try to find associated label
-                    var label = element.labels ? element.labels[0] : null;
-                    if (!label && element.id) {
-                        label = document.querySelector('label[for="' + element.id + '"]');
-                    }
-                    if (label) {
-                        changeData.label = label.innerText || label.textContent || '';
-                    }
-                    
-                    // Collect all attributes
-                    if (element.attributes) {
-                        for (var i = 0; i < element.attributes.length; i++) {
-                            var attr = element.attributes[i];
-                            changeData.attributes[attr.name] = attr.value;
-                            
-                            // Separately collect data-* attributes
-                            if (attr.name.startsWith('data-')) {
-                                changeData.dataAttributes[attr.name] = attr.value;
-                            }
-                        }
-                    }
-                    
-                    window.inputEvents.push(changeData);
-                }
-            }, true);
+            info = result['details']
+            label = info['text'] or info['value'] or info['aria']
+            if result['index'] >= 0:
+                matched_text = DIALOG_BUTTON_TEXTS[result['index']]
+                print(f"[MODAL] Found button with text: '{label}'")
+            else:
+                # If no text match, click the first visible button (fallback)
+                matched_text = 'first_button'
+                print(f"[MODAL] No text match, clicking first button: '{label or 'Unknown'}'")
             
-            window.inputTrackerInjected = true;
+            # Capture details before clicking
+            button_details = self._capture_button_details(button, modal_selector, matched_text, info)
             
-            // Inject into iframes
-            try {
-                var iframes = document.querySelectorAll('iframe');
-                for (var i = 0; i < iframes.length; i++) {
-                    try {
-                        var iframeDoc = iframes[i].contentDocument || iframes[i].contentWindow.document;
-                        if (iframeDoc && !iframeDoc._inputTrackerInjected) {
-                            iframeDoc.addEventListener('input', function(e) {
-                                var element = e.target;
-                                if (element.tagName === 'INPUT' || element.tagName === 'TEXTAREA') {
-                                    clearTimeout(element._inputTimeout);
-                                    element._inputTimeout = setTimeout(function() {
-                                        var inputData = {
-                                            tagName: element.tagName,
-                                            id: element.id || '',
-                                            name: element.name || '',
-                                            type: element.type || 'text',
-                                            value: element.value,
-                                            placeholder: element.placeholder || '',
-                                            domPath: getDomPath(element),
-                                            inIframe: true,
-                                            iframeIndex: i,
-                                            timestamp: new Date().toISOString()
-                                        };
-                                        window.inputEvents.push(inputData);
-                                    }, 300);
-                                }
-                            }, true);
-                            
-                            // Add change event listener for checkboxes and radio buttons in iframes
-                            iframeDoc.addEventListener('change', function(e) {
-                                var element = e.target;
-                                if (element.tagName === 'INPUT' && (element.type === 'checkbox' || element.type === 'radio')) {
-                                    var changeData = {
-                                        tagName: element.tagName,
-                                        id: element.id || '',
-                                        name: element.name || '',
-                                        type: element.type,
-                                        checked: element.checked,
-                                        value: element.value || '',
-                                        inIframe: true,
-                                        iframeIndex: i,
-                                        timestamp: new Date().toISOString()
-                                    };
-                                    window.inputEvents.push(changeData);
-                                }
-                            }, true);
-                            
-                            iframeDoc._inputTrackerInjected = true;
-                        }
-                    } catch(e) {
-                        // Cross-origin iframe, skip
-                    }
-                }
-            } catch(e) {}
-            
-            // Inject into shadow DOMs
-            try {
-                function injectInputIntoShadowRoots(root) {
-                    var elements = root.querySelectorAll('*');
-                    for (var i = 0; i < elements.length; i++) {
-                        if (elements[i].shadowRoot && !elements[i].shadowRoot._inputTrackerInjected) {
-                            var shadowRoot = elements[i].shadowRoot;
-                            shadowRoot.addEventListener('input', function(e) {
-                                var element = e.target;
-                                if (element.tagName === 'INPUT' || element.tagName === 'TEXTAREA') {
-                                    clearTimeout(element._inputTimeout);
-                                    element._inputTimeout = setTimeout(function() {
-                                        var inputData = {
-                                            tagName: element.tagName,
-                                            id: element.id || '',
-                                            name: element.name || '',
-                                            type: element.type || 'text',
-                                            value: element.value,
-                                            placeholder: element.placeholder || '',
-                                            domPath: getDomPath(element),
-                                            inShadowRoot: true,
-                                            timestamp: new Date().toISOString()
-                                        };
-                                        window.inputEvents.push(inputData);
-                                    }, 300);
-                                }
-                            }, true);
-                            
-                            // Add change event listener for checkboxes and radio buttons in shadow DOMs
-                            shadowRoot.addEventListener('change', function(e) {
-                                var element = e.target;
-                                if (element.tagName === 'INPUT' && (element.type === 'checkbox' || element.type === 'radio')) {
-                                    var changeData = {
-                                        tagName: element.tagName,
-                                        id: element.id || '',
-                                        name: element.name || '',
-                                        type: element.type,
-                                        checked: element.checked,
-                                        value: element.value || '',
-                                        inShadowRoot: true,
-                                        timestamp: new Date().toISOString()
-                                    };
-                                    window.inputEvents.push(changeData);
-                                }
-                            }, true);
-                            
-                            shadowRoot._inputTrackerInjected = true;
-                            
-                            // Recursively inject into nested shadow roots
-                            injectInputIntoShadowRoots(shadowRoot);
-                        }
+            # Scroll into view
+            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
+            try:
+                WebDriverWait(self.driver, 1, poll_frequency=0.05).until(
+                    lambda d: d.execute_script(IN_VIEWPORT_JS, button)
+                )
+            except TimeoutException:
+                pass
+            
+            # Click the button
+            try:
+                button.click()
+            except Exception:
+                # Fallback to JavaScript click
+                self.driver.execute_script("arguments[0].click();", button)
+            
+            print(f"[MODAL] Clicked button: '{label}'")
+            
+            # Record the click
+            self.record_activity("modal_button_click", button_details)
+            
+            # Wait briefly for the modal to close (removed or hidden); some
+            # modals legitimately stay open, and those are remembered so
+            # later ticks neither click nor wait on them again
+            try:
+                WebDriverWait(self.driver, 0.5, poll_frequency=0.05).until(
+                    EC.invisibility_of_element(modal)
+                )
+            except TimeoutException:
+                self._persistent_modal_ids.add(modal.id)
+            
+            return True
+            
+        except Exception as modal_err:
+            print(f"[MODAL] Error finding/clicking button: {modal_err}")
+            return False
+    
+    def _read_button_details(self, buttons, with_xpath=False):
+        """
+        Read text/value/aria/id/class/type/tag/rect (and optionally XPath) for
+        several buttons with a single execute_script call
+        Returns: list of dicts in the same order as buttons
+        """
+        if not buttons:
+            return []
+        return self.driver.execute_script(BUTTON_DETAILS_JS, buttons, with_xpath) or []
+    
+    def _capture_button_details(self, button, modal_selector, matched_text, info=None):
+        """Capture comprehensive details about a dialog button"""
+        try:
+            # Get button properties, coordinates and XPath in one round-trip
+            # (unless the caller already has them)
+            if info is None:
+                info = self._read_button_details([button], with_xpath=True)[0]
+            btn_text = info['text']
+            btn_tag = info['tag']
+            btn_id = info['id']
+            btn_class = info['cls']
+            btn_type = info['type']
+            btn_value = info['value']
+            btn_aria = info['aria']
+            btn_xpath = info['xpath']
+            location = {'x': info['rect']['x'], 'y': info['rect']['y']}
+            size = {'width': info['rect']['width'], 'height': info['rect']['height']}
+            
+            details = {
+                "modal_selector": modal_selector,
+                "matched_text": matched_text,
+                "button_text": btn_text,
+                "button_tag": btn_tag,
+                "button_id": btn_id,
+                "button_class": btn_class,
+                "button_type": btn_type,
+                "button_value": btn_value,
+                "button_aria_label": btn_aria,
+                "coordinates": {
+                    "x": location['x'],
+                    "y": location['y'],
+                    "width": size['width'],
+                    "height": size['height']
+                },
+                "xpath": btn_xpath
+            }
+            
+            # Capture screenshot with button highlighted
+            try:
+                screenshot_details = {
+                    "coordinates": {
+                        "x": location['x'],
+                        "y": location['y'],
+                        "width": size['width'],
+                        "height": size['height']
                     }
                 }
-                injectInputIntoShadowRoots(document);
-            } catch(e) {}
-        }
-        return window.inputTrackerInjected;
+                screenshot_path = self.capture_screenshot_with_highlight_async(screenshot_details)
+                details["screenshot"] = screenshot_path
+            except Exception as screenshot_err:
+                print(f"[MODAL] Screenshot capture failed: {screenshot_err}")
+            
+            return details
+            
+        except Exception as e:
+            print(f"[MODAL] Error capturing button details: {e}")
+            return {
+                "modal_selector": modal_selector,
+                "matched_text": matched_text,
+                "error": str(e)
+            }
+    
+    def _record_modal_detection(self, modal, selector):
+        """Record detection of custom modal dialog"""
+        try:
+            # Get modal text and whether it has a close button in one round-trip;
+            # querySelector stops at the first match inside the modal subtree
+            info = self.driver.execute_script(
+                "return {text: (arguments[0].innerText || '').substring(0, 200),"
+                " hasClose: !!arguments[0].querySelector(arguments[1])};",
+                modal, self._CLOSE_BUTTON_SELECTOR_CSS
+            )
+            modal_text = info['text']
+            has_close_button = bool(info['hasClose'])
+            
+            # Record modal detection
+            self.record_activity("modal_detected", {
+                "selector": selector,
+                "text": modal_text,
+                "has_close_button": has_close_button,
+                "note": "Custom modal dialog detected - may require manual handling"
+            })
+            
+        except Exception as e:
+            print(f"[MODAL] Error recording modal: {e}")
+    
+    def inject_click_tracker(self):
+        """Inject JavaScript to track clicks with comprehensive element information"""
+        try:
+            result = self.driver.execute_script(CLICK_TRACKER_INSTALL_JS, self.EVENT_BUFFER_SIZE)
+            if result:
+                self.injection_failed_count = 0
+                print("[INFO] Click tracker injected into main DOM, iframes, and shadow roots")
+                return True
+            else:
+                self.injection_failed_count += 1
+                return False
+        except Exception as e:
+            self.injection_failed_count += 1
+            if self.injection_failed_count <= 2:
+                print(f"[WARNING] Click tracker injection failed: {str(e)[:100]}")
+            return False
+
+    def _ensure_trackers(self, url):
+        """
+        Install the click/input/hover trackers in one execute_script call
+        On a URL that was already injected (or on any page once CDP injects
+        them), probe the page's sentinel first so the tracker source is only
+        re-sent when the page lost it
+        Returns: True if the trackers are active
         """
         try:
-            result = self.driver.execute_script(script)
+            # With CDP registration every new document already has them
+            if self._trackers_registered or url == self._trackers_injected_for_url:
+                if self.driver.execute_script("return window.__trackersInjected === true;"):
+                    self._trackers_injected_for_url = url
+                    return True
+            result = self.driver.execute_script(self._tracker_script, self.EVENT_BUFFER_SIZE)
+            if result:
+                self.injection_failed_count = 0
+                self._trackers_injected_for_url = url
+                print("[INFO] Trackers injected into main DOM, iframes, and shadow roots")
+                return True
+            self.injection_failed_count += 1
+            return False
+        except Exception as e:
+            self.injection_failed_count += 1
+            if self.injection_failed_count <= 2:
+                print(f"[WARNING] Tracker injection failed: {str(e)[:100]}")
+            return False
+    
+    def inject_hover_tracker(self):
+        """Inject JavaScript to track hover (mouseover) events with debounce to avoid noise"""
+        try:
+            return self.driver.execute_script(HOVER_TRACKER_INSTALL_JS, self.EVENT_BUFFER_SIZE)
+        except Exception:
+            return False
+            
+    def inject_input_tracker(self):
+        """Inject JavaScript to track text input with comprehensive element information"""
+        try:
+            result = self.driver.execute_script(INPUT_TRACKER_INSTALL_JS, self.EVENT_BUFFER_SIZE)
             if result:
                 print("[INFO] Input tracker injected into main DOM, iframes, and shadow roots")
                 return True
@@ -2805,78 +3617,33 @@ class BrowserActivityRecorder:
                 print(f"[WARNING] Input tracker injection failed: {str(e)[:100]}")
             return False
             
-    def reinject_into_dynamic_contexts(self):
-        """Reinject trackers into dynamically added iframes and shadow roots"""
-        try:
-            self.driver.execute_script("""
-                // Reinject into new iframes
-                try {
-                    var iframes = document.querySelectorAll('iframe');
-                    for (var i = 0; i < iframes.length; i++) {
-                        try {
-                            var iframeDoc = iframes[i].contentDocument || iframes[i].contentWindow.document;
-                            if (iframeDoc && !iframeDoc._clickTrackerInjected) {
-                                iframeDoc.addEventListener('click', function(e) {
-                                    var element = e.target;
-                                    var now = Date.now();
-                                    if (now - window.lastClickTime < 100) return;
-                                    window.lastClickTime = now;
-                                    var clickData = {
-                                        tagName: element.tagName,
-                                        id: element.id || '',
-                                        text: element.innerText ? element.innerText.substring(0, 100) : '',
-                                        inIframe: true,
-                                        timestamp: new Date().toISOString()
-                                    };
-                                    window.clickEvents.push(clickData);
-                                }, true);
-                                iframeDoc._clickTrackerInjected = true;
-                            }
-                        } catch(e) {}
-                    }
-                } catch(e) {}
-                
-                // Reinject into new shadow roots
-                try {
-                    function reinjectShadowRoots(root) {
-                        var elements = root.querySelectorAll('*');
-                        for (var i = 0; i < elements.length; i++) {
-                            if (elements[i].shadowRoot && !elements[i].shadowRoot._clickTrackerInjected) {
-                                var shadowRoot = elements[i].shadowRoot;
-                                shadowRoot.addEventListener('click', function(e) {
-                                    var element = e.target;
-                                    var now = Date.now();
-                                    if (now - window.lastClickTime < 100) return;
-                                    window.lastClickTime = now;
-                                    var clickData = {
-                                        tagName: element.tagName,
-                                        id: element.id || '',
-                                        text: element.innerText ? element.innerText.substring(0, 100) : '',
-                                        inShadowRoot: true,
-                                        timestamp: new Date().toISOString()
-                                    };
-                                    window.clickEvents.push(clickData);
-                                }, true);
-                                shadowRoot._clickTrackerInjected = true;
-                                reinjectShadowRoots(shadowRoot);
-                            }
-                        }
-                    }
-                    reinjectShadowRoots(document);
-                } catch(e) {}
-            """)
-        except Exception:
-            pass
+    def collect_tracker_events(self, batch=None):
+        """
+        Record pending click, hover and input events
+        Pass the batch drained by poll_browser_state(); without one they are
+        drained here in one round-trip
+        """
+        if batch is None:
+            try:
+                batch = self.driver.execute_script(
+                    "return window.__drainEvents ? JSON.stringify(window.__drainEvents(arguments[0])) : null;",
+                    self.DRAIN_BATCH_SIZE
+                )
+                batch = _json_loads(batch) if batch else None
+            except Exception:
+                return
+        if not batch:
+            return
+        self.collect_click_events(batch.get('clicks'))
+        self.collect_input_events(batch.get('inputs'))
+        self.collect_hover_events(batch.get('hovers'))
     
-    def collect_click_events(self):
+    def collect_click_events(self, clicks=None):
         """Collect click events from JavaScript tracker"""
         try:
             # Always collect pending clicks, even if page is loading
-            clicks = self.driver.execute_script("""
-                var events = window.clickEvents || []; 
-                window.clickEvents = []; 
-                return events;
-            """)
+            if clicks is None:
+                clicks = _json_loads(self.driver.execute_script(DRAIN_KIND_JS, self.EVENT_BUFFER_SIZE, 'clicks'))
             if clicks:
                 for click in clicks:
                     self.record_activity("click", click)
@@ -2889,10 +3656,11 @@ class BrowserActivityRecorder:
         except Exception:
             pass
             
-    def collect_input_events(self):
+    def collect_input_events(self, inputs=None):
         """Collect input events from JavaScript tracker"""
         try:
-            inputs = self.driver.execute_script("var events = window.inputEvents || []; window.inputEvents = []; return events;")
+            if inputs is None:
+                inputs = _json_loads(self.driver.execute_script(DRAIN_KIND_JS, self.EVENT_BUFFER_SIZE, 'inputs'))
             if inputs:
                 for inp in inputs:
                     # Distinguish between text input and checkbox/radio change events
@@ -2903,6 +3671,16 @@ class BrowserActivityRecorder:
         except Exception:
             pass
     
+    def collect_hover_events(self, hovers=None):
+        """Collect hover events from JavaScript tracker"""
+        try:
+            if hovers is None:
+                hovers = _json_loads(self.driver.execute_script(DRAIN_KIND_JS, self.EVENT_BUFFER_SIZE, 'hovers'))
+            for he in hovers or []:
+                self.record_activity("hover", he)
+        except Exception:
+            pass
+    
     def fallback_track_dom_changes(self):
         """Fallback method to track DOM changes when JavaScript injection fails"""
         try:
@@ -2950,9 +3728,26 @@ class BrowserActivityRecorder:
         except Exception:
             pass
             
+    def _wait_for_activity(self, busy=False):
+        """
+        Sleep between monitor ticks
+        busy: the last tick drained events, so more may be queued; poll again
+        soon. Idle ticks back off exponentially up to MAX_POLL_INTERVAL.
+        While the __trackerSink binding is live, new events wake us right away
+        and the fallback interval only paces navigation/popup checks
+        """
+        if busy:
+            self._poll_interval = self.MIN_POLL_INTERVAL
+        else:
+            self._poll_interval = min(self.MAX_POLL_INTERVAL, self._poll_interval * self.POLL_BACKOFF)
+        if self._tracker_sink_active:
+            self._activity_event.wait(self._poll_interval if busy else self.PUSH_POLL_INTERVAL)
+        else:
+            time.sleep(self._poll_interval)
+    
     def monitor_activities(self):
         """Main monitoring loop"""
-        self.previous_window_handles = self.driver.window_handles
+        self.previous_window_handles = tuple(self.driver.window_handles)
         trackers_injected = False
         page_loading = False
         use_fallback = False
@@ -2962,14 +3757,16 @@ class BrowserActivityRecorder:
             try:
                 # IMPORTANT: Collect clicks FIRST before any loading checks
                 # This ensures clicks that trigger DOM changes are captured
-                if trackers_injected:
-                    # Periodically reinject into new iframes/shadow DOMs
-                    self.reinject_into_dynamic_contexts()
-                    self.collect_click_events()
-                    self.collect_input_events()
+                # One round-trip for events/url/title/handles/loading checks this tick
+                # (clear first: a binding call after this is picked up next tick)
+                self._activity_event.clear()
+                state = self.poll_browser_state(drain_events=trackers_injected)
+                busy = bool(state.events) and any(state.events.get(k) for k in ('clicks', 'hovers', 'inputs'))
+                if busy:
+                    self.collect_tracker_events(state.events)
                 
                 # Check if page is loading
-                is_loading, reason = self.is_page_loading()
+                is_loading, reason = self.is_page_loading(state)
                 
                 if is_loading:
                     if not page_loading:
@@ -2987,7 +3784,7 @@ class BrowserActivityRecorder:
                         self.injection_failed_count = 0
                 
                 # Track navigation and check if page changed
-                page_changed = self.track_navigation()
+                page_changed = self.track_navigation(state)
                 if page_changed:
                     # URL changed, need to re-inject trackers
                     trackers_injected = False
@@ -2995,11 +3792,15 @@ class BrowserActivityRecorder:
                     print("[INFO] Page navigated, re-injecting trackers...")
                 
                 # Track tab switching; if switch occurred, force tracker reinjection
-                tab_switched = self.track_tab_switching()
+                tab_switched = self.track_tab_switching(state)
                 if tab_switched:
                     trackers_injected = False
                     last_injection_url = ""
                     print("[INFO] Tab switch detected – reinjecting trackers in new tab context")
+                    # A tab seen for the first time has none of the
+                    # per-document registrations yet
+                    if self.previous_handle not in self._tracker_tabs:
+                        self._install_all_trackers()
                 
                 # Check for pop-ups (alerts, confirms, prompts)
                 self.check_and_handle_popup()
@@ -3008,15 +3809,16 @@ class BrowserActivityRecorder:
                 self.check_modal_dialogs()
                 
                 # Check if we need to inject/re-inject trackers
-                current_url = self.driver.current_url
+                current_url = state.url
                 if not trackers_injected and current_url != last_injection_url and not use_fallback:
-                    click_ok = self.inject_click_tracker()
-                    input_ok = self.inject_input_tracker()
-                    # Only inject hover tracker if enabled
-                    hover_ok = True
-                    if self.enable_hover_recording:
-                        hover_ok = self.inject_hover_tracker()
-                    trackers_injected = click_ok and input_ok and hover_ok
+                    if not self.use_cdp:
+                        # Without CDP the loading trackers are not auto-installed per document
+                        try:
+                            self.driver.execute_script(LOADING_TRACKERS_JS)
+                        except Exception:
+                            pass
+                    # Click, input and hover (if enabled) trackers in one call
+                    trackers_injected = self._ensure_trackers(current_url)
                     
                     if trackers_injected:
                         last_injection_url = current_url
@@ -3033,22 +3835,13 @@ class BrowserActivityRecorder:
                         continue
                 
                 # Use fallback methods if trackers not injected
-                if trackers_injected:
-                    # Collect hover events when trackers active (only if enabled)
-                    if self.enable_hover_recording:
-                        try:
-                            hover_events = self.driver.execute_script("return window.hoverEvents ? window.hoverEvents.splice(0, window.hoverEvents.length) : [];")
-                            for he in hover_events:
-                                self.record_activity("hover", he)
-                        except Exception:
-                            pass
                 if not trackers_injected and use_fallback:
                     # Use fallback methods
                     self.fallback_track_dom_changes()
                     self.fallback_track_clicks()
                 
-                # Reduced sleep time for faster response
-                time.sleep(0.2)
+                # Wait for the page to report events, or for the next poll
+                self._wait_for_activity(busy)
                 
             except KeyboardInterrupt:
                 print("\nRecording stopped by user.")
@@ -3061,7 +3854,8 @@ class BrowserActivityRecorder:
                 # Reset tracker injection flag on errors
                 trackers_injected = False
                 time.sleep(0.2)
-                
+        
+        self._stop_target_listener()
         return self.activity_log
 
 def main():
@@ -11,16 +11,131 @@ Example:
     3. Test can be executed immediately
 """
 
-from typing import Dict, List, Any, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterator, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
-import requests
-import base64
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from operator import attrgetter, itemgetter
+import hashlib
+import multiprocessing
+import threading
+import time
+import binascii
+import io
+import mmap
+import os
+import struct
 import json
 import re
 
+# requests and Pillow are imported where they are first needed, so code that
+# only uses the dataclasses below (e.g. to_activity_log) doesn't load them
+if TYPE_CHECKING:
+    import requests
 
-@dataclass
+# orjson writes generated tests much faster than json (which is used when
+# it is not installed)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _encode_screenshot(path: str, max_edge: Optional[int] = None, jpeg_quality: int = 85) -> str:
+    """
+    Base64-encode an image file for the Ollama API
+    Images with a side longer than max_edge are downscaled (Lanczos) and
+    re-encoded as JPEG first: fewer bytes to send and fewer image tokens for
+    the VLM. Others are encoded as they are, read through mmap
+    """
+    if max_edge:
+        try:
+            from PIL import Image
+            with Image.open(path) as image:
+                if max(image.size) > max_edge:
+                    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+                    if image.mode != 'RGB':
+                        image = image.convert('RGB')
+                    buffer = io.BytesIO()
+                    image.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True)
+                    return binascii.b2a_base64(buffer.getvalue(), newline=False).decode('ascii')
+        except Exception as e:
+            print(f"[Screenshot Test Generator] ⚠️  Could not resize {Path(path).name}, sending original: {e}")
+    
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return binascii.b2a_base64(mapped, newline=False).decode('ascii')
+
+
+def _preprocess_one(path: str, max_edge: Optional[int], jpeg_quality: int) -> Tuple[str, str]:
+    """(path, base64) for one screenshot; module-level so worker processes can run it"""
+    return path, _encode_screenshot(path, max_edge, jpeg_quality)
+
+
+# Fewer screenshots than this to resize are encoded in-process: starting
+# worker processes costs more than it saves
+PARALLEL_PREPROCESS_MIN = 4
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# JPEG start-of-frame markers (they carry the image size); C4, C8 and CC
+# share the range but are not frames
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _image_size(path: str) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) read from a PNG or JPEG header without decoding the
+    image, or None when the format is not recognised
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(24)
+            if header[:8] == PNG_SIGNATURE and header[12:16] == b'IHDR':
+                return struct.unpack('>II', header[16:24])
+            if header[:2] != b'\xff\xd8':
+                return None
+            
+            # JPEG: walk the segments up to the first start-of-frame
+            f.seek(2)
+            while True:
+                marker = f.read(4)
+                if len(marker) < 4 or marker[0] != 0xFF:
+                    return None
+                length = struct.unpack('>H', marker[2:4])[0]
+                if marker[1] in JPEG_SOF_MARKERS:
+                    frame = f.read(5)
+                    if len(frame) < 5:
+                        return None
+                    height, width = struct.unpack('>HH', frame[1:5])
+                    return width, height
+                f.seek(length - 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
+
+def _needs_resize(path: str, max_edge: Optional[int]) -> bool:
+    """Whether _encode_screenshot would have to resize this image with Pillow"""
+    if not max_edge:
+        return False
+    size = _image_size(path)
+    return size is None or max(size) > max_edge
+
+
+def _file_digest(path: str) -> bytes:
+    """SHA-256 of a file's contents, hashed straight from an mmap"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256(b"").digest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).digest()
+
+
+@dataclass(slots=True)
 class WorkflowStep:
     """Represents a single step in the workflow"""
     screenshot_number: int
@@ -33,7 +148,7 @@ class WorkflowStep:
     confidence: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class GeneratedTestFromScreenshots:
     """Complete test generated from screenshots"""
     test_name: str
@@ -45,55 +160,60 @@ class GeneratedTestFromScreenshots:
     def to_activity_log(self) -> List[Dict[str, Any]]:
         """Convert to activity_log.json format"""
         activities = []
+        append = activities.append
         
         for step in self.workflow_steps:
-            if step.action == 'navigate':
-                activities.append({
+            action = step.action
+            description = step.description
+            element = step.element_description
+            
+            if action == 'navigate':
+                append({
                     'action': 'navigation',
                     'details': {
                         'url': step.url,
-                        'description': step.description
+                        'description': description
                     }
                 })
             
-            elif step.action == 'click':
-                activities.append({
+            elif action == 'click':
+                append({
                     'action': 'click',
                     'details': {
                         'tagName': 'BUTTON',
-                        'text': step.element_description,
-                        'description': step.description,
-                        'vlm_description': step.element_description
+                        'text': element,
+                        'description': description,
+                        'vlm_description': element
                     },
                     'locators': {
-                        'text': step.element_description,
-                        'description': step.element_description
+                        'text': element,
+                        'description': element
                     }
                 })
             
-            elif step.action == 'input':
-                activities.append({
+            elif action == 'input':
+                append({
                     'action': 'text_input',
                     'details': {
                         'tagName': 'INPUT',
                         'value': step.input_value,
-                        'placeholder': step.element_description,
-                        'description': step.description,
-                        'vlm_description': step.element_description
+                        'placeholder': element,
+                        'description': description,
+                        'vlm_description': element
                     },
                     'locators': {
-                        'placeholder': step.element_description,
-                        'description': step.element_description
+                        'placeholder': element,
+                        'description': element
                     }
                 })
             
-            elif step.action == 'verify':
-                activities.append({
+            elif action == 'verify':
+                append({
                     'action': 'verification',
                     'details': {
                         'type': 'content_check',
-                        'criteria': step.description,
-                        'description': step.description
+                        'criteria': description,
+                        'description': description
                     }
                 })
         
@@ -106,10 +226,106 @@ class ScreenshotTestGenerator:
     Uses Ollama + Granite vision capabilities
     """
     
+    # In-memory LRU caches: encoded images by file content, and VLM
+    # responses by (images, model, prompt), so repeated screenshots are
+    # neither re-encoded nor re-analyzed. File digests are kept by (path,
+    # mtime, size), so unchanged files aren't even re-read to hash them.
+    # Shared by all instances, since callers such as the web UI create a
+    # generator per request
+    ENCODED_CACHE_SIZE = 64
+    RESPONSE_CACHE_SIZE = 256
+    DIGEST_CACHE_SIZE = 128
+    _encoded_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+    _response_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+    _digest_cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    
+    # Successful /api/tags probes by Ollama URL, so generators created one
+    # after another don't each wait for the same round trip
+    PROBE_TTL_SECONDS = 30
+    _probe_cache: Dict[str, float] = {}
+    
+    # Markdown code fence around the model's JSON, and the old greedy
+    # pattern kept as a last resort for _parse_workflow_response
+    CODE_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+    JSON_ARRAY_PATTERN = re.compile(r'\[.*\]', re.DOTALL)
+    
+    # Defaults for the step fields the model may leave out, and a getter
+    # returning them in WorkflowStep's field order (after the screenshot)
+    STEP_DEFAULTS = {
+        'action': 'unknown',
+        'description': '',
+        'element_description': None,
+        'input_value': None,
+        'url': None,
+        'confidence': 0.5
+    }
+    STEP_FIELDS = itemgetter(*STEP_DEFAULTS)
+    
+    # Static parts of the workflow analysis prompt; only the screenshot
+    # count and the annotations are filled in per call
+    WORKFLOW_PROMPT_HEAD = "You are a test automation expert. Analyze this sequence of "
+    WORKFLOW_PROMPT_TASK = """ screenshots showing a user workflow.
+
+Task: Extract the test steps from these screenshots."""
+    WORKFLOW_PROMPT_TAIL = """
+
+For each screenshot transition, identify:
+1. What action was performed (navigate, click, input, verify)
+2. Which element was interacted with (describe it clearly)
+3. What value was entered (if input)
+4. What URL is shown (if navigation)
+
+Output as JSON array:
+[
+  {
+    "screenshot_number": 1,
+    "action": "navigate",
+    "description": "User navigated to homepage",
+    "url": "https://example.com",
+    "confidence": 0.95
+  },
+  {
+    "screenshot_number": 2,
+    "action": "click",
+    "description": "User clicked the search button",
+    "element_description": "search button in top navigation bar",
+    "confidence": 0.90
+  },
+  {
+    "screenshot_number": 3,
+    "action": "input",
+    "description": "User entered search query",
+    "element_description": "search input field",
+    "input_value": "cloud computing",
+    "confidence": 0.85
+  },
+  {
+    "screenshot_number": 4,
+    "action": "verify",
+    "description": "Search results page appeared",
+    "confidence": 0.90
+  }
+]
+
+Rules:
+- Compare consecutive screenshots to determine actions
+- For clicks: describe the element that was clicked
+- For inputs: extract the text that was entered
+- For navigation: extract the URL
+- For verification: describe what should be validated
+- Be specific about element descriptions (they'll be found by VLM)
+- confidence: 0.0-1.0 based on how clear the action is
+
+JSON:"""
+    
     def __init__(
         self,
         ollama_url: str = "http://localhost:11434",
-        model: str = "granite3.2-vision:latest"
+        model: str = "granite3.2-vision:latest",
+        max_concurrent_requests: int = 5,
+        max_edge: Optional[int] = 1024,
+        jpeg_quality: int = 85
     ):
         """
         Initialize screenshot test generator
@@ -117,22 +333,58 @@ class ScreenshotTestGenerator:
         Args:
             ollama_url: URL of Ollama API
             model: Model name to use (must support vision)
+            max_concurrent_requests: VLM requests in flight at once when a
+                workflow is analyzed pair by pair (Ollama only runs
+                OLLAMA_NUM_PARALLEL of them at a time)
+            max_edge: Screenshots larger than this (in pixels, either side)
+                are downscaled before being sent; None sends them as they are
+            jpeg_quality: JPEG quality used for downscaled screenshots
         """
         self.ollama_url = ollama_url
         self.model = model
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_edge = max_edge
+        self.jpeg_quality = jpeg_quality
+        
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        # One session for every Ollama call, so requests reuse kept-alive
+        # connections instead of opening a new one each time. Only the
+        # /api/chat posts are retried: the /api/tags probe keeps the default
+        # no-retry adapter so a dead host fails after one 2s timeout
+        self._session = requests.Session()
+        chat_adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.3)
+        )
+        self._session.mount(f"{ollama_url}/api/chat", chat_adapter)
         
         # Test connection
         try:
-            response = requests.get(f"{ollama_url}/api/tags", timeout=2)
-            if response.status_code == 200:
+            status_code = self.probe_ollama(ollama_url, self._session)
+            if status_code == 200:
                 print("[Screenshot Test Generator] ✓ Connected to Ollama")
             else:
-                print(f"[Screenshot Test Generator] ⚠️  Ollama returned status {response.status_code}")
+                print(f"[Screenshot Test Generator] ⚠️  Ollama returned status {status_code}")
         except Exception as e:
             print(f"[Screenshot Test Generator] ❌ Could not connect to Ollama: {e}")
             print("  Make sure Ollama is running: ollama serve")
+            self.close()
             raise
     
+    def close(self):
+        """Close the HTTP session and its pooled connections"""
+        self._session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def generate_test_from_screenshots(
         self,
         screenshot_paths: List[str],
@@ -186,23 +438,165 @@ class ScreenshotTestGenerator:
     ) -> List[WorkflowStep]:
         """Analyze screenshots to extract workflow steps"""
         
-        # Load all screenshots
-        screenshots = []
-        for path in screenshot_paths:
-            with open(path, 'rb') as f:
-                screenshot_bytes = f.read()
-            screenshots.append((path, screenshot_bytes))
+        if len(screenshot_paths) <= 2:
+            keys, screenshots = zip(*self._iter_screenshots(screenshot_paths))
+            
+            # Build analysis prompt
+            prompt = self._build_workflow_analysis_prompt(len(screenshots), annotations)
+            
+            # Call VLM with all screenshots
+            response = self._call_vlm_with_multiple_screenshots(list(screenshots), prompt, image_keys=keys)
+            
+            # Parse workflow steps
+            return self._parse_workflow_response(response, screenshot_paths)
+        
+        # Longer workflows: one small request per consecutive pair of
+        # screenshots, several in flight at once, instead of one request
+        # whose context grows with every screenshot. Each pair is sent as
+        # soon as its two screenshots are encoded, so the VLM starts on the
+        # first transitions while later screenshots are still being resized
+        num_screenshots = len(screenshot_paths)
+        workers = min(self.max_concurrent_requests, num_screenshots - 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="VLM") as executor:
+            futures = []
+            previous = None
+            for first_number, screenshot in enumerate(self._iter_screenshots(screenshot_paths)):
+                if previous is not None:
+                    futures.append(executor.submit(
+                        self._analyze_transition,
+                        [previous, screenshot], first_number, num_screenshots, annotations, screenshot_paths
+                    ))
+                previous = screenshot
+            
+            # Reassemble in workflow order
+            workflow_steps = []
+            for future in futures:
+                workflow_steps.extend(future.result())
+        
+        return workflow_steps
+    
+    def _analyze_transition(
+        self,
+        pair: List[Tuple[Tuple, str]],
+        first_number: int,
+        num_screenshots: int,
+        annotations: Optional[List[str]],
+        screenshot_paths: List[str]
+    ) -> List[WorkflowStep]:
+        """Steps between screenshot first_number and the next one (1-based); pair holds (key, base64)"""
+        prompt = self._build_transition_prompt(first_number, num_screenshots, annotations)
+        keys, screenshots = zip(*pair)
+        response = self._call_vlm_with_multiple_screenshots(list(screenshots), prompt, image_keys=keys)
+        return self._parse_workflow_response(response, screenshot_paths)
+    
+    def _iter_screenshots(self, screenshot_paths: List[str]) -> Iterator[Tuple[Tuple, str]]:
+        """
+        (cache key, base64) for each screenshot, yielded in order as each is
+        ready. Images encoded before are taken from the cache; each image is
+        encoded once even if it appears several times. The key identifies
+        the encoded image, so callers can cache on it without re-hashing
+        """
+        keys = [(self._screenshot_digest(path), self.max_edge, self.jpeg_quality) for path in screenshot_paths]
+        encoded = {}
+        to_encode = {}  # key -> path, identical screenshots encoded once
+        for key, path in zip(keys, screenshot_paths):
+            cached = self._cache_get(self._encoded_cache, key)
+            if cached is not None:
+                encoded[key] = cached
+            else:
+                to_encode.setdefault(key, path)
         
-        # Build analysis prompt
-        prompt = self._build_workflow_analysis_prompt(len(screenshots), annotations)
+        # to_encode follows workflow order, so the next result is always
+        # the one for the first screenshot not encoded yet
+        results = self._encode_screenshots(list(to_encode.values()))
+        loaded = []
+        for key, path in zip(keys, screenshot_paths):
+            if key not in encoded:
+                _, screenshot_base64 = next(results)
+                encoded[key] = screenshot_base64
+                self._cache_put(self._encoded_cache, key, screenshot_base64, self.ENCODED_CACHE_SIZE)
+            loaded.append(f"[Screenshot Test Generator] Loaded: {Path(path).name}")
+            yield key, encoded[key]
         
-        # Call VLM with all screenshots
-        response = self._call_vlm_with_multiple_screenshots(screenshots, prompt)
+        # One write for the whole list rather than one per screenshot
+        print("\n".join(loaded))
+    
+    def _encode_screenshots(self, paths: List[str]) -> Iterator[Tuple[str, str]]:
+        """
+        (path, base64) for each path, in order. When several screenshots
+        need resizing they are processed in parallel worker processes
+        (Pillow work is CPU-bound)
+        """
+        encode = partial(_preprocess_one, max_edge=self.max_edge, jpeg_quality=self.jpeg_quality)
+        done = 0
+        # Sizes come from the file headers: the pool is only started when
+        # enough images really need Pillow, not for base64-only work
+        to_resize = 0
+        if len(paths) >= PARALLEL_PREPROCESS_MIN:
+            to_resize = sum(1 for path in paths if _needs_resize(path, self.max_edge))
+        if to_resize >= PARALLEL_PREPROCESS_MIN:
+            try:
+                # Spawned, not forked: the web UI calls this from a threaded server
+                with ProcessPoolExecutor(
+                    max_workers=min(os.cpu_count() or 1, to_resize),
+                    mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    for result in executor.map(encode, paths):
+                        yield result
+                        done += 1
+                return
+            except Exception as e:
+                print(f"[Screenshot Test Generator] ⚠️  Parallel preprocessing failed, encoding in-process: {e}")
         
-        # Parse workflow steps
-        workflow_steps = self._parse_workflow_response(response, screenshot_paths)
+        for path in paths[done:]:
+            yield encode(path)
+    
+    @classmethod
+    def probe_ollama(cls, ollama_url: str, session: Optional["requests.Session"] = None) -> int:
+        """
+        Status code of GET /api/tags on the Ollama server
+        A 200 is remembered for PROBE_TTL_SECONDS; errors and other statuses
+        are not cached, so a server that was just started is seen at once
+        """
+        with cls._cache_lock:
+            probed_at = cls._probe_cache.get(ollama_url)
+        if probed_at is not None and time.monotonic() - probed_at < cls.PROBE_TTL_SECONDS:
+            return 200
         
-        return workflow_steps
+        if session is None:
+            import requests
+            session = requests
+        response = session.get(f"{ollama_url}/api/tags", timeout=2)
+        if response.status_code == 200:
+            with cls._cache_lock:
+                cls._probe_cache[ollama_url] = time.monotonic()
+        return response.status_code
+    
+    def _screenshot_digest(self, path: str) -> bytes:
+        """Content digest of a screenshot, reused while its mtime and size are unchanged"""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        digest = self._cache_get(self._digest_cache, key)
+        if digest is None:
+            digest = _file_digest(path)
+            self._cache_put(self._digest_cache, key, digest, self.DIGEST_CACHE_SIZE)
+        return digest
+    
+    def _cache_get(self, cache: "OrderedDict[Tuple, Any]", key: Tuple) -> Optional[Any]:
+        """Look up key in an LRU cache, marking it most recently used"""
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, cache: "OrderedDict[Tuple, Any]", key: Tuple, value: Any, max_size: int):
+        """Store key in an LRU cache, evicting the least recently used entry"""
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > max_size:
+                cache.popitem(last=False)
     
     def _build_workflow_analysis_prompt(
         self,
@@ -213,58 +607,56 @@ class ScreenshotTestGenerator:
         
         annotation_section = ""
         if annotations:
-            annotation_section = "\n\nUser Annotations:"
-            for i, annotation in enumerate(annotations, 1):
-                annotation_section += f"\nScreenshot {i}: {annotation}"
+            annotation_section = "\n\nUser Annotations:" + "".join(
+                f"\nScreenshot {i}: {annotation}" for i, annotation in enumerate(annotations, 1)
+            )
         
-        return f"""You are a test automation expert. Analyze this sequence of {num_screenshots} screenshots showing a user workflow.
-
-Task: Extract the test steps from these screenshots.{annotation_section}
+        return f"{self.WORKFLOW_PROMPT_HEAD}{num_screenshots}{self.WORKFLOW_PROMPT_TASK}{annotation_section}{self.WORKFLOW_PROMPT_TAIL}"
+    
+    def _build_transition_prompt(
+        self,
+        first_number: int,
+        num_screenshots: int,
+        annotations: Optional[List[str]]
+    ) -> str:
+        """Build prompt for the transition from screenshot first_number to the next one"""
+        second_number = first_number + 1
+        
+        annotation_section = ""
+        if annotations:
+            for number in (first_number, second_number):
+                if number <= len(annotations):
+                    annotation_section += f"\nScreenshot {number}: {annotations[number - 1]}"
+            if annotation_section:
+                annotation_section = "\n\nUser Annotations:" + annotation_section
+        
+        # Only the first pair reports the page the workflow starts on
+        start_rule = ""
+        if first_number == 1:
+            start_rule = "\n- Also add a first step with screenshot_number 1 for the starting page (usually navigate, with its URL)"
+        
+        return f"""You are a test automation expert. These 2 images are screenshots {first_number} and {second_number} of a {num_screenshots}-screenshot user workflow.
 
-For each screenshot transition, identify:
-1. What action was performed (navigate, click, input, verify)
-2. Which element was interacted with (describe it clearly)
-3. What value was entered (if input)
-4. What URL is shown (if navigation)
+Task: Identify the action that leads from screenshot {first_number} to screenshot {second_number}.{annotation_section}
 
 Output as JSON array:
 [
   {{
-    "screenshot_number": 1,
-    "action": "navigate",
-    "description": "User navigated to homepage",
-    "url": "https://example.com",
-    "confidence": 0.95
-  }},
-  {{
-    "screenshot_number": 2,
+    "screenshot_number": {second_number},
     "action": "click",
     "description": "User clicked the search button",
     "element_description": "search button in top navigation bar",
     "confidence": 0.90
-  }},
-  {{
-    "screenshot_number": 3,
-    "action": "input",
-    "description": "User entered search query",
-    "element_description": "search input field",
-    "input_value": "cloud computing",
-    "confidence": 0.85
-  }},
-  {{
-    "screenshot_number": 4,
-    "action": "verify",
-    "description": "Search results page appeared",
-    "confidence": 0.90
   }}
 ]
 
 Rules:
-- Compare consecutive screenshots to determine actions
+- action is one of navigate, click, input, verify
 - For clicks: describe the element that was clicked
-- For inputs: extract the text that was entered
-- For navigation: extract the URL
+- For inputs: include "input_value" with the text that was entered
+- For navigation: include "url"
 - For verification: describe what should be validated
+- Use screenshot_number {second_number} for the action{start_rule}
 - Be specific about element descriptions (they'll be found by VLM)
 - confidence: 0.0-1.0 based on how clear the action is
 
@@ -272,19 +664,29 @@ JSON:"""
     
     def _call_vlm_with_multiple_screenshots(
         self,
-        screenshots: List[Tuple[str, bytes]],
+        screenshot_base64_list: List[str],
         prompt: str,
-        timeout: int = 120
+        timeout: int = 120,
+        image_keys: Optional[Tuple[Tuple, ...]] = None
     ) -> str:
-        """Call Ollama VLM with multiple screenshots"""
+        """
+        Call Ollama VLM with multiple base64-encoded screenshots (cached per
+        images + prompt). image_keys are the _iter_screenshots keys of the
+        images; without them the base64 strings are hashed
+        """
+        if image_keys is None:
+            image_keys = tuple(hashlib.sha256(image.encode('ascii')).digest() for image in screenshot_base64_list)
+        cache_key = (
+            tuple(image_keys),
+            self.model,
+            hashlib.sha256(prompt.encode('utf-8')).digest()
+        )
+        cached = self._cache_get(self._response_cache, cache_key)
+        if cached is not None:
+            print(f"[Screenshot Test Generator] ✓ Reusing cached analysis")
+            return cached
+        
         try:
-            # Encode all screenshots
-            screenshot_base64_list = []
-            for path, screenshot_bytes in screenshots:
-                screenshot_base64 = base64.standard_b64encode(screenshot_bytes).decode("utf-8")
-                screenshot_base64_list.append(screenshot_base64)
-                print(f"[Screenshot Test Generator] Loaded: {Path(path).name}")
-            
             # Build payload with multiple images for chat API (Ollama v0.12+)
             payload = {
                 "model": self.model,
@@ -295,7 +697,7 @@ JSON:"""
                         "images": screenshot_base64_list  # Array of images
                     }
                 ],
-                "stream": False,
+                "stream": True,
                 "options": {
                     "temperature": 0.2,
                     "top_p": 0.9
@@ -304,21 +706,87 @@ JSON:"""
             
             print(f"[Screenshot Test Generator] Analyzing workflow...")
             
-            # Call Ollama chat API
-            response = requests.post(
+            # The body is mostly base64 image data: serialize it straight to
+            # bytes (orjson when available) rather than through requests'
+            # json= path, which builds a str with json and then encodes it
+            body = orjson.dumps(payload) if ORJSON_AVAILABLE else json.dumps(payload).encode('utf-8')
+            
+            # Call Ollama chat API; leaving the block early closes the
+            # connection, which also stops the generation server-side
+            with self._session.post(
                 f"{self.ollama_url}/api/chat",
-                json=payload,
-                timeout=timeout
-            )
+                data=body,
+                headers={"Content-Type": "application/json"},
+                timeout=timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                content = self._read_streamed_content(response)
             
-            response.raise_for_status()
-            response_data = response.json()
-            return response_data.get('message', {}).get('content', '')
+            self._cache_put(self._response_cache, cache_key, content, self.RESPONSE_CACHE_SIZE)
+            return content
             
         except Exception as e:
             print(f"[Screenshot Test Generator] ❌ VLM API error: {e}")
             raise
     
+    def _read_streamed_content(self, response: "requests.Response") -> str:
+        """
+        Collect the message content of a streamed (NDJSON) chat response
+        Tracks bracket depth as chunks arrive and stops reading once a
+        complete, non-empty JSON array of step objects has been received,
+        instead of waiting for whatever the model writes after it
+        """
+        content = ""
+        depth = 0
+        in_string = False
+        escaped = False
+        start = -1
+        
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get('error'):
+                raise RuntimeError(chunk['error'])
+            
+            offset = len(content)
+            content += chunk.get('message', {}).get('content', '')
+            if chunk.get('done'):
+                break
+            
+            for i in range(offset, len(content)):
+                char = content[i]
+                if start == -1:
+                    if char == '[':
+                        start = i
+                        depth = 1
+                elif in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char in '[{':
+                    depth += 1
+                elif char in ']}':
+                    depth -= 1
+                    if depth == 0:
+                        try:
+                            if self._is_step_list(json.loads(content[start:i + 1])):
+                                return content
+                        except ValueError:
+                            pass
+                        # Not a list of steps (e.g. "[]" or "[1]" in prose); keep
+                        # reading and look for the next array
+                        start = -1
+                        in_string = False
+        
+        return content
+    
     def _parse_workflow_response(
         self,
         response: str,
@@ -327,27 +795,24 @@ JSON:"""
         """Parse VLM response into workflow steps"""
         try:
             # Extract JSON array from response
-            json_match = re.search(r'\[.*\]', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                data = json.loads(json_str)
-            else:
-                raise ValueError("No JSON array found in response")
+            data = self._extract_json_array(response)
+            if data is None:
+                json_match = self.JSON_ARRAY_PATTERN.search(response)
+                if json_match:
+                    json_str = json_match.group(0)
+                    data = json.loads(json_str)
+                else:
+                    raise ValueError("No JSON array found in response")
             
             # Parse workflow steps
             workflow_steps = []
+            num_screenshots = len(screenshot_paths)
             for step_data in data:
+                path_number = step_data.get('screenshot_number', 1)
                 step = WorkflowStep(
-                    screenshot_number=step_data.get('screenshot_number', len(workflow_steps) + 1),
-                    screenshot_path=screenshot_paths[step_data.get('screenshot_number', 1) - 1]
-                    if step_data.get('screenshot_number', 1) <= len(screenshot_paths)
-                    else screenshot_paths[0],
-                    action=step_data.get('action', 'unknown'),
-                    description=step_data.get('description', ''),
-                    element_description=step_data.get('element_description'),
-                    input_value=step_data.get('input_value'),
-                    url=step_data.get('url'),
-                    confidence=step_data.get('confidence', 0.5)
+                    step_data.get('screenshot_number', len(workflow_steps) + 1),
+                    screenshot_paths[path_number - 1] if path_number <= num_screenshots else screenshot_paths[0],
+                    *self.STEP_FIELDS({**self.STEP_DEFAULTS, **step_data})
                 )
                 workflow_steps.append(step)
             
@@ -358,16 +823,72 @@ JSON:"""
             print(f"Response was: {response[:500]}")
             raise
     
+    @staticmethod
+    def _is_step_list(data: Any) -> bool:
+        """True for a non-empty JSON array of objects, i.e. workflow steps"""
+        return isinstance(data, list) and bool(data) and all(isinstance(item, dict) for item in data)
+    
+    def _extract_json_array(self, response: str) -> Optional[List[Any]]:
+        """
+        Return the first JSON array of step objects in the response, or None
+        (arrays of other values, e.g. "[1]" in prose, are skipped)
+        Looks inside a ```json fence if there is one, then scans forward
+        once per candidate '[' tracking bracket depth outside strings
+        """
+        fence = self.CODE_FENCE_PATTERN.search(response)
+        text = fence.group(1) if fence else response
+        
+        start = text.find('[')
+        while start != -1:
+            depth = 0
+            in_string = False
+            escaped = False
+            end = -1
+            for i in range(start, len(text)):
+                char = text[i]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char in '[{':
+                    depth += 1
+                elif char in ']}':
+                    depth -= 1
+                    if depth == 0:
+                        end = i + 1
+                        break
+            
+            if end == -1:
+                return None
+            try:
+                data = json.loads(text[start:end])
+                if self._is_step_list(data):
+                    return data
+            except ValueError:
+                pass
+            start = text.find('[', start + 1)
+        
+        return None
+    
     def _generate_test_name(self, workflow_steps: List[WorkflowStep]) -> str:
         """Generate test name from workflow"""
         if not workflow_steps:
             return "Generated Test"
         
-        # Extract key actions
-        actions = [step.action for step in workflow_steps]
-        has_login = any('login' in step.description.lower() for step in workflow_steps)
-        has_search = any('search' in step.description.lower() for step in workflow_steps)
-        has_form = any('input' in actions or 'form' in step.description.lower() for step in workflow_steps)
+        # Extract key actions in one pass, lowering each description once
+        has_login = has_search = has_form = False
+        for step in workflow_steps:
+            description = step.description.lower()
+            has_login = has_login or 'login' in description
+            has_search = has_search or 'search' in description
+            has_form = has_form or step.action == 'input' or 'form' in description
+            if has_login and has_search and has_form:
+                break
         
         if has_login:
             return "User Login Flow Test"
@@ -392,9 +913,8 @@ JSON:"""
         if not workflow_steps:
             return 0.0
         
-        # Average confidence of all steps
-        confidences = [step.confidence for step in workflow_steps]
-        return sum(confidences) / len(confidences)
+        # Average confidence of all steps, summed without an interim list
+        return sum(map(attrgetter('confidence'), workflow_steps)) / len(workflow_steps)
     
     def save_test(
         self,
@@ -404,8 +924,12 @@ JSON:"""
         """Save generated test to file"""
         activities = test.to_activity_log()
         
-        with open(output_file, 'w') as f:
-            json.dump(activities, f, indent=2)
+        # Serialized in one go and written with a single call (orjson when
+        # available); non-ASCII text is kept as UTF-8 rather than escaped
+        if ORJSON_AVAILABLE:
+            Path(output_file).write_bytes(orjson.dumps(activities, option=orjson.OPT_INDENT_2))
+        else:
+            Path(output_file).write_text(json.dumps(activities, indent=2, ensure_ascii=False), encoding='utf-8')
         
         print(f"[Screenshot Test Generator] ✓ Test saved to: {output_file}")
     
@@ -448,8 +972,7 @@ def demo():
     
     # Check if Ollama is available
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=2)
-        if response.status_code != 200:
+        if ScreenshotTestGenerator.probe_ollama("http://localhost:11434") != 200:
             print("\n❌ Ollama is not running!")
             print("Please start Ollama: ollama serve")
             print("And ensure granite model is available: ollama pull granite3.2-vision:latest")
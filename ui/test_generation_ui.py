@@ -197,19 +197,19 @@ def generate_from_screenshots():
             return jsonify({'success': False, 'error': 'No valid screenshots uploaded'}), 400
         
         # Generate test
-        generator = ScreenshotTestGenerator()
-        test = generator.generate_test_from_screenshots(
-            screenshot_paths=screenshot_paths,
-            test_name=test_name,
-            annotations=annotations if annotations and annotations[0] else None
-        )
-        
-        # Save test
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{test_name.lower().replace(' ', '_')}_{timestamp}.json"
-        filepath = Path(app.config['GENERATED_TESTS_FOLDER']) / filename
-        
-        generator.save_test(test, str(filepath))
+        with ScreenshotTestGenerator() as generator:
+            test = generator.generate_test_from_screenshots(
+                screenshot_paths=screenshot_paths,
+                test_name=test_name,
+                annotations=annotations if annotations and annotations[0] else None
+            )
+            
+            # Save test
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"{test_name.lower().replace(' ', '_')}_{timestamp}.json"
+            filepath = Path(app.config['GENERATED_TESTS_FOLDER']) / filename
+            
+            generator.save_test(test, str(filepath))
         
         return jsonify({
             'success': True,